@@ -0,0 +1,351 @@
+
+import pandas as pd
+import os
+import glob
+import json
+import hashlib
+import time
+import shutil
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from Master_DB_Functions import file_signature, file_sha1
+
+
+ACRA_DATA_DIR = "Acra_Data"
+ACRA_SNAPSHOT_PATH = "Staging/Cache/acra_snapshot.parquet"
+ACRA_FINGERPRINT_KEY = b"acra_source_fingerprint"
+ACRA_SIGNATURES_KEY = b"acra_source_signatures"     # mtime/size per CSV, checked before hashing
+ACRA_DATASET_DIR = "Staging/Cache/acra_dataset"
+ACRA_DATASET_MANIFEST = "_acra_dataset.json"     # underscore prefix: ignored by dataset discovery
+SSIC_MAPPING_PATH = "./SSIC_Code/mapped_ssic_code.xlsx"
+
+SSIC_CODE_DIGITS = 5
+ACRA_PARTITION_COLUMNS = ["STATUS_KEY", "SSIC_DIVISION"]
+ACRA_ROW_GROUP_SIZE = 50_000      # rows are sorted by SSIC code, so row-group stats prune by SSIC group
+
+# The 10 columns Bronze keeps out of the ~55 in the ACRA export, with their parse-time dtypes
+ACRA_COLUMN_DTYPES = {
+    "uen": "string",
+    "entity_name": "string",
+    "business_constitution_description": "category",
+    "entity_type_description": "category",
+    "entity_status_description": "category",
+    "registration_incorporation_date": "string",   # parsed to datetime64 once after the read
+    "primary_ssic_code": "Int32",
+    "secondary_ssic_code": "Int32",
+    "street_name": "string",
+    "postal_code": "string",                        # keep leading zeros
+}
+
+# Placeholders in the export that mean "no value"; 'na' is the ACRA sentinel
+ACRA_NA_VALUES = ["na", "NA", "N/A", "-", ""]
+
+LIVE_STATUSES = ["LIVE COMPANY", "LIVE"]
+EXCLUDED_SSIC_CODES = [
+    46900, 47719, 47749, 47539, 47536, 56123,
+    10711, 10712, 10719, 10732, 10733, 93209
+]
+
+
+def acra_source_fingerprint(csv_files):
+    """SHA-1 over the name and content of every source CSV, in a stable order."""
+    digest = hashlib.sha1()
+    for path in sorted(csv_files):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def acra_source_signatures(csv_files):
+    """File name -> mtime/size of every source CSV."""
+    return {os.path.basename(path): file_signature(path) for path in sorted(csv_files)}
+
+
+def read_snapshot_metadata(snapshot_path=ACRA_SNAPSHOT_PATH):
+    """The snapshot's parquet metadata, or {} if there is no usable snapshot."""
+    if not os.path.exists(snapshot_path):
+        return {}
+    try:
+        return pq.read_schema(snapshot_path).metadata or {}
+    except (pa.ArrowInvalid, OSError):
+        return {}
+
+
+def read_snapshot_fingerprint(snapshot_path=ACRA_SNAPSHOT_PATH):
+    """Fingerprint stored in the snapshot's parquet metadata, or None if there is no usable snapshot."""
+    fingerprint = read_snapshot_metadata(snapshot_path).get(ACRA_FINGERPRINT_KEY)
+    return fingerprint.decode() if fingerprint else None
+
+
+def write_snapshot(table, snapshot_path, fingerprint, csv_files):
+    """Write the snapshot atomically, stamped with the sources' fingerprint and mtime/size signatures."""
+    metadata = dict(table.schema.metadata or {})
+    metadata[ACRA_FINGERPRINT_KEY] = fingerprint.encode()
+    metadata[ACRA_SIGNATURES_KEY] = json.dumps(acra_source_signatures(csv_files)).encode()
+    metadata[b"acra_source_files"] = json.dumps([os.path.basename(f) for f in csv_files]).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    temp_path = snapshot_path + ".tmp"
+    pq.write_table(table, temp_path, compression="zstd")
+    os.replace(temp_path, snapshot_path)
+
+
+def acra_sources_changed(csv_files, snapshot_path=ACRA_SNAPSHOT_PATH):
+    """
+    Whether the source CSVs differ from the ones the snapshot was built from. Unchanged mtime/size
+    signatures answer without reading the CSVs; otherwise the content fingerprint decides, and a
+    snapshot whose sources were only touched gets its signatures refreshed.
+    """
+    metadata = read_snapshot_metadata(snapshot_path)
+    fingerprint = metadata.get(ACRA_FINGERPRINT_KEY)
+    if not fingerprint:
+        return True
+    signatures = metadata.get(ACRA_SIGNATURES_KEY)
+    if signatures and json.loads(signatures.decode()) == acra_source_signatures(csv_files):
+        return False
+
+    current = acra_source_fingerprint(csv_files)
+    if current != fingerprint.decode():
+        return True
+    # Touched but not changed: refresh the signatures, keep the parsed data
+    write_snapshot(pq.read_table(snapshot_path), snapshot_path, current, csv_files)
+    return False
+
+
+def read_acra_csv(path):
+    """Read one ACRA export with only the needed columns, typed and with 'na' mapped at parse time."""
+    df = pd.read_csv(
+        path,
+        usecols=lambda col: col.lower() in ACRA_COLUMN_DTYPES,
+        dtype=ACRA_COLUMN_DTYPES,
+        na_values=ACRA_NA_VALUES,
+        keep_default_na=False,
+    )
+    df.columns = df.columns.str.lower()
+    return df
+
+
+def clean_acra_frame(df):
+    """Trim/collapse/uppercase text (categories are cleaned once per category) and parse the dates."""
+    for col, dtype in ACRA_COLUMN_DTYPES.items():
+        if col == "registration_incorporation_date":
+            df[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors="coerce")
+        elif dtype == "string":
+            df[col] = df[col].str.strip().str.replace(r"\s+", " ", regex=True).str.upper()
+            df[col] = df[col].mask(df[col].isin(ACRA_NA_VALUES))
+        elif dtype == "category":
+            # Clean the categories, not the rows; cleaning can merge categories ("Live" / "LIVE ")
+            categories = df[col].cat.categories
+            cleaned = pd.Series(categories, dtype="string").str.strip().str.replace(r"\s+", " ", regex=True).str.upper()
+            df[col] = df[col].map(dict(zip(categories, cleaned.to_numpy(dtype=object)))).astype("category")
+
+    df = df[list(ACRA_COLUMN_DTYPES)]
+    df.columns = df.columns.str.upper()
+    return df
+
+
+def build_acra_snapshot(data_dir=ACRA_DATA_DIR, snapshot_path=ACRA_SNAPSHOT_PATH):
+    """Parse every ACRA CSV in data_dir and write the compact parquet snapshot."""
+    csv_files = sorted(glob.glob(os.path.join(data_dir, "*.csv")))
+    if not csv_files:
+        raise FileNotFoundError(f"No ACRA CSV files found in '{data_dir}'")
+
+    start = time.time()
+    fingerprint = acra_source_fingerprint(csv_files)
+
+    df = pd.concat((read_acra_csv(f) for f in csv_files), ignore_index=True)
+    # Re-unify categoricals across files before cleaning
+    for col, dtype in ACRA_COLUMN_DTYPES.items():
+        if dtype == "category":
+            df[col] = df[col].astype("category")
+    df = clean_acra_frame(df)
+
+    write_snapshot(pa.Table.from_pandas(df, preserve_index=False), snapshot_path, fingerprint, csv_files)
+
+    print(f"✅ ACRA snapshot built from {len(csv_files)} file(s): {len(df):,} rows in {time.time() - start:.1f}s")
+    return df
+
+
+def load_acra_data(data_dir=ACRA_DATA_DIR, snapshot_path=ACRA_SNAPSHOT_PATH, columns=None,
+                   live_only=False, exclude_ssic_codes=None, rebuild=False):
+    """
+    Load ACRA entities from the parquet snapshot, rebuilding it first when the source CSVs
+    have changed (or rebuild=True). The CSVs are only hashed when their mtime/size moved.
+
+    live_only keeps LIVE / LIVE COMPANY entities and exclude_ssic_codes drops primary SSIC codes;
+    both are pushed down to the parquet reader.
+    """
+    csv_files = sorted(glob.glob(os.path.join(data_dir, "*.csv")))
+    stale = rebuild or not os.path.exists(snapshot_path)
+    if not stale and csv_files:
+        stale = acra_sources_changed(csv_files, snapshot_path)
+
+    if stale:
+        print("🔄 ACRA source files changed, rebuilding snapshot...")
+        build_acra_snapshot(data_dir, snapshot_path)
+    else:
+        print(f"📦 Loading ACRA snapshot: {snapshot_path}")
+
+    filters = []
+    if live_only:
+        filters.append(("ENTITY_STATUS_DESCRIPTION", "in", LIVE_STATUSES))
+    if exclude_ssic_codes:
+        filters.append(("PRIMARY_SSIC_CODE", "not in", [int(code) for code in exclude_ssic_codes]))
+
+    df = pd.read_parquet(snapshot_path, engine="pyarrow", columns=columns, filters=filters or None)
+    print(f"   • Rows loaded: {len(df):,}")
+    return df
+
+
+def normalize_status_key(status):
+    """Partition key for an entity status: 'Live Company' -> 'LIVE_COMPANY'."""
+    return str(status).strip().upper().replace(" ", "_")
+
+
+def load_ssic_mapping(path=SSIC_MAPPING_PATH):
+    """SSIC industry hierarchy, cleaned the same way as the Bronze notebook."""
+    mapped_ssic_code = pd.read_excel(path)
+    mapped_ssic_code.columns = mapped_ssic_code.columns.str.strip().str.upper().str.replace(" ", "_")
+
+    columns_to_keep = ["PARENT_INDUSTRY", "INDUSTRY_TYPE", "SUB_INDUSTRY", "SSIC_CODES", "DESCRIPTION"]
+    mapped_ssic_code = mapped_ssic_code[columns_to_keep].copy()
+    mapped_ssic_code["SSIC_CODES"] = pd.to_numeric(mapped_ssic_code["SSIC_CODES"], errors="coerce").fillna(0).astype("int32")
+
+    text_cols = ["PARENT_INDUSTRY", "INDUSTRY_TYPE", "SUB_INDUSTRY", "DESCRIPTION"]
+    for col in text_cols:
+        mapped_ssic_code[col] = mapped_ssic_code[col].astype(str).str.strip().str.title().astype("category")
+
+    return mapped_ssic_code.drop_duplicates(subset="SSIC_CODES").reset_index(drop=True)
+
+
+def build_acra_dataset(data_dir=ACRA_DATA_DIR, snapshot_path=ACRA_SNAPSHOT_PATH,
+                       dataset_dir=ACRA_DATASET_DIR, ssic_mapping_path=SSIC_MAPPING_PATH):
+    """
+    Write ACRA entities joined with the SSIC hierarchy as a hive-partitioned parquet dataset:
+    STATUS_KEY=<status>/SSIC_DIVISION=<2 digits>/part-0.parquet, sorted by SSIC code inside each
+    partition and carrying the 3-digit SSIC_GROUP as a column.
+    """
+    start = time.time()
+    acra_df = load_acra_data(data_dir, snapshot_path)
+    mapped_ssic_code = load_ssic_mapping(ssic_mapping_path)
+
+    df = acra_df.merge(mapped_ssic_code, how="left", left_on="PRIMARY_SSIC_CODE", right_on="SSIC_CODES")
+    df = df.drop(columns=["SSIC_CODES"])
+
+    # SSIC codes are 5 digits with leading zeros dropped in the export (1111 -> 01111)
+    ssic_text = df["PRIMARY_SSIC_CODE"].astype("string").str.zfill(SSIC_CODE_DIGITS).fillna("NA")
+    df["STATUS_KEY"] = df["ENTITY_STATUS_DESCRIPTION"].astype("string").fillna("UNKNOWN").str.replace(" ", "_")
+    df["SSIC_DIVISION"] = ssic_text.str.slice(0, 2)
+    df["SSIC_GROUP"] = ssic_text.str.slice(0, 3)
+
+    # Build next to the live dataset, then swap it in so readers never see a half-written tree
+    temp_dir = dataset_dir.rstrip("/\\") + ".tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    table = pa.Table.from_pandas(df.sort_values(ACRA_PARTITION_COLUMNS + ["PRIMARY_SSIC_CODE"]), preserve_index=False)
+    pq.write_to_dataset(table, temp_dir, partition_cols=ACRA_PARTITION_COLUMNS,
+                        compression="zstd", existing_data_behavior="delete_matching",
+                        max_partitions=4096, row_group_size=ACRA_ROW_GROUP_SIZE)
+
+    with open(os.path.join(temp_dir, ACRA_DATASET_MANIFEST), "w") as f:
+        json.dump({
+            "snapshot_fingerprint": read_snapshot_fingerprint(snapshot_path),
+            "ssic_mapping_sha1": file_sha1(ssic_mapping_path),
+            "rows": len(df),
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f)
+
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    os.replace(temp_dir, dataset_dir)
+
+    partitions = df[ACRA_PARTITION_COLUMNS].drop_duplicates().shape[0]
+    print(f"✅ ACRA dataset built: {len(df):,} rows in {partitions} partitions ({time.time() - start:.1f}s)")
+
+
+def ensure_acra_dataset(data_dir=ACRA_DATA_DIR, snapshot_path=ACRA_SNAPSHOT_PATH,
+                        dataset_dir=ACRA_DATASET_DIR, ssic_mapping_path=SSIC_MAPPING_PATH):
+    """Rebuild the partitioned dataset if the ACRA sources or the SSIC mapping changed."""
+    manifest_path = os.path.join(dataset_dir, ACRA_DATASET_MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    csv_files = sorted(glob.glob(os.path.join(data_dir, "*.csv")))
+    current = manifest.get("snapshot_fingerprint") == read_snapshot_fingerprint(snapshot_path)
+    if current and csv_files:
+        current = not acra_sources_changed(csv_files, snapshot_path)
+    if current:
+        current = manifest.get("ssic_mapping_sha1") == file_sha1(ssic_mapping_path)
+
+    if not current:
+        build_acra_dataset(data_dir, snapshot_path, dataset_dir, ssic_mapping_path)
+
+
+def ssic_prefix_filter(ssic_prefixes):
+    """
+    Dataset expression for primary SSIC codes starting with any of the prefixes.
+    Prefixes of 2+ digits prune SSIC_DIVISION partitions; each prefix is also a code range for
+    row-group pruning.
+    """
+    expression = None
+    for prefix in ssic_prefixes:
+        prefix = str(prefix).strip()
+        if not prefix.isdigit() or not 1 <= len(prefix) <= SSIC_CODE_DIGITS:
+            raise ValueError(f"SSIC prefix must be 1-{SSIC_CODE_DIGITS} digits, got {prefix!r}")
+
+        scale = 10 ** (SSIC_CODE_DIGITS - len(prefix))
+        condition = (ds.field("PRIMARY_SSIC_CODE") >= int(prefix) * scale) & \
+                    (ds.field("PRIMARY_SSIC_CODE") < (int(prefix) + 1) * scale)
+        if len(prefix) >= 2:
+            condition = (ds.field("SSIC_DIVISION") == prefix[:2]) & condition
+
+        expression = condition if expression is None else expression | condition
+    return expression
+
+
+def query_acra(ssic_prefixes=None, statuses=LIVE_STATUSES, registered_from=None, registered_to=None,
+               columns=None, exclude_ssic_codes=None, dataset_dir=ACRA_DATASET_DIR, refresh=True):
+    """
+    Slice the partitioned ACRA dataset for an industry lead list.
+
+    ssic_prefixes: SSIC code prefixes, e.g. ["823"] for all event organizers, or full codes.
+    statuses: entity statuses to keep (None for all), e.g. ["LIVE", "LIVE COMPANY"].
+    registered_from / registered_to: inclusive registration date range (anything pd.Timestamp accepts).
+    Only partitions matching the status and SSIC filters are read.
+    """
+    if refresh:
+        ensure_acra_dataset(dataset_dir=dataset_dir)
+
+    partitioning = ds.partitioning(
+        pa.schema([(name, pa.string()) for name in ACRA_PARTITION_COLUMNS]), flavor="hive"
+    )
+    dataset = ds.dataset(dataset_dir, format="parquet", partitioning=partitioning)
+    expression = None
+
+    def add(condition):
+        nonlocal expression
+        expression = condition if expression is None else expression & condition
+
+    if statuses:
+        add(ds.field("STATUS_KEY").isin([normalize_status_key(status) for status in statuses]))
+    if ssic_prefixes:
+        add(ssic_prefix_filter(ssic_prefixes))
+    if exclude_ssic_codes:
+        add(~ds.field("PRIMARY_SSIC_CODE").isin([int(code) for code in exclude_ssic_codes]))
+    if registered_from is not None:
+        add(ds.field("REGISTRATION_INCORPORATION_DATE") >= pd.Timestamp(registered_from).to_datetime64())
+    if registered_to is not None:
+        add(ds.field("REGISTRATION_INCORPORATION_DATE") <= pd.Timestamp(registered_to).to_datetime64())
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name not in ACRA_PARTITION_COLUMNS]
+
+    table = dataset.to_table(columns=columns, filter=expression)
+    df = table.to_pandas()
+    print(f"🔎 ACRA query returned {len(df):,} rows")
+    return df
@@ -0,0 +1,286 @@
+import pandas as pd
+import numpy as np
+import re
+import time
+
+from Phone_Number_Functions import STRING_DTYPE
+
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+
+# Same patterns the Optimizing_Apify notebook applied per row (POSTAL_RE / UNIT_RES), folded into
+# whole-string extract patterns so each one runs once over the column. They stay within the RE2
+# syntax (no lookarounds) so Arrow can run them natively.
+POSTAL_PATTERN = r"(?:\bSingapore\b\s*)?(?P<postal>\d{6})"
+UNIT_PATTERNS = (
+    r"#\s*[A-Za-z0-9]{1,4}\s*[-–]\s*[A-Za-z0-9]{1,4}",
+    r"\bunit\s*[#:]?\s*[A-Za-z0-9]{1,4}\s*[-–]\s*[A-Za-z0-9]{1,4}\b",
+    r"\bunit\s*[#:]?\s*[A-Za-z0-9]{1,5}\b",
+)
+
+# Greedy prefix: the LAST postal code in the text wins; 'after' must not start with a digit,
+# which stands in for the notebook's (?!\d)
+POSTAL_SPLIT_PATTERN = r"(?is)^(?P<before>.*)" + POSTAL_PATTERN + r"(?P<after>(?:\D.*)?)$"
+
+# Tried in order over the rows the previous patterns missed: the first pattern that matches
+# anywhere wins, and within it the first occurrence, as in the notebook's
+# "for rx in UNIT_RES: rx.search(...)" loop. (One alternation of all three is 10x slower under RE2.)
+UNIT_EXTRACT_PATTERNS = tuple(rf"(?is)(?P<unit>{pattern})" for pattern in UNIT_PATTERNS)
+
+# Block number at the start of the street line: "BLK 123A ...", "Block 45 ..." or a bare house number
+BLOCK_PATTERN = r"(?i)^(?:(?:BLK|BLOCK)\.?\s*)?(?P<block>\d{1,4}[A-Z]?)\s+[A-Z]"
+
+SINGAPORE_WORD_PATTERN = r"(?i)\bSingapore\b"
+UNIT_PREFIX_PATTERN = r"(?i)^unit\s*[#:]?\s*"
+STRIP_CHARS = " ,;|/"
+
+# parse_addresses column -> operational_* column written by add_operational_address_columns
+OPERATIONAL_COLUMNS = {
+    'street': 'operational_street',
+    'unit': 'operational_unit',
+    'block': 'operational_block',
+    'postal_code': 'operational_postal_code',
+    'address_clean': 'operational_address',
+    'address_source': 'operational_address_source',
+}
+
+
+def normalize_spaces(text):
+    """
+    Column version of the notebook's normalize_spaces: collapse whitespace and strip ' ,;|/'.
+    Its two substitutions ([\n\r\t]+ then \s{2,}) are one pass: any whitespace run of two or
+    more, or a single newline / tab, becomes one space.
+    """
+    return text.str.replace(r"\s{2,}|[\n\r\t]", " ", regex=True).str.strip(STRIP_CHARS)
+
+
+def _extract(text, pattern):
+    """
+    Named groups of pattern as string columns; groups that are empty or did not take part in
+    the match come back missing. Runs Arrow's RE2 extract_regex when pyarrow is available
+    (pandas' own str.extract calls re.search once per row).
+    """
+    if pc is not None and STRING_DTYPE == 'string[pyarrow]':
+        matched = pc.extract_regex(pa.array(text.astype(STRING_DTYPE)), pattern)
+        groups = pd.DataFrame({
+            field.name: pd.array(pc.struct_field(matched, field.name), dtype=STRING_DTYPE)
+            for field in matched.type
+        }, index=text.index)
+    else:
+        groups = text.str.extract(pattern).astype(STRING_DTYPE)
+    return groups.apply(_blank_to_na)
+
+
+def _blank_to_na(text):
+    return text.mask(text.fillna('') == '')
+
+
+def _join_parts(*parts):
+    """Space-join string columns, skipping missing parts row by row."""
+    joined = pd.Series('', index=parts[0].index, dtype=STRING_DTYPE)
+    for part in parts:
+        part = part.fillna('')
+        joined = joined + (' ' + part).where(part != '', '')
+    return _blank_to_na(normalize_spaces(joined))
+
+
+def street_blocks(street):
+    """Block / house number leading each street line ('Blk 498B Tampines ...' -> '498B')."""
+    return _extract(street.astype(STRING_DTYPE), BLOCK_PATTERN)['block'].str.upper()
+
+
+def parse_addresses(addresses, fallback=None):
+    """
+    Split Singapore address text into street, unit, block and postal code for a whole column.
+
+    Produces the same street / unit / postal_code / address_clean as the per-row split_address_sg
+    the Optimizing_Apify notebook used, with whole-column regex passes (postal, each unit pattern
+    on the rows still unmatched, block) instead of Python regex calls per row:
+      - postal_code: the last 6-digit group (an optional "Singapore" before it is dropped)
+      - unit: '#02-05', 'Unit 02-05' or 'Unit 5A', returned as '02-05' / '5A'
+      - street: what is left, title-cased unless it was all upper case
+      - block: the block / house number leading the street ('123A'); street keeps it
+
+    fallback is an optional frame on the same index with ACRA STREET_NAME / POSTAL_CODE columns;
+    they fill the street and postal code where the text yields none. address_source records which
+    rows used it: 'scraped', 'acra', 'scraped+acra', or None when there is no address at all.
+    """
+    if not isinstance(addresses, pd.Series):
+        addresses = pd.Series(addresses, dtype=object)
+    # Work on positions so duplicate index labels in the caller's frame cannot collide
+    original_index = addresses.index
+    values = addresses.astype(object).reset_index(drop=True)
+    if pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+        is_text = values.notna()
+    else:
+        is_text = values.map(lambda v: isinstance(v, str)).astype(bool)
+    raw = normalize_spaces(values.where(is_text, '').astype(str).astype(STRING_DTYPE))
+
+    # Postal code: cut the last match out, then drop the remaining "Singapore" words
+    postal = _extract(raw, POSTAL_SPLIT_PATTERN)
+    has_postal = postal['postal'].notna()
+    text = (postal['before'].fillna('') + postal['after'].fillna('')).where(has_postal, raw)
+    text = text.str.replace(SINGAPORE_WORD_PATTERN, '', regex=True).where(has_postal, text)
+    text = normalize_spaces(text)
+
+    # Unit: each pattern only sees the rows no earlier pattern matched; the match is cut out of the text
+    unit_raw = pd.Series(pd.NA, index=text.index, dtype=STRING_DTYPE)
+    for pattern in UNIT_EXTRACT_PATTERNS:
+        pending = unit_raw.isna()
+        if not pending.any():
+            break
+        found = _extract(text[pending], pattern)['unit']
+        found = found[found.notna()]
+        unit_raw[found.index] = found
+        text[found.index] = text[found.index].str.replace(pattern, '', n=1, regex=True)
+    has_unit = unit_raw.notna()
+    text = normalize_spaces(text)
+
+    unit = normalize_spaces(unit_raw.fillna('').str.replace(UNIT_PREFIX_PATTERN, '', regex=True))
+    unit = (unit.str.replace(' – ', '-', regex=False).str.replace('–', '-', regex=False)
+            .str.replace(' ', '', regex=False).str.lstrip('#'))
+    unit = _blank_to_na(unit.where(has_unit, ''))
+
+    street = normalize_spaces(text.str.replace(SINGAPORE_WORD_PATTERN, '', regex=True))
+    street = street.str.replace(r"\s*,\s*", ", ", regex=True)
+    street = _blank_to_na(street.where(street.str.isupper(), street.str.title()))
+    postal_code = postal['postal'].astype(STRING_DTYPE)
+
+    source = pd.Series(None, index=values.index, dtype=object)
+    source[street.notna() | postal_code.notna()] = 'scraped'
+    if fallback is not None:
+        if not fallback.index.equals(original_index):
+            fallback = fallback.reindex(original_index)
+        fallback = fallback.reset_index(drop=True)
+        acra_street = _blank_to_na(fallback['STREET_NAME'].astype(STRING_DTYPE))
+        acra_postal = _blank_to_na(fallback['POSTAL_CODE'].astype(STRING_DTYPE))
+        filled = (street.isna() & acra_street.notna()) | (postal_code.isna() & acra_postal.notna())
+        scraped = source.notna()
+        street = street.fillna(acra_street)
+        postal_code = postal_code.fillna(acra_postal)
+        source[filled & scraped] = 'scraped+acra'
+        source[filled & ~scraped] = 'acra'
+
+    block = street_blocks(street)
+    postal_part = ('Singapore ' + postal_code).fillna('')
+    address_clean = _join_parts(street, unit, postal_part)
+
+    parsed = pd.DataFrame({
+        'street': street, 'unit': unit, 'block': block, 'postal_code': postal_code,
+        'address_clean': address_clean, 'address_source': source,
+    }, index=values.index)
+    parsed = parsed.astype(object)
+    parsed = parsed.where(parsed.notna(), None)
+    parsed.index = original_index
+    return parsed
+
+
+def add_operational_address_columns(df, address_column='address', acra=None, uen_column='UEN', drop_address=True):
+    """
+    Replace the scraped address text column with the operational_* address columns.
+
+    The ACRA fallback comes from the frame's own STREET_NAME / POSTAL_CODE columns when it
+    carries them (Bronze leads do), else from acra (an ACRA frame with UEN, STREET_NAME and
+    POSTAL_CODE, e.g. load_acra_data) joined on uen_column. Rows merged back from an earlier
+    run (no address text, operational_address already set) keep their operational_* values.
+    """
+    if address_column not in df.columns:
+        raise ValueError(f"Column '{address_column}' not found. Run the scraping step first.")
+
+    fallback = None
+    if {'STREET_NAME', 'POSTAL_CODE'}.issubset(df.columns):
+        fallback = df[['STREET_NAME', 'POSTAL_CODE']]
+    elif acra is not None and uen_column in df.columns:
+        lookup = acra.drop_duplicates('UEN').set_index('UEN')[['STREET_NAME', 'POSTAL_CODE']]
+        fallback = lookup.reindex(df[uen_column].astype(object).to_numpy())
+        fallback.index = df.index
+
+    parsed = parse_addresses(df[address_column], fallback)
+    if 'operational_address' in df.columns:
+        previous = (df[address_column].isna() & df['operational_address'].notna()).to_numpy()
+        for column, target in OPERATIONAL_COLUMNS.items():
+            if target in df.columns:
+                parsed.loc[previous, column] = df[target].to_numpy()[previous]
+        if 'operational_block' not in df.columns:
+            parsed.loc[previous, 'block'] = street_blocks(parsed.loc[previous, 'street']).astype(object).to_numpy()
+        parsed.loc[previous, 'address_source'] = 'previous'
+    parsed = parsed.where(parsed.notna(), None)
+
+    result = df.drop(columns=[address_column]) if drop_address else df.copy()
+    for column, target in OPERATIONAL_COLUMNS.items():
+        result[target] = parsed[column]
+
+    counts = parsed['address_source'].value_counts()
+    print(f"🏠 Parsed {len(parsed):,} addresses: {counts.get('scraped', 0):,} from the page, "
+          f"{counts.get('scraped+acra', 0):,} completed from ACRA, {counts.get('acra', 0):,} ACRA only, "
+          f"{counts.get('previous', 0):,} kept from earlier runs, "
+          f"{int(parsed['address_source'].isna().sum()):,} without an address")
+    return result
+
+
+def benchmark_parse_addresses(n=100_000, seed=0, baseline_sample=20_000):
+    """
+    Micro-benchmark: parse n synthetic RecordOwl-style addresses and report throughput, next to
+    the notebook's per-row split_address_sg measured on a sample and scaled up.
+    """
+    rng = np.random.default_rng(seed)
+    streets = np.array([
+        '237 ALEXANDRA ROAD THE ALEXCIER', '414 Ang Mo Kio Avenue 10', 'Blk 498B Tampines Street 45',
+        '60 JALAN LAM HUAT, CARROS CENTRE', '1 Kaki Bukit Avenue 6 Autobay @ Kaki Bukit', '20 Changi North Crescent',
+    ])
+    street = streets[rng.integers(0, len(streets), size=n)]
+    unit = np.char.add(np.char.add(rng.integers(1, 20, size=n).astype(str), '-'), rng.integers(1, 999, size=n).astype(str))
+    postal = np.char.zfill(rng.integers(10000, 829999, size=n).astype(str), 6)
+    formats = rng.integers(0, 5, size=n)
+
+    values = np.char.add(np.char.add(np.char.add(street, ' #'), unit), np.char.add(' Singapore ', postal))
+    values = np.where(formats == 1, np.char.add(np.char.add(np.char.add(street, ', Unit '), unit), np.char.add(', SINGAPORE ', postal)), values)
+    values = np.where(formats == 2, np.char.add(np.char.add(street, '\n'), postal), values)
+    values = np.where(formats == 3, np.char.add(street, ' Singapore'), values)
+    values = np.where(formats == 4, '', values)
+    series = pd.Series(values, dtype=object)
+
+    start = time.perf_counter()
+    parse_addresses(series)
+    vectorized_secs = time.perf_counter() - start
+
+    postal_re = re.compile(POSTAL_PATTERN + r"(?!\d)", re.IGNORECASE)
+    unit_res = [re.compile(pattern, re.IGNORECASE) for pattern in UNIT_PATTERNS]
+
+    def normalize_row(text):
+        text = re.sub(r"[\n\r\t]+", " ", text)
+        text = re.sub(r"\s{2,}", " ", text)
+        return text.strip(STRIP_CHARS)
+
+    def per_row(address):
+        if not address.strip():
+            return None
+        text = normalize_row(address)
+        matches = list(postal_re.finditer(text))
+        if matches:
+            start, end = matches[-1].span()
+            text = re.sub(r"\bSingapore\b", "", text[:start] + text[end:], flags=re.IGNORECASE)
+        text = normalize_row(text)
+        for rx in unit_res:
+            m = rx.search(text)
+            if m:
+                text = normalize_row(text[:m.start()] + text[m.end():])
+                break
+        text = normalize_row(re.sub(r"\bSingapore\b", "", text, flags=re.IGNORECASE))
+        text = re.sub(r"\s*,\s*", ", ", text)
+        return text if text.isupper() else text.title()
+
+    sample = series.iloc[:baseline_sample]
+    start = time.perf_counter()
+    sample.map(per_row)
+    per_row_secs = (time.perf_counter() - start) * n / len(sample)
+
+    print(f"🏠 Parsed {n:,} addresses in {vectorized_secs:.2f}s ({n / vectorized_secs:,.0f} rows/s)")
+    print(f"   • Per-row baseline (scaled from {len(sample):,}): {per_row_secs:.2f}s "
+          f"-> {per_row_secs / vectorized_secs:.1f}x speed-up")
+    return {'rows': n, 'vectorized_secs': vectorized_secs, 'per_row_secs': per_row_secs}
@@ -1,154 +1,481 @@
 
 import pandas as pd
 import time
+import os
+import sqlite3
+import json
+import glob
+import shutil
+import hashlib
+import tempfile
+from collections import deque
 from fuzzywuzzy import fuzz, process
 import re
-from apify_client import ApifyClient
 import requests
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from Phone_Number_Functions import normalize_singapore_phones, BANNED_COUNTRY_CODES
+from Website_Static_Functions import scrape_websites_static
+from Pipeline_Metrics_Functions import RunMetrics, METRICS_PATH
+from Batch_Planner_Functions import plan_batches, describe_plan, load_metrics_events, stage_pass_rates
+from Outbound_Http_Functions import OutboundHttpClient, CircuitOpenError
+from Lead_Dedup_Functions import LeadDedupEngine, LeadRegistry
+from Scraper_Backend_Functions import (
+    ApifyBackend, LocalApifyBackend, FACEBOOK_ACTOR_ID, WEBSITE_ACTOR_ID, TERMINAL_RUN_STATUSES, FAILED_RUN_STATUSES
+)
 
 
-def Get_Phone_Number_From_Facebook(df):
+VERIFICATION_CACHE_PATH = os.path.join("Staging", "Cache", "url_verification.sqlite")
+SCRAPE_CACHE_PATH = os.path.join("Staging", "Cache", "scrape_results.sqlite")
+CHECKPOINT_DIR = os.path.join("Staging", "Checkpoints")
 
-    facebook_only_df = df.copy()
-    facebook_only_df = facebook_only_df[facebook_only_df["Facebook"].notna()]
 
-    def clean_facebook(x):
-        if isinstance(x, list):
-            return x[0] if len(x) > 0 else None
-        elif pd.isna(x):
-            return None
-        else:
-            return x
+def normalize_scrape_url(url):
+    """Normalize a scraped page URL into a match/cache key: lowercase, stripped, no trailing slash."""
+    return str(url).lower().strip().rstrip('/')
 
-    facebook_only_df["Facebook"] = facebook_only_df["Facebook"].apply(clean_facebook)
-    facebook_only_df = facebook_only_df[facebook_only_df["Facebook"].notna() & (facebook_only_df["Facebook"] != "")]
 
-    client = ApifyClient("apify_api_gak2ulhepgd4uzBseSLQtiHnb9KGxy3iMwp2")
+class ScrapeResultCache:
+    """
+    On-disk SQLite store of Apify scrape results keyed by (source, normalized URL).
+    Holds the scraped items and the extracted phones so a URL is only re-scraped once its entry expires.
+    Entries without phones expire sooner, since the page may have been updated.
+    """
 
-    BATCH_SIZE = 100
-    MAX_CONCURRENCY = 3
+    def __init__(self, path=SCRAPE_CACHE_PATH, ttl_days=30, empty_ttl_days=7):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.empty_ttl = empty_ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_results (
+                source TEXT NOT NULL,
+                url_key TEXT NOT NULL,
+                items TEXT NOT NULL,
+                phones TEXT NOT NULL,
+                scraped_at REAL NOT NULL,
+                PRIMARY KEY (source, url_key)
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, source, url):
+        """Return {'items': [...], 'phones': [...]} for a fresh entry, or None if missing or expired."""
+        row = self.conn.execute(
+            "SELECT items, phones, scraped_at FROM scrape_results WHERE source = ? AND url_key = ?",
+            (source, normalize_scrape_url(url))
+        ).fetchone()
+
+        if row:
+            items, phones, scraped_at = row
+            phones = json.loads(phones)
+            ttl = self.ttl if phones else self.empty_ttl
+            if time.time() - scraped_at < ttl:
+                self.hits += 1
+                return {'items': json.loads(items), 'phones': phones}
+
+        self.misses += 1
+        return None
 
-    def validate_singapore_number(phone):
-        """Validates and standardizes Singapore phone numbers."""
-        if not phone:
-            return None
-        cleaned = re.sub(r'[\s\-\(\)\.\|/]', '', str(phone))
-        if cleaned.startswith('+'):
-            cleaned = cleaned[1:]
-        if cleaned.startswith('65'):
-            number_part = cleaned[2:]
-            if re.match(r'^[689]\d{7}$', number_part):
-                return f"+65{number_part}"
-        elif re.match(r'^[689]\d{7}$', cleaned):
-            return f"+65{cleaned}"
+    def set(self, source, url, items, phones):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO scrape_results (source, url_key, items, phones, scraped_at) VALUES (?, ?, ?, ?, ?)",
+            (source, normalize_scrape_url(url), json.dumps(items, default=str), json.dumps(phones or []), time.time())
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+# Only these dataset fields are ever read back from the actors
+FACEBOOK_ITEM_FIELDS = ['facebookUrl', 'url', 'pageUrl', 'phone', 'wa_number', 'mobile']
+WEBSITE_ITEM_FIELDS = ['website', 'phones', 'contactUrl', 'pageType', 'status', 'error',
+                       'bytes', 'blockedRequests', 'latencyMs']
+
+# Requests the website actor aborts before they reach the (metered) residential proxy
+BLOCKED_RESOURCE_TYPES = ['image', 'media', 'font', 'stylesheet']
+BLOCKED_TRACKER_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'facebook.net', 'hotjar.com', 'clarity.ms', 'segment.io', 'segment.com',
+    'mixpanel.com', 'analytics.tiktok.com', 'snap.licdn.com', 'ads.linkedin.com', 'bat.bing.com',
+    'mc.yandex.ru', 'nr-data.net', 'fullstory.com', 'quantserve.com', 'scorecardresearch.com',
+]
+
+
+def compact_facebook_item(item):
+    """Reduce a Facebook page item to {'facebookUrl', 'phone'}; None if the item has no page URL."""
+    fb_url = item.get('facebookUrl') or item.get('url') or item.get('pageUrl')
+    if not fb_url:
+        return None
+    return {
+        'facebookUrl': fb_url,
+        'phone': item.get('phone', None) or item.get('wa_number', None) or item.get('mobile', None)
+    }
+
+
+def compact_website_item(item):
+    """Reduce a pageFunction result to the fields the merge uses; None if it has no website."""
+    if not item or not item.get('website'):
         return None
+    return {field: item.get(field) for field in WEBSITE_ITEM_FIELDS}
 
 
-    def run_facebook_scraper_batch(client, facebook_urls_batch):
-        """Run Apify Facebook scraper for a batch of URLs."""
+class DatasetStreamError(Exception):
+    """Raised when reading an actor's dataset fails part-way through."""
 
-        run_input = {
-            "pages": facebook_urls_batch,
-            "language": "en-US",
-        }
 
-        try:
-            run = client.actor("oJ48ceKNY7ueGPGL0").call(run_input=run_input)
+def stream_dataset_items(backend, dataset_id, fields=None, reduce_item=None):
+    """
+    Yield dataset items one page at a time, projected to fields and reduced by reduce_item on arrival.
+    Items reduced to None are dropped, so only compact records are ever held by the caller.
+    """
+    try:
+        for item in backend.iterate_items(dataset_id, fields=fields):
+            record = reduce_item(item) if reduce_item else item
+            if record is not None:
+                yield record
+    except Exception as e:
+        raise DatasetStreamError(f"Error reading dataset: {type(e).__name__}: {str(e)}") from e
 
-            results = []
-            for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-                results.append(item)
 
-            return results, None
+def run_actor_batches_in_parallel(backend, actor_id, batches, build_run_input, on_batch_done,
+                                  max_parallel_runs=3, run_memory_mbytes=None, account_memory_mbytes=None,
+                                  poll_interval=5, item_fields=None, reduce_item=None, metrics=None, stage='scrape'):
+    """
+    Keep up to max_parallel_runs actor runs in flight, starting a new batch as soon as a run finishes.
 
-        except Exception as e:
-            return [], str(e)
+    Runs are started with backend.start_run() and polled, so total latency is bounded by the slowest batches
+    rather than the sum of all of them. When both run_memory_mbytes and account_memory_mbytes are
+    given, the number of runs in flight is also capped by the account memory budget.
 
+    on_batch_done(batch_index, items, error, run_info) is called in completion order, one batch at a time.
+    items is a lazy stream of records (see stream_dataset_items): fold it into local state before
+    touching shared results, since a read failure part-way through re-invokes the callback with the error.
 
-    if len(facebook_only_df) > 0:
-        print(f"Processing {len(facebook_only_df)} Facebook pages...")
+    With metrics (a RunMetrics), every batch is recorded under stage with its actor run id, status,
+    duration on the backend's clock and the usage Apify reports.
+    """
+    say = metrics.say if metrics else print
 
-        total_phones_found = 0
-        total_rows = len(facebook_only_df)
-        num_batches = (total_rows + BATCH_SIZE - 1) // BATCH_SIZE
+    def finish(batch_index, items, error, run_info):
+        started = started_at.pop(batch_index, None)
+        try:
+            on_batch_done(batch_index, items, error, run_info)
+        except DatasetStreamError as e:
+            error = str(e)
+            on_batch_done(batch_index, [], error, run_info)
+        if metrics:
+            secs = backend.now() - started if started is not None else None
+            metrics.batch(stage, batch_index, len(batches[batch_index]), secs, run_info, error)
+
+    if run_memory_mbytes and account_memory_mbytes:
+        max_parallel_runs = max(1, min(max_parallel_runs, account_memory_mbytes // run_memory_mbytes))
+
+    pending = deque(enumerate(batches))
+    in_flight = {}
+    started_at = {}
+
+    while pending or in_flight:
+        # Fill free slots
+        while pending and len(in_flight) < max_parallel_runs:
+            batch_index, batch = pending.popleft()
+            try:
+                run = backend.start_run(actor_id, build_run_input(batch), memory_mbytes=run_memory_mbytes)
+            except Exception as e:
+                if in_flight:
+                    # Most likely the account memory/concurrency limit: retry once a slot frees up
+                    pending.appendleft((batch_index, batch))
+                    break
+                finish(batch_index, [], f"Error starting actor run: {type(e).__name__}: {str(e)}", None)
+                continue
 
-        for batch_idx in range(0, total_rows, BATCH_SIZE):
-            batch = facebook_only_df.iloc[batch_idx:batch_idx + BATCH_SIZE]
-            facebook_urls = [str(row['Facebook']).strip() for _, row in batch.iterrows()]
-            batch_indices = list(batch.index)
+            if not run or not isinstance(run, dict) or 'id' not in run:
+                finish(batch_index, [], f"API returned invalid response: {run}", None)
+                continue
 
-            print(f"Batch {(batch_idx//BATCH_SIZE)+1}/{num_batches}...")
+            say(f"  🚀 Started batch {batch_index + 1}/{len(batches)} - Run ID: {run['id']}", 'debug')
+            in_flight[run['id']] = batch_index
+            started_at[batch_index] = backend.now()
 
-            # Remove duplicates while preserving order and tracking original indices
-            unique_urls = []
-            seen = set()
-            for url in facebook_urls:
-                if url not in seen:
-                    unique_urls.append(url)
-                    seen.add(url)
+        if not in_flight:
+            continue
 
-            print(f"  Original URLs: {len(facebook_urls)}, Unique URLs: {len(unique_urls)}")
+        backend.wait(poll_interval)
 
-            items, error = run_facebook_scraper_batch(client, unique_urls)
+        for run_id in list(in_flight):
+            try:
+                run_info = backend.get_run(run_id)
+            except Exception as e:
+                say(f"  ⚠️  Could not poll run {run_id}: {type(e).__name__}", 'warning')
+                continue
 
-            if error:
-                print(f"  ERROR: {error}")
-                for idx in batch_indices:
-                    facebook_only_df.loc[idx, 'Phones'] = None
+            status = (run_info or {}).get('status', 'UNKNOWN')
+            if status not in TERMINAL_RUN_STATUSES:
                 continue
 
-            print(f"  Retrieved {len(items)} results from Apify")
-            if len(items) > 0:
-                print(f"  Sample item keys: {list(items[0].keys())[:10]}")
+            batch_index = in_flight.pop(run_id)
+            say(f"  📊 Batch {batch_index + 1}/{len(batches)} - Run {run_id}: {status}")
 
-            url_to_item = {}
-            for item in items:
-                fb_url = item.get('facebookUrl') or item.get('url') or item.get('pageUrl')
-                if fb_url:
-                    normalized_url = fb_url.lower().strip().rstrip('/')
-                    url_to_item[normalized_url] = item
+            if status in FAILED_RUN_STATUSES:
+                error_detail = run_info.get('statusMessage', 'No error details')
+                finish(batch_index, [], f"Actor run {status}: {error_detail}", run_info)
+                continue
+
+            items = stream_dataset_items(backend, run_info["defaultDatasetId"], item_fields, reduce_item)
+            finish(batch_index, items, None, run_info)
 
-            for idx, row in batch.iterrows():
-                original_url = str(row['Facebook']).strip()
-                normalized_search = original_url.lower().strip().rstrip('/')
 
-                item = url_to_item.get(normalized_search)
+def get_checkpoint_dir(kind, urls, base_dir=CHECKPOINT_DIR):
+    """Checkpoint folder for one enrichment input, identified by a hash of its ordered URL list."""
+    digest = hashlib.sha1("\n".join(str(url) for url in urls).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(base_dir, f"{kind}_{digest}")
 
-                if item:
-                    raw_phone = item.get('phone', None) or item.get('wa_number', None) or item.get('mobile', None)
-                    print(f"  DEBUG: URL {original_url[:40]}... | raw_phone={raw_phone}")
-                    phone = validate_singapore_number(raw_phone)
 
-                    if phone:
-                        facebook_only_df.loc[idx, 'Phones'] = phone
-                        total_phones_found += 1
-                    else:
-                        facebook_only_df.loc[idx, 'Phones'] = None
-                else:
-                    facebook_only_df.loc[idx, 'Phones'] = None
+def load_checkpoint(checkpoint_dir):
+    """Load every completed batch part-file of a checkpoint folder (empty DataFrame if none)."""
+    part_files = sorted(glob.glob(os.path.join(checkpoint_dir, "batch_*.parquet")))
+    if not part_files:
+        return pd.DataFrame()
+    return pd.concat((pd.read_parquet(f) for f in part_files), ignore_index=True)
 
-            if batch_idx + BATCH_SIZE < total_rows:
-                time.sleep(3)
 
-        print(f"Done! Found {total_phones_found}/{total_rows} phone numbers.")
+def write_checkpoint_part(checkpoint_dir, run_stamp, batch_index, records):
+    """Persist the results of one finished batch as its own parquet part-file."""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    part_path = os.path.join(checkpoint_dir, f"batch_{run_stamp}_{batch_index + 1:05d}.parquet")
+    tmp_path = part_path + ".tmp"
+    # Write then rename so a crash mid-write never leaves a half-written part behind
+    pd.DataFrame(records).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, part_path)
 
-    df_with_phones = facebook_only_df[facebook_only_df["Phones"].notna()]
-    df_without_phones = facebook_only_df[facebook_only_df["Phones"].isna()]
 
-    final_df_1 = df_with_phones[df_with_phones["Phones"].duplicated(keep=False) == False]
-    refilter_df_1 = df_with_phones[df_with_phones["Phones"].duplicated(keep=False) == True]
+def clear_checkpoint(checkpoint_dir):
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
 
-    df_without_phones_2 = pd.concat([refilter_df_1, df_without_phones], ignore_index=True)
+
+def Get_Phone_Number_From_Facebook(df, scrape_cache_path=SCRAPE_CACHE_PATH, use_scrape_cache=True,
+                                   max_parallel_runs=3, run_memory_mbytes=None, account_memory_mbytes=None,
+                                   checkpoint_dir=CHECKPOINT_DIR, resume=True, backend=None, poll_interval=5,
+                                   metrics=None, verbosity='info', auto_plan=False, target_secs=None, cu_budget=None,
+                                   dedup_engine=None, industry='Facebook'):
+    """
+    Scrape a phone for every lead with a Facebook page and split the leads through
+    LeadDedupEngine.process_batch. Returns (accepted, rejected): rejected holds the leads without
+    a UEN or phone and those sharing a phone (or UEN) within the batch, with a 'Reject Reason'.
+    The default engine checks the batch against an in-memory registry only; pass a persistent
+    LeadDedupEngine (with require_phone=True) to also reject leads already in the Data Lake.
+    """
+
+    # Progress goes through metrics.say (verbosity: quiet / info / debug); timings go to the metrics log
+    owns_metrics = metrics is None
+    metrics = metrics or RunMetrics('facebook', verbosity=verbosity)
+    say = metrics.say
+
+    facebook_only_df = df.copy()
+    facebook_only_df = facebook_only_df[facebook_only_df["Facebook"].notna()]
+
+    def clean_facebook(x):
+        if isinstance(x, list):
+            return x[0] if len(x) > 0 else None
+        elif pd.isna(x):
+            return None
+        else:
+            return x
+
+    facebook_only_df["Facebook"] = facebook_only_df["Facebook"].apply(clean_facebook)
+    facebook_only_df = facebook_only_df[facebook_only_df["Facebook"].notna() & (facebook_only_df["Facebook"] != "")]
+
+    # Any ScrapeBackend works here; LocalApifyBackend runs the whole flow offline
+    backend = backend or ApifyBackend()
+
+    BATCH_SIZE = 100
+    MAX_CONCURRENCY = 3
+
+    def build_facebook_run_input(facebook_urls_batch):
+        """Apify Facebook scraper input for a batch of URLs."""
+        return {
+            "pages": facebook_urls_batch,
+            "language": "en-US",
+        }
+
+
+    # Normalized URL key column used for dedup, resume, cache lookups and the final join
+    facebook_only_df['_fb_url'] = facebook_only_df['Facebook'].astype(str).str.strip()
+    facebook_only_df['_fb_key'] = facebook_only_df['_fb_url'].str.lower().str.rstrip('/')
+
+    # Validated phone (or None) for every URL key resolved by this run
+    url_phones = {}
+    scrape_cache = ScrapeResultCache(scrape_cache_path) if use_scrape_cache else None
+
+    # Resume from the batches a previous (interrupted) run on the same input already finished
+    run_checkpoint_dir = get_checkpoint_dir("facebook", facebook_only_df['_fb_url'].tolist(), checkpoint_dir)
+    run_stamp = time.strftime("%Y%m%d%H%M%S")
+    batch_errors = 0
+
+    metrics.begin('checkpoint')
+    checkpoint = load_checkpoint(run_checkpoint_dir) if resume else pd.DataFrame()
+    if len(checkpoint) > 0:
+        checkpoint_keys = checkpoint['Facebook'].astype(str).str.strip().str.lower().str.rstrip('/')
+        url_phones.update(zip(checkpoint_keys, checkpoint['Phones'].astype(object).where(checkpoint['Phones'].notna(), None)))
+        say(f"Checkpoint: resumed {int(facebook_only_df['_fb_key'].isin(url_phones).sum())} rows from {run_checkpoint_dir}")
+
+    # One entry per distinct page still to resolve
+    pending_pages = facebook_only_df.drop_duplicates(subset='_fb_key')
+    metrics.end('checkpoint', urls_in=len(pending_pages), urls_out=int((~pending_pages['_fb_key'].isin(url_phones)).sum()))
+    pending_pages = pending_pages[~pending_pages['_fb_key'].isin(url_phones)]
+
+    # Serve previously scraped pages from the cache, only batch the rest into actor runs
+    metrics.begin('scrape_cache')
+    urls_before_cache = len(pending_pages)
+    if scrape_cache and len(pending_pages) > 0:
+        cached_keys = set()
+        for url, key in zip(pending_pages['_fb_url'], pending_pages['_fb_key']):
+            cached = scrape_cache.get('facebook', url)
+            if cached:
+                url_phones[key] = cached['phones'][0] if cached['phones'] else None
+                cached_keys.add(key)
+        pending_pages = pending_pages[~pending_pages['_fb_key'].isin(cached_keys)]
+        say(f"Scrape cache: {int(facebook_only_df['_fb_key'].isin(cached_keys).sum())} rows served from cache, "
+              f"{len(pending_pages)} pages to scrape")
+    metrics.end('scrape_cache', urls_in=urls_before_cache, urls_out=len(pending_pages),
+                hits=urls_before_cache - len(pending_pages))
+
+    metrics.begin('scrape')
+    if len(pending_pages) > 0:
+        rows_to_scrape = facebook_only_df['_fb_key'].isin(pending_pages['_fb_key'])
+        total_rows = int(rows_to_scrape.sum())
+        say(f"Processing {total_rows} Facebook rows ({len(pending_pages)} unique pages)...")
+
+        pending_urls = pending_pages['_fb_url'].tolist()
+
+        # Size batches from the recorded run history instead of the constant above
+        scrape_memory_mbytes = run_memory_mbytes
+        planned = auto_plan or target_secs is not None or cu_budget is not None
+        if planned:
+            plan = plan_batches(len(pending_urls), 'facebook', metrics_path=metrics.metrics_path,
+                                target_secs=target_secs, cu_budget=cu_budget, max_parallel_runs=max_parallel_runs,
+                                run_memory_mbytes=run_memory_mbytes, account_memory_mbytes=account_memory_mbytes)
+            BATCH_SIZE = plan['batch_size']
+            scrape_memory_mbytes = plan['memory_mbytes']
+            for line in describe_plan(plan):
+                say(line)
+        metrics.emit('plan', stage='scrape', urls=len(pending_urls), planned=planned, batch_size=BATCH_SIZE,
+                     max_concurrency=1, memory_mbytes=scrape_memory_mbytes)
+        batch_urls = [pending_urls[i:i + BATCH_SIZE] for i in range(0, len(pending_urls), BATCH_SIZE)]
+
+        num_batches = len(batch_urls)
+        say(f"Submitting {num_batches} batches, up to {max_parallel_runs} actor runs in parallel...")
+
+        def handle_batch(batch_index, items, error, run_info):
+            nonlocal batch_errors
+            unique_urls = batch_urls[batch_index]
+
+            say(f"Batch {batch_index + 1}/{num_batches}... ({len(unique_urls)} unique URLs)")
+
+            if error:
+                batch_errors += 1
+                say(f"  ERROR: {error}", 'error')
+                return
+
+            # Fold the compact records straight into the per-URL map
+            url_to_item = {}
+            for item in items:
+                url_to_item[normalize_scrape_url(item['facebookUrl'])] = item
+
+            say(f"  Retrieved {len(url_to_item)} results from {backend.name}", 'debug')
+
+            # Join items onto the batch by normalized URL and validate all phones at once
+            batch_df = pd.DataFrame({'Facebook': unique_urls})
+            batch_df['_fb_key'] = batch_df['Facebook'].str.lower().str.rstrip('/')
+            batch_df['raw_phone'] = batch_df['_fb_key'].map(
+                {key: item['phone'] for key, item in url_to_item.items()}
+            )
+            batch_df['Phones'] = normalize_singapore_phones(batch_df['raw_phone'])
+
+            for url, raw_phone in zip(batch_df['Facebook'], batch_df['raw_phone']):
+                if raw_phone is not None and not pd.isna(raw_phone):
+                    say(f"  URL {url[:40]}... | raw_phone={raw_phone}", 'debug')
+
+            url_phones.update(zip(batch_df['_fb_key'], batch_df['Phones']))
+
+            # Remember every URL of this successful batch, including pages that returned nothing
+            write_checkpoint_part(run_checkpoint_dir, run_stamp, batch_index, batch_df[['Facebook', 'Phones']])
+            if scrape_cache:
+                for url, key, phone in zip(batch_df['Facebook'], batch_df['_fb_key'], batch_df['Phones']):
+                    item = url_to_item.get(key)
+                    scrape_cache.set('facebook', url, [item] if item else [], [phone] if phone else [])
+                scrape_cache.commit()
+
+        run_actor_batches_in_parallel(
+            backend,
+            FACEBOOK_ACTOR_ID,
+            batch_urls,
+            build_facebook_run_input,
+            handle_batch,
+            max_parallel_runs=max_parallel_runs,
+            run_memory_mbytes=scrape_memory_mbytes,
+            account_memory_mbytes=account_memory_mbytes,
+            poll_interval=poll_interval,
+            item_fields=FACEBOOK_ITEM_FIELDS,
+            reduce_item=compact_facebook_item,
+            metrics=metrics
+        )
+
+        scraped_phones = facebook_only_df.loc[rows_to_scrape, '_fb_key'].map(url_phones)
+        say(f"Done! Found {int(scraped_phones.notna().sum())}/{total_rows} phone numbers.")
+    metrics.end('scrape', urls_in=len(pending_pages),
+                urls_out=int(pending_pages['_fb_key'].map(url_phones).notna().sum()), batch_errors=batch_errors)
+
+    # Keep the checkpoint while failed batches remain so a re-run only retries those
+    if batch_errors == 0:
+        clear_checkpoint(run_checkpoint_dir)
+    else:
+        say(f"Checkpoint kept at {run_checkpoint_dir} ({batch_errors} failed batches) - re-run to resume")
+
+    if scrape_cache:
+        say(f"Scrape cache: {scrape_cache.hits} hits, {scrape_cache.misses} misses")
+        scrape_cache.close()
+
+    # Hash join of resolved phones back onto every row sharing the page
+    metrics.begin('merge')
+    phones = facebook_only_df['_fb_key'].map(url_phones).astype(object)
+    facebook_only_df['Phones'] = phones.where(phones.notna(), None)
+    facebook_only_df = facebook_only_df.drop(columns=['_fb_url', '_fb_key'])
+
+    metrics.end('merge', rows_in=len(facebook_only_df), rows_out=int(facebook_only_df['Phones'].notna().sum()))
+
+    # Leads sharing a phone (after normalization) or without one go back for another source
+    metrics.begin('dedup')
+    dedup_engine = dedup_engine or LeadDedupEngine(LeadRegistry(':memory:'), rules={'require_phone': True})
+    final_df_1, df_without_phones_2 = dedup_engine.process_batch(facebook_only_df, industry, say=say)
+    metrics.end('dedup', rows_in=len(facebook_only_df), rows_out=len(final_df_1))
+
+    if owns_metrics:
+        metrics.close()
+        say(f"📈 Metrics for run {metrics.run_id} written to {metrics.metrics_path}")
 
     return final_df_1, df_without_phones_2
 
 
-def verify_website_accessibility(url, timeout=10):
+def verify_website_accessibility(url, timeout=10, session=None):
     """
     Verify if a website is accessible via HTTP/HTTPS.
+    Pass a shared requests.Session (or OutboundHttpClient) to reuse pooled connections across calls.
     Returns: ('yes', final_url) if accessible, ('no', error_reason) if not
     """
+    http = session if session is not None else requests
+
     if not url or pd.isna(url) or str(url).strip() == "":
         return ('no', 'Empty URL')
 
@@ -160,14 +487,14 @@ def verify_website_accessibility(url, timeout=10):
 
     try:
         # Try HTTPS first
-        response = requests.head(url, timeout=timeout, allow_redirects=True)
+        response = http.head(url, timeout=timeout, allow_redirects=True)
         if response.status_code < 400:
             return ('yes', response.url)
 
         # If HTTPS fails with 4xx/5xx, try HTTP
         if url.startswith('https://'):
             http_url = url.replace('https://', 'http://', 1)
-            response = requests.head(http_url, timeout=timeout, allow_redirects=True)
+            response = http.head(http_url, timeout=timeout, allow_redirects=True)
             if response.status_code < 400:
                 return ('yes', response.url)
 
@@ -178,13 +505,19 @@ def verify_website_accessibility(url, timeout=10):
         try:
             if url.startswith('https://'):
                 http_url = url.replace('https://', 'http://', 1)
-                response = requests.head(http_url, timeout=timeout, allow_redirects=True)
+                response = http.head(http_url, timeout=timeout, allow_redirects=True)
                 if response.status_code < 400:
                     return ('yes', response.url)
             return ('no', 'SSL Error')
+        except CircuitOpenError:
+            # The retry was refused by the breaker, not by the site: not a verdict worth caching
+            return ('no', 'Circuit Open - domain unresponsive')
         except Exception as e:
             return ('no', f'SSL Error: {str(e)[:50]}')
 
+    except CircuitOpenError:
+        return ('no', 'Circuit Open - domain unresponsive')
+
     except requests.exceptions.Timeout:
         return ('no', 'Timeout')
 
@@ -198,12 +531,226 @@ def verify_website_accessibility(url, timeout=10):
         return ('no', f'Error: {str(e)[:50]}')
 
 
-def Get_Phone_Number_From_Website(df):
+def create_verification_session(max_concurrency=32, per_host_connections=4):
+    """Build a requests.Session with a bounded, blocking connection pool per host."""
+    return OutboundHttpClient.create_session(max_concurrency, per_host_connections)
+
+
+def verify_websites_concurrently(urls, max_concurrency=32, per_host_connections=4, timeout=10, on_result=None,
+                                client=None):
+    """
+    Verify many websites in parallel with a global concurrency cap.
+    Probes go through an OutboundHttpClient (per-domain limits, circuit breakers, adaptive connect
+    timeouts with timeout as the ceiling); pass client to share one across stages, otherwise one is
+    built for this call. Each distinct URL is probed once; on_result(url, status, info) is called as
+    results arrive.
+    Returns: dict of url -> ('yes', final_url) / ('no', error_reason)
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    results = {}
+
+    if not unique_urls:
+        return results
+
+    owns_client = client is None
+    if owns_client:
+        client = OutboundHttpClient(max_concurrency=max_concurrency, per_domain_concurrency=per_host_connections,
+                                    max_timeout=timeout)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = {
+                executor.submit(verify_website_accessibility, url, timeout, client): url
+                for url in unique_urls
+            }
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    status, info = future.result()
+                except Exception as e:
+                    status, info = 'no', f'Error: {str(e)[:50]}'
+                results[url] = (status, info)
+                if on_result:
+                    on_result(url, status, info)
+    finally:
+        if owns_client:
+            client.close()
+
+    return results
+
+
+def normalize_website_url(url):
+    """Normalize a website URL into a cache key: stripped, lowercase, scheme added, no trailing slash."""
+    if url is None or pd.isna(url):
+        return None
+    key = str(url).strip().lower()
+    if not key:
+        return None
+    if not key.startswith(('http://', 'https://')):
+        key = 'https://' + key
+    return key.rstrip('/')
+
+
+# Websites never worth verifying or scraping: a host label in BLOCKED_WEBSITE_LABELS, or a host equal
+# to or under a BLOCKED_WEBSITE_DOMAINS entry (login-walled social pages are covered by the Facebook stage)
+BLOCKED_WEBSITE_LABELS = {'mycareersfuture', 'recordowl', 'bizfile'}
+BLOCKED_WEBSITE_DOMAINS = {'facebook.com', 'fb.com', 'instagram.com', 'linkedin.com'}
+
+# Paths that serve the site's homepage and collapse into the bare host key
+HOMEPAGE_PATHS = {'', '/home', '/index', '/index.html', '/index.htm', '/index.php', '/en', '/en-sg'}
+
+
+def parse_website(url):
+    """
+    Parse a raw Website value once into (site_key, block_reason).
+    site_key is the lowercase host without 'www.' (plus any port) followed by the path, ignoring scheme,
+    query, fragment, trailing slash and homepage paths, so 'https://www.Foo.sg/' and 'foo.sg/index.html'
+    share 'foo.sg' while directory listings keep their own path. block_reason is None for scrapeable sites.
+    """
+    if url is None or pd.isna(url) or not str(url).strip():
+        return None, 'Invalid URL'
+    text = str(url).strip()
+    if '://' not in text:
+        text = 'https://' + text
+    try:
+        parsed = urlparse(text)
+        host = (parsed.hostname or '').rstrip('.')
+        port = parsed.port
+    except ValueError:
+        return None, 'Invalid URL'
+    if not host:
+        return None, 'Invalid URL'
+    if host.startswith('www.'):
+        host = host[4:]
+
+    labels = host.split('.')
+    blocked_label = next((label for label in labels if label in BLOCKED_WEBSITE_LABELS), None)
+    if blocked_label:
+        return host, f'Skipped - keyword blocked: {blocked_label}'
+    for i in range(len(labels) - 1):
+        suffix = '.'.join(labels[i:])
+        if suffix in BLOCKED_WEBSITE_DOMAINS:
+            return host, f'Skipped - domain blocked: {suffix}'
+
+    path = parsed.path.rstrip('/').lower()
+    if path in HOMEPAGE_PATHS:
+        path = ''
+    return f"{host}:{port}{path}" if port else host + path, None
+
+
+def canonical_website_keys(websites):
+    """Site keys for a Website column (None where unparseable), parsing each distinct value once."""
+    websites = pd.Series(websites, dtype=object)
+    keys = {website: parse_website(website)[0] for website in websites.dropna().unique()}
+    return websites.map(keys)
+
+
+class UrlVerificationCache:
+    """
+    On-disk SQLite cache of verify_website_accessibility results keyed by normalized URL.
+    Accessible ('yes') and inaccessible ('no') results expire after separate TTLs.
+    """
+
+    def __init__(self, path=VERIFICATION_CACHE_PATH, positive_ttl_hours=24 * 7, negative_ttl_hours=24):
+        self.path = path
+        self.positive_ttl = positive_ttl_hours * 3600
+        self.negative_ttl = negative_ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS url_verification (
+                url_key TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                final_url TEXT,
+                failure_reason TEXT,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        """Return a cached ('yes'/'no', info) tuple, or None if missing or expired."""
+        key = normalize_website_url(url)
+        if key is None:
+            return None
+
+        row = self.conn.execute(
+            "SELECT status, final_url, failure_reason, checked_at FROM url_verification WHERE url_key = ?",
+            (key,)
+        ).fetchone()
+
+        if row:
+            status, final_url, failure_reason, checked_at = row
+            ttl = self.positive_ttl if status == 'yes' else self.negative_ttl
+            if time.time() - checked_at < ttl:
+                self.hits += 1
+                return (status, final_url if status == 'yes' else failure_reason)
+
+        self.misses += 1
+        return None
+
+    def set(self, url, status, info):
+        """Store a verification result; info is the final URL for 'yes' and the failure reason for 'no'."""
+        key = normalize_website_url(url)
+        if key is None:
+            return
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO url_verification (url_key, status, final_url, failure_reason, checked_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                key,
+                status,
+                info if status == 'yes' else None,
+                info if status != 'yes' else None,
+                time.time()
+            )
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def merge_website_results(leads_df, results_df):
+    """
+    Join the per-site Website_* result columns onto every lead whose Website has the same canonical
+    key. Results are deduplicated per key (last wins), so shared websites never multiply lead rows.
+    """
+    results = results_df.assign(Website_Key=canonical_website_keys(results_df['Website']))
+    results = results.dropna(subset=['Website_Key']).drop_duplicates('Website_Key', keep='last')
+    results = results.drop(columns='Website').set_index('Website_Key')
+    return leads_df.join(results, on=canonical_website_keys(leads_df['Website'])).reset_index(drop=True)
+
+
+def Get_Phone_Number_From_Website(df, verify_concurrency=32, verify_timeout=10,
+                                  verification_cache_path=VERIFICATION_CACHE_PATH, use_verification_cache=True,
+                                  scrape_cache_path=SCRAPE_CACHE_PATH, use_scrape_cache=True,
+                                  max_parallel_runs=3, run_memory_mbytes=None, account_memory_mbytes=None,
+                                  checkpoint_dir=CHECKPOINT_DIR, resume=True,
+                                  static_fast_path=True, static_concurrency=50, static_timeout=10,
+                                  backend=None, poll_interval=5, verify_websites=True, exhaustive=False,
+                                  metrics=None, verbosity='info', http_client=None,
+                                  auto_plan=False, target_secs=None, cu_budget=None):
+
+    # Progress goes through metrics.say (verbosity: quiet / info / debug); timings go to the metrics log
+    owns_metrics = metrics is None
+    metrics = metrics or RunMetrics('website', verbosity=verbosity)
+    say = metrics.say
 
     RecordOwl_Leads = df.copy()
 
-    # --- Initialize Apify client ---
-    client = ApifyClient("apify_api_gak2ulhepgd4uzBseSLQtiHnb9KGxy3iMwp2")
+    # --- Scraping backend (Apify by default; LocalApifyBackend runs the whole flow offline) ---
+    backend = backend or ApifyBackend()
 
     # COST-OPTIMIZED BATCH CONFIGURATION
     BATCH_SIZE = 100         # Increased batch size for fewer actor runs
@@ -212,9 +759,6 @@ def Get_Phone_Number_From_Website(df):
     PAGE_TIMEOUT = 15        # Reduced timeout from 30s
     FUNCTION_TIMEOUT = 30    # Reduced timeout from 60s
 
-    # Keywords to skip scraping
-    SKIP_KEYWORDS = ["mycareersfuture", "recordowl", "bizfile"]
-
     def create_website_scraper_pagefunction():
         """Optimized pageFunction for extracting phone numbers - extracts from current page then tries contact page"""
         return """
@@ -223,6 +767,8 @@ def Get_Phone_Number_From_Website(df):
         const website = request.url;
         const isContact = request.userData?.isContact || false;
         const isHomepage = request.userData?.isHomepage || false;
+        const exhaustive = (context.customData || {}).exhaustive || false;
+        const pageStats = page.__leadStats || { bytes: 0, blocked: 0, startedAt: Date.now() };
 
         log.info(`🔍 Scraping: ${website}`);
 
@@ -231,158 +777,15 @@ def Get_Phone_Number_From_Website(df):
             // This ensures we capture data from both homepage and contact pages
             await page.waitForSelector('body', { timeout: 5000 });
 
-            const contactData = await page.evaluate(() => {
+            const contactData = await page.evaluate((exhaustive) => {
                 function formatSingaporePhone(text) {
                     if (!text) return null;
 
                     const digitsOnly = text.replace(/\\D/g, '');
 
                     // CRITICAL: Check for NON-SINGAPORE country codes FIRST and REJECT immediately
-                    // List of country codes to explicitly reject (2-digit and 3-digit codes)
-                    const bannedCountryCodes = [
-                        '1',   // US/Canada
-                        '7',   // Russia/Kazakhstan
-                        '20',  // Egypt
-                        '27',  // South Africa
-                        '30',  // Greece
-                        '31',  // Netherlands
-                        '32',  // Belgium
-                        '33',  // France
-                        '34',  // Spain
-                        '36',  // Hungary
-                        '39',  // Italy
-                        '40',  // Romania
-                        '41',  // Switzerland
-                        '43',  // Austria
-                        '44',  // UK
-                        '45',  // Denmark
-                        '46',  // Sweden
-                        '47',  // Norway
-                        '48',  // Poland
-                        '49',  // Germany
-                        '51',  // Peru
-                        '52',  // Mexico
-                        '53',  // Cuba
-                        '54',  // Argentina
-                        '55',  // Brazil
-                        '56',  // Chile
-                        '57',  // Colombia
-                        '58',  // Venezuela
-                        '60',  // Malaysia
-                        '61',  // Australia
-                        '62',  // Indonesia
-                        '63',  // Philippines
-                        '64',  // New Zealand
-                        '66',  // Thailand
-                        '81',  // Japan
-                        '82',  // South Korea
-                        '84',  // Vietnam
-                        '86',  // China
-                        '90',  // Turkey
-                        '91',  // India
-                        '92',  // Pakistan
-                        '93',  // Afghanistan
-                        '94',  // Sri Lanka
-                        '95',  // Myanmar
-                        '98',  // Iran
-                        '212', // Morocco
-                        '213', // Algeria
-                        '216', // Tunisia
-                        '220', // Gambia
-                        '234', // Nigeria
-                        '254', // Kenya
-                        '255', // Tanzania
-                        '260', // Zambia
-                        '351', // Portugal
-                        '352', // Luxembourg
-                        '353', // Ireland
-                        '354', // Iceland
-                        '358', // Finland
-                        '370', // Lithuania
-                        '371', // Latvia
-                        '372', // Estonia
-                        '373', // Moldova
-                        '374', // Armenia
-                        '375', // Belarus
-                        '376', // Andorra
-                        '377', // Monaco
-                        '378', // San Marino
-                        '380', // Ukraine
-                        '381', // Serbia
-                        '382', // Montenegro
-                        '385', // Croatia
-                        '386', // Slovenia
-                        '387', // Bosnia
-                        '389', // North Macedonia
-                        '420', // Czech Republic
-                        '421', // Slovakia
-                        '423', // Liechtenstein
-                        '500', // Falkland Islands
-                        '501', // Belize
-                        '502', // Guatemala
-                        '503', // El Salvador
-                        '504', // Honduras
-                        '505', // Nicaragua
-                        '506', // Costa Rica
-                        '507', // Panama
-                        '508', // Saint Pierre
-                        '509', // Haiti
-                        '590', // Guadeloupe
-                        '591', // Bolivia
-                        '592', // Guyana
-                        '593', // Ecuador
-                        '594', // French Guiana
-                        '595', // Paraguay
-                        '596', // Martinique
-                        '597', // Suriname
-                        '598', // Uruguay
-                        '599', // Netherlands Antilles
-                        '670', // East Timor
-                        '672', // Antarctica
-                        '673', // Brunei
-                        '674', // Nauru
-                        '675', // Papua New Guinea
-                        '676', // Tonga
-                        '677', // Solomon Islands
-                        '678', // Vanuatu
-                        '679', // Fiji
-                        '680', // Palau
-                        '681', // Wallis and Futuna
-                        '682', // Cook Islands
-                        '683', // Niue
-                        '685', // Samoa
-                        '686', // Kiribati
-                        '687', // New Caledonia
-                        '688', // Tuvalu
-                        '689', // French Polynesia
-                        '690', // Tokelau
-                        '691', // Micronesia
-                        '692', // Marshall Islands
-                        '850', // North Korea
-                        '852', // Hong Kong - THE ONE CAUSING YOUR ISSUE!!!
-                        '853', // Macau
-                        '855', // Cambodia
-                        '856', // Laos
-                        '880', // Bangladesh
-                        '886', // Taiwan
-                        '960', // Maldives
-                        '961', // Lebanon
-                        '962', // Jordan
-                        '963', // Syria
-                        '964', // Iraq
-                        '965', // Kuwait
-                        '966', // Saudi Arabia
-                        '967', // Yemen
-                        '968', // Oman
-                        '970', // Palestine
-                        '971', // UAE
-                        '972', // Israel
-                        '973', // Bahrain
-                        '974', // Qatar
-                        '975', // Bhutan
-                        '976', // Mongolia
-                        '977', // Nepal
-                    ];
+                    // Same table as BANNED_COUNTRY_CODES in Phone_Number_Functions.py (injected below)
+                    const bannedCountryCodes = __BANNED_COUNTRY_CODES__;
 
                     // STEP 1: Validate length first (must be 8 or 10 digits only)
                     if (digitsOnly.length !== 8 && digitsOnly.length !== 10) {
@@ -391,33 +794,12 @@ def Get_Phone_Number_From_Website(df):
 
                     // STEP 2: For 10-digit numbers, check for banned country codes FIRST
                     if (digitsOnly.length === 10) {
-                        // Extract first 2-3 digits to check country code
-                        const first2 = digitsOnly.substring(0, 2);
-                        const first3 = digitsOnly.substring(0, 3);
-
-                        // Check against banned codes (optimized - check most common first)
-                        if (first3 === '852' || first3 === '853' || first3 === '886' || first3 === '855' ||
-                            first3 === '856' || first3 === '850' || first3 === '880') {
-                            return null; // Banned 3-digit country code (Hong Kong, etc.)
-                        }
-
-                        if (first2 === '1' || first2 === '7' || first2 === '60' || first2 === '61' ||
-                            first2 === '62' || first2 === '63' || first2 === '64' || first2 === '66' ||
-                            first2 === '81' || first2 === '82' || first2 === '84' || first2 === '86' ||
-                            first2 === '90' || first2 === '91' || first2 === '92' || first2 === '93' ||
-                            first2 === '94' || first2 === '95' || first2 === '98' || first2 === '20' ||
-                            first2 === '27' || first2 === '30' || first2 === '31' || first2 === '32' ||
-                            first2 === '33' || first2 === '34' || first2 === '36' || first2 === '39' ||
-                            first2 === '40' || first2 === '41' || first2 === '43' || first2 === '44' ||
-                            first2 === '45' || first2 === '46' || first2 === '47' || first2 === '48' ||
-                            first2 === '49' || first2 === '51' || first2 === '52' || first2 === '53' ||
-                            first2 === '54' || first2 === '55' || first2 === '56' || first2 === '57' ||
-                            first2 === '58') {
-                            return null; // Banned 2-digit country code
+                        if (bannedCountryCodes.some(code => digitsOnly.startsWith(code))) {
+                            return null; // Banned country code (Hong Kong, Malaysia, etc.)
                         }
 
                         // MUST be Singapore (65)
-                        if (first2 !== '65') {
+                        if (!digitsOnly.startsWith('65')) {
                             return null; // Not Singapore
                         }
 
@@ -486,6 +868,12 @@ def Get_Phone_Number_From_Website(df):
                     } catch (e) {}
                 });
 
+                // Early exit: links/structured data already gave a valid +65 number, so skip
+                // innerText (forces a full layout) unless the caller wants every number
+                if (phones.length && !exhaustive) {
+                    return { phones: phones.filter(phone => phone && phone.match(/^\\+65[689]\\d{7}$/)), shortCircuit: true };
+                }
+
                 // Method 4: Pattern matching in visible text (STRICT Singapore-only patterns)
                 const bodyText = document.body.innerText || document.body.textContent || '';
                 const phonePatterns = [
@@ -529,12 +917,12 @@ def Get_Phone_Number_From_Website(df):
                     return phone && phone.match(/^\\+65[689]\\d{7}$/);
                 });
 
-                return { phones: validatedPhones };
-            });
+                return { phones: validatedPhones, shortCircuit: false };
+            }, exhaustive);
 
             // STEP 2: If on homepage and no phones found, try to find and enqueue contact page
-            // If phones were found, still try contact page for additional numbers
-            if (!isContact && !isHomepage) {
+            // In exhaustive mode, still try contact page for additional numbers
+            if (!isContact && !isHomepage && (exhaustive || contactData.phones.length === 0)) {
                 const contactUrl = await page.evaluate(() => {
                     // Enhanced contact page detection - look for common patterns
                     const contactKeywords = [
@@ -582,14 +970,18 @@ def Get_Phone_Number_From_Website(df):
             }
 
             const pageType = isContact ? 'contact page' : 'homepage';
-            log.info(`✅ Found ${contactData.phones.length} phone(s) on ${pageType}: ${website}`);
+            log.info(`✅ Found ${contactData.phones.length} phone(s) on ${pageType}: ${website}` +
+                     (contactData.shortCircuit ? ' (early exit)' : ''));
 
             return {
                 website: request.userData?.originalUrl || website,
                 contactUrl: isContact ? request.url : null,
                 phones: contactData.phones.length ? contactData.phones : null,
                 pageType: pageType,
-                status: 'success'
+                status: 'success',
+                bytes: pageStats.bytes,
+                blockedRequests: pageStats.blocked,
+                latencyMs: Date.now() - pageStats.startedAt
             };
 
         } catch (err) {
@@ -599,26 +991,64 @@ def Get_Phone_Number_From_Website(df):
                 phones: null,
                 pageType: 'unknown',
                 status: 'error',
-                error: err.message
+                error: err.message,
+                bytes: pageStats.bytes,
+                blockedRequests: pageStats.blocked,
+                latencyMs: Date.now() - pageStats.startedAt
             };
         }
     }
-    """
+    """.replace("__BANNED_COUNTRY_CODES__", json.dumps(list(BANNED_COUNTRY_CODES)))
 
-    def run_website_scraper(client, websites):
-        """Run Apify scraper for a batch of websites"""
-        start_urls = [{"url": website, "userData": {"originalUrl": website}} for website in websites]
+    def create_website_prenavigation_hooks():
+        """Abort images/media/fonts/stylesheets and tracker requests; count transferred bytes per page"""
+        return """
+    [
+        async ({ page }, gotoOptions) => {
+            const blockedTypes = __BLOCKED_RESOURCE_TYPES__;
+            const blockedDomains = __BLOCKED_TRACKER_DOMAINS__;
+            const stats = { bytes: 0, blocked: 0, startedAt: Date.now() };
+            page.__leadStats = stats;
+
+            // Encoded (on-the-wire) bytes of every response the page actually loads
+            const cdp = await page.target().createCDPSession();
+            await cdp.send('Network.enable');
+            cdp.on('Network.loadingFinished', (event) => { stats.bytes += event.encodedDataLength || 0; });
+
+            await page.setRequestInterception(true);
+            page.on('request', (req) => {
+                if (req.isInterceptResolutionHandled && req.isInterceptResolutionHandled()) return;
+                let host = '';
+                try { host = new URL(req.url()).hostname; } catch (e) {}
+                const tracker = blockedDomains.some(domain => host === domain || host.endsWith('.' + domain));
+                if (blockedTypes.includes(req.resourceType()) || tracker) {
+                    stats.blocked += 1;
+                    req.abort('blockedbyclient');
+                } else {
+                    req.continue();
+                }
+            });
+        }
+    ]
+    """.replace("__BLOCKED_RESOURCE_TYPES__", json.dumps(BLOCKED_RESOURCE_TYPES)) \
+       .replace("__BLOCKED_TRACKER_DOMAINS__", json.dumps(BLOCKED_TRACKER_DOMAINS))
 
-        print(f"  📋 Processing {len(start_urls)} websites in single actor run")
+    def build_website_run_input(websites):
+        """Apify puppeteer-scraper input for a batch of websites"""
+        start_urls = [{"url": website, "userData": {"originalUrl": website}} for website in websites]
 
-        run_input = {
+        return {
             "startUrls": start_urls,
             "useChrome": False,              # Use Chromium (lighter, cheaper)
             "headless": True,
             "stealth": True,
             "pageFunction": create_website_scraper_pagefunction(),
+            "preNavigationHooks": create_website_prenavigation_hooks(),
+            "customData": {"exhaustive": exhaustive},
             "maxRequestRetries": MAX_RETRIES,
             "maxRequestsPerCrawl": len(start_urls) * 2,  # Account for main + contact pages
+            "downloadMedia": False,                    # Belt and braces with the request interception
+            "downloadCss": False,
             "maxConcurrency": MAX_CONCURRENCY,
             "pageLoadTimeoutSecs": PAGE_TIMEOUT,       # Reduced from 30s
             "pageFunctionTimeoutSecs": FUNCTION_TIMEOUT, # Reduced from 60s
@@ -631,69 +1061,39 @@ def Get_Phone_Number_From_Website(df):
             "proxyRotation": "RECOMMENDED",
         }
 
-        print(f"  🚀 Launching Apify actor with {MAX_CONCURRENCY} concurrent browsers...")
-
-        try:
-            run = client.actor("apify/puppeteer-scraper").call(run_input=run_input)
-
-            if not run or not isinstance(run, dict) or 'id' not in run:
-                return [], f"API returned invalid response: {run}"
-
-            print(f"  ⏳ Run ID: {run['id']}")
-
-            run_client = client.run(run["id"])
-            run_info = run_client.wait_for_finish()
-
-            status = run_info.get('status', 'UNKNOWN')
-            print(f"  📊 Status: {status}")
-
-            if status in ['FAILED', 'TIMED-OUT', 'ABORTED']:
-                error_detail = run_info.get('statusMessage', 'No error details')
-                return [], f"Actor run {status}: {error_detail}"
-
-            if status == "SUCCEEDED" and "defaultDatasetId" in run:
-                dataset = client.dataset(run["defaultDatasetId"])
-                items = list(dataset.iterate_items())
-                print(f"  ✅ Retrieved {len(items)} results")
-                return items, None
-
-            return [], f"Scraping failed with status: {status}"
-
-        except Exception as e:
-            error_msg = f"Error during scraping: {type(e).__name__}: {str(e)}"
-            print(f"  ❌ {error_msg}")
-            return [], error_msg
-
 
     # Execute scraper
-    print("="*70)
-    print("🌐 WEBSITE PHONE NUMBER SCRAPER - COST-OPTIMIZED")
-    print("="*70)
-    print(f"📊 Configuration:")
-    print(f"   • Batch size: {BATCH_SIZE} websites (increased for efficiency)")
-    print(f"   • Concurrency: {MAX_CONCURRENCY} browsers (parallel processing)")
-    print(f"   • Page timeout: {PAGE_TIMEOUT}s (reduced for speed)")
-    print(f"   • Function timeout: {FUNCTION_TIMEOUT}s (optimized)")
-    print(f"   • Retries: {MAX_RETRIES} (minimize compute waste)")
-    print(f"   • Browser: Chromium (lightweight)")
-    print(f"   • Proxy: RESIDENTIAL (maintained)")
-    print(f"   • Strategy: Contact page → Homepage fallback")
-    print("="*70)
+    say("="*70)
+    say("🌐 WEBSITE PHONE NUMBER SCRAPER - COST-OPTIMIZED")
+    say("="*70)
+    say(f"📊 Configuration:")
+    say(f"   • Batch size: {BATCH_SIZE} websites (increased for efficiency)")
+    say(f"   • Concurrency: {MAX_CONCURRENCY} browsers (parallel processing)")
+    say(f"   • Parallel actor runs: {max_parallel_runs}")
+    say(f"   • Page timeout: {PAGE_TIMEOUT}s (reduced for speed)")
+    say(f"   • Function timeout: {FUNCTION_TIMEOUT}s (optimized)")
+    say(f"   • Retries: {MAX_RETRIES} (minimize compute waste)")
+    say(f"   • Browser: Chromium (lightweight)")
+    say(f"   • Proxy: RESIDENTIAL (maintained)")
+    say(f"   • Strategy: Homepage first, contact page " +
+          ("always (exhaustive)" if exhaustive else "only when the homepage has no phones"))
+    say(f"   • Blocked: {', '.join(BLOCKED_RESOURCE_TYPES)} + {len(BLOCKED_TRACKER_DOMAINS)} tracker domains")
+    say("="*70)
 
     # Validate API token
-    print(f"\n🔑 Validating Apify API token...")
+    say(f"\n🔑 Validating {backend.name} backend credentials...")
     try:
-        user_info = client.user().get()
-        print(f"✅ API Key valid - User: {user_info.get('username', 'Unknown')}")
-        print(f"   • Plan: {user_info.get('plan', {}).get('id', 'Unknown')}")
-        print(f"   • Credits remaining: Check your dashboard at https://console.apify.com/billing")
+        user_info = backend.account_info()
+        say(f"✅ API Key valid - User: {user_info.get('username', 'Unknown')}")
+        say(f"   • Plan: {user_info.get('plan', {}).get('id', 'Unknown')}")
+        say(f"   • Credits remaining: Check your dashboard at https://console.apify.com/billing")
     except Exception as e:
-        print(f"❌ API Token Error: {e}")
-        print(f"   • Check your token at: https://console.apify.com/account/integrations")
+        say(f"❌ API Token Error: {e}")
+        say(f"   • Check your token at: https://console.apify.com/account/integrations")
         raise
 
     # Use RecordOwl_Leads dataframe - filter for rows with valid Website column
-    print(f"\n📋 Total rows in RecordOwl_Leads: {len(RecordOwl_Leads)}")
+    say(f"\n📋 Total rows in RecordOwl_Leads: {len(RecordOwl_Leads)}")
 
     # Filter for rows with non-null and non-empty websites
     websites_to_scrape = RecordOwl_Leads[
@@ -702,86 +1102,339 @@ def Get_Phone_Number_From_Website(df):
         (RecordOwl_Leads["Website"] != "None")
     ].copy()
 
-    print(f"📋 Rows with valid websites: {len(websites_to_scrape)}")
+    say(f"📋 Rows with valid websites: {len(websites_to_scrape)}")
 
     # STEP 1: Verify website accessibility
-    print(f"\n{'='*70}")
-    print("🔍 STEP 1: VERIFYING WEBSITE ACCESSIBILITY")
-    print(f"{'='*70}")
-    print("Testing HTTP/HTTPS connectivity for all websites...")
-
-    verified_count = 0
-    failed_count = 0
-    skipped_count = 0
-
-    for idx, row in websites_to_scrape.iterrows():
-        website = row['Website']
-
-        # Check if website contains any skip keywords
-        website_lower = website.lower()
-        skip_keyword_found = None
-        for keyword in SKIP_KEYWORDS:
-            if keyword in website_lower:
-                skip_keyword_found = keyword
-                break
-
-        if skip_keyword_found:
-            # Skip this website
-            websites_to_scrape.at[idx, 'Website_Verified'] = 'no'
-            websites_to_scrape.at[idx, 'Verification_Info'] = f'Skipped - keyword blocked: {skip_keyword_found}'
-            skipped_count += 1
-            print(f"  ⏭️  {website} - Skipped (contains '{skip_keyword_found}')")
+    say(f"\n{'='*70}")
+    say("🔍 STEP 1: VERIFYING WEBSITE ACCESSIBILITY")
+    say(f"{'='*70}")
+    say("Testing HTTP/HTTPS connectivity for all websites...")
+
+    # Parse each distinct Website once into a canonical site key and a blocklist verdict
+    metrics.begin('canonicalize')
+    website_col = websites_to_scrape['Website'].astype(str).str.strip()
+    parsed_websites = {website: parse_website(website) for website in website_col.unique()}
+    site_keys = website_col.map({website: key for website, (key, _) in parsed_websites.items()})
+    block_reasons = website_col.map({website: reason for website, (_, reason) in parsed_websites.items()})
+    skip_mask = block_reasons.notna()
+
+    websites_to_scrape['Website_Verified'] = None
+    websites_to_scrape['Verification_Info'] = None
+    websites_to_scrape.loc[skip_mask, 'Website_Verified'] = 'no'
+    websites_to_scrape.loc[skip_mask, 'Verification_Info'] = block_reasons[skip_mask]
+    skipped_count = int(skip_mask.sum())
+
+    for website, reason in zip(website_col[skip_mask], block_reasons[skip_mask]):
+        say(f"  ⏭️  {website} - {reason}", 'debug')
+
+    # The first URL seen for each site key stands in for every row sharing it: verified and scraped once
+    site_urls = pd.Series(website_col[~skip_mask].to_numpy(), index=site_keys[~skip_mask].to_numpy(), dtype=object)
+    site_urls = site_urls[~site_urls.index.duplicated()]
+    urls_to_verify = site_urls.tolist()
+    rows_to_verify = int((~skip_mask).sum())
+    metrics.end('canonicalize', urls_in=len(website_col), urls_out=len(urls_to_verify), skipped=skipped_count)
+    say(f"🔗 {rows_to_verify} websites collapse to {len(urls_to_verify)} distinct sites "
+        f"({rows_to_verify - len(urls_to_verify)} duplicate probes and scrapes avoided)")
+
+    metrics.begin('verification')
+
+    def report_verification(website, verify_status, verify_info):
+        if verify_status == 'yes':
+            say(f"  ✅ {website}", 'debug')
         else:
-            # Verify the website
-            verify_status, verify_info = verify_website_accessibility(website)
-
-            websites_to_scrape.at[idx, 'Website_Verified'] = verify_status
-            websites_to_scrape.at[idx, 'Verification_Info'] = verify_info
-
-            if verify_status == 'yes':
-                verified_count += 1
-                print(f"  ✅ {website}")
+            say(f"  ❌ {website} - {verify_info}", 'debug')
+
+    # Serve fresh results from the on-disk cache, probe only the rest
+    verification_results = {}
+    cache_hits = 0
+    cache_misses = 0
+    verification_cache = UrlVerificationCache(verification_cache_path) \
+        if use_verification_cache and verify_websites else None
+
+    if not verify_websites:
+        # Offline / load-test runs: treat every non-blocked website as reachable
+        verification_results = {website: ('yes', 'Verification skipped') for website in urls_to_verify}
+        urls_to_probe = []
+    elif verification_cache:
+        urls_to_probe = []
+        for website in dict.fromkeys(urls_to_verify):
+            cached = verification_cache.get(website)
+            if cached:
+                verification_results[website] = cached
+                report_verification(website, *cached)
             else:
-                failed_count += 1
-                print(f"  ❌ {website} - {verify_info}")
+                urls_to_probe.append(website)
+        cache_hits = verification_cache.hits
+        cache_misses = verification_cache.misses
+        say(f"Verification cache: {cache_hits} hits, {cache_misses} misses")
+    else:
+        urls_to_probe = urls_to_verify
 
-    print(f"\n📊 Verification Summary:")
-    print(f"   • Verified (accessible): {verified_count}")
-    print(f"   • Failed (inaccessible): {failed_count}")
-    print(f"   • Skipped (blocked keywords): {skipped_count}")
+    def record_verification(website, verify_status, verify_info):
+        report_verification(website, verify_status, verify_info)
+        # Fast-failed probes never reached the host, so they are not worth remembering
+        if verification_cache and not str(verify_info).startswith('Circuit Open'):
+            verification_cache.set(website, verify_status, verify_info)
 
-    # Filter to only verified websites for scraping
-    verified_websites = websites_to_scrape[
-        websites_to_scrape['Website_Verified'] == 'yes'
-    ].copy()
+    # One outbound layer per run: per-domain limits, circuit breakers and adaptive connect timeouts
+    owns_http_client = http_client is None
+    if owns_http_client:
+        http_client = OutboundHttpClient(max_concurrency=verify_concurrency, max_timeout=verify_timeout)
 
-    print(f"\n✅ Proceeding to scrape {len(verified_websites)} verified websites")
-    print(f"{'='*70}")
+    say(f"Verifying {len(set(urls_to_probe))} unique websites with up to {verify_concurrency} concurrent probes...")
+    try:
+        verification_results.update(verify_websites_concurrently(
+            urls_to_probe,
+            max_concurrency=verify_concurrency,
+            timeout=verify_timeout,
+            on_result=record_verification,
+            client=http_client
+        ))
+    finally:
+        if verification_cache:
+            verification_cache.close()
+        http_stats = http_client.summary()
+
+    # Fan each site's result out to every row sharing its key
+    verification_df = pd.DataFrame(
+        [verification_results[url] for url in site_urls],
+        index=site_urls.index,
+        columns=['Website_Verified', 'Verification_Info']
+    )
+    to_verify_mask = ~skip_mask
+    websites_to_scrape.loc[to_verify_mask, 'Website_Verified'] = site_keys[to_verify_mask].map(
+        verification_df['Website_Verified']
+    )
+    websites_to_scrape.loc[to_verify_mask, 'Verification_Info'] = site_keys[to_verify_mask].map(
+        verification_df['Verification_Info']
+    )
+
+    verified_count = int((websites_to_scrape.loc[to_verify_mask, 'Website_Verified'] == 'yes').sum())
+    failed_count = int(to_verify_mask.sum()) - verified_count
+
+    for verify_status, verify_info in verification_results.values():
+        if verify_status != 'yes':
+            metrics.error('verification', verify_info)
+    metrics.end('verification', urls_in=len(website_col), urls_out=verified_count, hits=cache_hits,
+                misses=cache_misses, failed=failed_count, skipped=skipped_count,
+                fast_failed=http_stats['fast_failed'], timeouts=http_stats['timeouts'],
+                throttled=http_stats['throttled'], circuits_opened=http_stats['circuits_opened'])
+
+    say(f"\n📊 Verification Summary:")
+    say(f"   • Verified (accessible): {verified_count}")
+    say(f"   • Failed (inaccessible): {failed_count}")
+    say(f"   • Skipped (blocked or invalid): {skipped_count}")
+    if http_stats['requests'] or http_stats['fast_failed']:
+        say(f"   • Probes: {http_stats['requests']} sent across {http_stats['domains']} domains, "
+            f"{http_stats['fast_failed']} fast-failed by {http_stats['circuits_opened']} open circuits, "
+            f"{http_stats['timeouts']} timeouts, {http_stats['rate_limit_wait_secs']:.1f}s rate-limit wait")
+
+    # Filter to only verified sites for scraping, one row per site
+    verified_websites = pd.DataFrame({
+        'Website': site_urls[verification_df['Website_Verified'] == 'yes'].tolist()
+    })
+
+    say(f"\n✅ Proceeding to scrape {len(verified_websites)} verified sites ({verified_count} rows)")
+    say(f"{'='*70}")
 
     # STEP 2: Scrape only verified websites
-    print(f"\n{'='*70}")
-    print("🌐 STEP 2: SCRAPING VERIFIED WEBSITES")
-    print(f"{'='*70}")
+    say(f"\n{'='*70}")
+    say("🌐 STEP 2: SCRAPING VERIFIED WEBSITES")
+    say(f"{'='*70}")
+
+    def website_result_row(website, item):
+        """Build the Website_* result columns for one website from its best scraped item."""
+        if not item:
+            say(f"    ⚠️  {website}: Not found in results", 'debug')
+            return {
+                "Website": website,
+                "Website_Scrape_Status": "missing",
+                "Website_Scrape_Error": "No data returned",
+                "Website_Phones": None,
+                "Website_Contact_Page": None,
+                "Website_Page_Type": None
+            }
+
+        status = item.get('status', 'error')
+        phones = item.get('phones', None)
+        page_type = item.get('pageType', 'unknown')
+        phone_count = len(phones) if phones else 0
+
+        if status == 'success' and phones:
+            say(f"    ✅ {website}: {phone_count} phone(s) from {page_type}", 'debug')
+        elif status == 'success':
+            say(f"    ⚠️  {website}: No phones found on {page_type}", 'debug')
+        else:
+            say(f"    ❌ {website}: {status} - {item.get('error', 'Unknown')}", 'debug')
+
+        return {
+            'Website': website,
+            'Website_Scrape_Status': status,
+            'Website_Scrape_Error': item.get('error'),
+            'Website_Phones': phones,
+            'Website_Contact_Page': item.get('contactUrl'),
+            'Website_Page_Type': page_type
+        }
+
+    def fold_items_by_website(items):
+        """
+        Fold a stream of compact items into per-website state in one pass.
+        Returns (website_map, items_by_website): the item with the most phones (homepage vs contact
+        page) and every item seen, per website.
+        """
+        website_map = {}
+        items_by_website = {}
+        for item in items:
+            if item and item.get('website'):
+                web = item['website']
+                items_by_website.setdefault(web, []).append(item)
+                # Safely get phone counts, treating None as 0
+                current_phones = item.get('phones') or []
+                existing_phones = website_map[web].get('phones') or [] if web in website_map else []
+
+                # Store if new entry or has more phones than existing
+                if web not in website_map or len(current_phones) > len(existing_phones):
+                    website_map[web] = item
+        return website_map, items_by_website
 
     all_results = []
+    scrape_cache = ScrapeResultCache(scrape_cache_path) if use_scrape_cache else None
+
+    # Resume from the batches a previous (interrupted) run on the same input already finished
+    run_checkpoint_dir = get_checkpoint_dir(
+        "website", [str(website).strip() for website in websites_to_scrape['Website']], checkpoint_dir
+    )
+    run_stamp = time.strftime("%Y%m%d%H%M%S")
+    batch_errors = 0
+
+    # Browser cost of this run: pages loaded, on-the-wire bytes, latency and the proxy transfer Apify bills
+    page_stats = {'pages': 0, 'bytes': 0, 'blocked': 0, 'latency_ms': 0, 'proxy_gb': 0.0, 'websites': 0}
+
+    metrics.begin('checkpoint')
+    urls_before_checkpoint = len(verified_websites)
+    checkpoint = load_checkpoint(run_checkpoint_dir) if resume else pd.DataFrame()
+    if len(checkpoint) > 0:
+        checkpoint = checkpoint.drop_duplicates(subset='Website', keep='last')
+        checkpoint = checkpoint[checkpoint['Website'].isin(verified_websites['Website'].astype(str).str.strip())]
+        # Parquet hands list columns back as arrays
+        checkpoint['Website_Phones'] = checkpoint['Website_Phones'].map(
+            lambda phones: list(phones) if phones is not None and not isinstance(phones, float) else None
+        )
+        all_results.extend(checkpoint.to_dict('records'))
+        verified_websites = verified_websites[
+            ~verified_websites['Website'].astype(str).str.strip().isin(checkpoint['Website'])
+        ]
+        say(f"📦 Checkpoint: resumed {len(checkpoint)} websites from {run_checkpoint_dir}")
+    metrics.end('checkpoint', urls_in=urls_before_checkpoint, urls_out=len(verified_websites))
+
+    # Serve previously scraped websites from the cache, only batch the rest into actor runs
+    metrics.begin('scrape_cache')
+    urls_before_cache = len(verified_websites)
+    if scrape_cache and len(verified_websites) > 0:
+        websites = verified_websites['Website'].astype(str).str.strip()
+        cached_websites = set()
+        for website in websites.unique():
+            cached = scrape_cache.get('website', website)
+            if cached:
+                # All cached items belong to this URL; keep the one with the most phones
+                item = max(cached['items'], key=lambda i: len(i.get('phones') or []), default=None)
+                all_results.append(website_result_row(website, item))
+                cached_websites.add(website)
+        verified_websites = verified_websites[~websites.isin(cached_websites)]
+        say(f"📦 Scrape cache: {len(cached_websites)} websites served from cache, "
+              f"{len(verified_websites)} to scrape")
+    metrics.end('scrape_cache', urls_in=urls_before_cache, urls_out=len(verified_websites),
+                hits=urls_before_cache - len(verified_websites))
+
+    # Static-HTML fast path: plain GETs resolve most sites; only the rest need a browser
+    static_resolved = 0
+    metrics.begin('static_fast_path')
+    urls_before_static = len(verified_websites)
+    if static_fast_path and len(verified_websites) > 0:
+        static_websites = list(dict.fromkeys(str(website).strip() for website in verified_websites['Website']))
+        say(f"⚡ Static fast path: fetching {len(static_websites)} websites "
+              f"({static_concurrency} concurrent, {static_timeout}s timeout)...")
+        # Same outbound client as verification: its rate limits and open circuits carry over
+        static_results = scrape_websites_static(
+            static_websites, concurrency=static_concurrency, timeout=static_timeout, http_client=http_client
+        )
+
+        resolved = {website: result for website, result in static_results.items() if not result['escalate']}
+        static_rows = []
+        for website, result in resolved.items():
+            website_map, items_by_website = fold_items_by_website(result['items'])
+            static_rows.append(website_result_row(website, website_map.get(website)))
+            if scrape_cache:
+                best_item = website_map.get(website)
+                scrape_cache.set(
+                    'website', website, items_by_website.get(website, []), (best_item or {}).get('phones') or []
+                )
+        if static_rows:
+            all_results.extend(static_rows)
+            write_checkpoint_part(run_checkpoint_dir, run_stamp, -1, static_rows)
+            if scrape_cache:
+                scrape_cache.commit()
+
+        static_resolved = len(resolved)
+        escalation_reasons = pd.Series(
+            [result['reason'] for result in static_results.values() if result['escalate']], dtype=object
+        ).value_counts()
+        say(f"⚡ Static fast path: {static_resolved} resolved, "
+              f"{len(static_results) - static_resolved} escalated to the browser actor")
+        for reason, count in escalation_reasons.items():
+            say(f"   • {reason}: {count}")
+        for result in static_results.values():
+            if result['reason'].startswith('fetch failed'):
+                metrics.error('static_fast_path', result['reason'])
+
+        verified_websites = verified_websites[
+            ~verified_websites['Website'].astype(str).str.strip().isin(resolved)
+        ]
+    if owns_http_client:
+        http_client.close()
+    metrics.end('static_fast_path', urls_in=urls_before_static, urls_out=len(verified_websites),
+                resolved=static_resolved)
+    metrics.begin('scrape')
+
     total_rows = len(verified_websites)
+
+    # Size batches, browsers and timeouts from the recorded run history instead of the constants above
+    scrape_memory_mbytes = run_memory_mbytes
+    planned = total_rows > 0 and (auto_plan or target_secs is not None or cu_budget is not None)
+    if planned:
+        plan = plan_batches(total_rows, 'website', metrics_path=metrics.metrics_path, target_secs=target_secs,
+                            cu_budget=cu_budget, max_parallel_runs=max_parallel_runs,
+                            run_memory_mbytes=run_memory_mbytes, account_memory_mbytes=account_memory_mbytes)
+        BATCH_SIZE, MAX_CONCURRENCY = plan['batch_size'], plan['max_concurrency']
+        PAGE_TIMEOUT = plan['page_timeout'] or PAGE_TIMEOUT
+        FUNCTION_TIMEOUT = plan['function_timeout'] or FUNCTION_TIMEOUT
+        scrape_memory_mbytes = plan['memory_mbytes']
+        for line in describe_plan(plan):
+            say(line)
+    metrics.emit('plan', stage='scrape', urls=total_rows, planned=planned, batch_size=BATCH_SIZE,
+                 max_concurrency=MAX_CONCURRENCY, page_timeout=PAGE_TIMEOUT, function_timeout=FUNCTION_TIMEOUT,
+                 memory_mbytes=scrape_memory_mbytes)
     total_batches = (total_rows + BATCH_SIZE - 1) // BATCH_SIZE
 
     if total_rows == 0:
-        print("⚠️ No verified websites to scrape!")
+        say("⚠️ No verified websites left to scrape!")
     else:
-        for batch_idx in range(0, total_rows, BATCH_SIZE):
-            batch = verified_websites.iloc[batch_idx:batch_idx + BATCH_SIZE]
-            websites = [str(row['Website']).strip() for _, row in batch.iterrows()]
-
-            batch_num = (batch_idx//BATCH_SIZE)+1
-            print(f"\n{'─'*70}")
-            print(f"📦 Batch {batch_num}/{total_batches} - Processing {len(websites)} verified websites")
-
-            items, error = run_website_scraper(client, websites)
+        batch_websites = [
+            [str(website).strip() for website in verified_websites['Website'].iloc[batch_idx:batch_idx + BATCH_SIZE]]
+            for batch_idx in range(0, total_rows, BATCH_SIZE)
+        ]
+        say(f"🚀 Submitting {total_batches} batches, up to {max_parallel_runs} actor runs in parallel "
+              f"({MAX_CONCURRENCY} browsers each)...")
+
+        def handle_batch(batch_index, items, error, run_info):
+            nonlocal batch_errors
+            websites = batch_websites[batch_index]
+            say(f"\n{'─'*70}")
+            say(f"📦 Batch {batch_index + 1}/{total_batches} - {len(websites)} verified websites")
 
             if error:
-                print(f"  ❌ Batch error: {error}")
+                batch_errors += 1
+                say(f"  ❌ Batch error: {error}", 'error')
                 for website in websites:
                     all_results.append({
                         "Website": website,
@@ -791,79 +1444,203 @@ def Get_Phone_Number_From_Website(df):
                         "Website_Contact_Page": None,
                         "Website_Page_Type": None
                     })
-                continue
-
-            # Map results by website
-            website_map = {}
-            for item in items:
-                if item and item.get('website'):
-                    # Store the result with most phones
-                    web = item['website']
-                    # Safely get phone counts, treating None as 0
-                    current_phones = item.get('phones') or []
-                    existing_phones = website_map[web].get('phones') or [] if web in website_map else []
-
-                    # Store if new entry or has more phones than existing
-                    if web not in website_map or len(current_phones) > len(existing_phones):
-                        website_map[web] = item
-
-            for website in websites:
-                item = website_map.get(website)
-                if not item:
-                    print(f"    ⚠️  {website}: Not found in results")
-                    all_results.append({
-                        "Website": website,
-                        "Website_Scrape_Status": "missing",
-                        "Website_Scrape_Error": "No data returned",
-                        "Website_Phones": None,
-                        "Website_Contact_Page": None,
-                        "Website_Page_Type": None
-                    })
-                else:
-                    status = item.get('status', 'error')
-                    phones = item.get('phones', None)
-                    page_type = item.get('pageType', 'unknown')
-                    phone_count = len(phones) if phones else 0
-
-                    if status == 'success' and phones:
-                        print(f"    ✅ {website}: {phone_count} phone(s) from {page_type}")
-                    elif status == 'success':
-                        print(f"    ⚠️  {website}: No phones found on {page_type}")
-                    else:
-                        print(f"    ❌ {website}: {status} - {item.get('error', 'Unknown')}")
-
-                    all_results.append({
-                        'Website': website,
-                        'Website_Scrape_Status': status,
-                        'Website_Scrape_Error': item.get('error'),
-                        'Website_Phones': phones,
-                        'Website_Contact_Page': item.get('contactUrl'),
-                        'Website_Page_Type': page_type
-                    })
+                return
+
+            # Map results by website as they stream in
+            website_map, items_by_website = fold_items_by_website(items)
+            say(f"  ✅ Retrieved {sum(len(v) for v in items_by_website.values())} results", 'debug')
+
+            batch_results = [website_result_row(website, website_map.get(website)) for website in websites]
+            all_results.extend(batch_results)
+
+            for page_items in items_by_website.values():
+                for item in page_items:
+                    page_stats['pages'] += 1
+                    page_stats['bytes'] += item.get('bytes') or 0
+                    page_stats['blocked'] += item.get('blockedRequests') or 0
+                    page_stats['latency_ms'] += item.get('latencyMs') or 0
+            page_stats['websites'] += len(websites)
+            page_stats['proxy_gb'] += ((run_info or {}).get('usage') or {}).get('PROXY_RESIDENTIAL_TRANSFER_GBYTES') or 0
+            write_checkpoint_part(run_checkpoint_dir, run_stamp, batch_index, batch_results)
+
+            # Remember every website of this successful batch, including ones that returned nothing
+            if scrape_cache:
+                for website in dict.fromkeys(websites):
+                    best_item = website_map.get(website)
+                    scrape_cache.set(
+                        'website', website, items_by_website.get(website, []), (best_item or {}).get('phones') or []
+                    )
+                scrape_cache.commit()
+
+        run_actor_batches_in_parallel(
+            backend,
+            WEBSITE_ACTOR_ID,
+            batch_websites,
+            build_website_run_input,
+            handle_batch,
+            max_parallel_runs=max_parallel_runs,
+            run_memory_mbytes=scrape_memory_mbytes,
+            account_memory_mbytes=account_memory_mbytes,
+            poll_interval=poll_interval,
+            item_fields=WEBSITE_ITEM_FIELDS,
+            reduce_item=compact_website_item,
+            metrics=metrics
+        )
+    metrics.end('scrape', urls_in=total_rows, batches=total_batches, batch_errors=batch_errors,
+                pages=page_stats['pages'], bytes=page_stats['bytes'], proxy_gb=page_stats['proxy_gb'],
+                latency_ms=page_stats['latency_ms'])
+
+    # Keep the checkpoint while failed batches remain so a re-run only retries those
+    if batch_errors == 0:
+        clear_checkpoint(run_checkpoint_dir)
+    else:
+        say(f"📦 Checkpoint kept at {run_checkpoint_dir} ({batch_errors} failed batches) - re-run to resume")
 
-            # Sleep between batches
-            if batch_num < total_batches:
-                time.sleep(2)
+    scrape_cache_hits = scrape_cache.hits if scrape_cache else 0
+    scrape_cache_misses = scrape_cache.misses if scrape_cache else 0
+    if scrape_cache:
+        scrape_cache.close()
 
     # Create results DataFrame from scraping results
-    Website_Scraped_Results = pd.DataFrame(all_results)
+    metrics.begin('merge')
+    Website_Scraped_Results = pd.DataFrame(all_results, columns=[
+        'Website', 'Website_Scrape_Status', 'Website_Scrape_Error', 'Website_Phones',
+        'Website_Contact_Page', 'Website_Page_Type'
+    ])
 
     # Merge scraping results with original RecordOwl_Leads (no verification columns)
-    RecordOwl_Leads_Enriched = RecordOwl_Leads.merge(
-        Website_Scraped_Results,
-        on='Website',
-        how='left'
-    )
+    RecordOwl_Leads_Enriched = merge_website_results(RecordOwl_Leads, Website_Scraped_Results)
+    metrics.end('merge', rows_in=len(RecordOwl_Leads), rows_out=len(RecordOwl_Leads_Enriched),
+                phones_found=int(RecordOwl_Leads_Enriched['Website_Phones'].notna().sum()))
+
+    say(f"\n{'='*70}")
+    say("✅ PROCESSING COMPLETE")
+    say(f"{'='*70}")
+    say(f"📊 Final Statistics:")
+    say(f"   • Total rows: {len(RecordOwl_Leads_Enriched)}")
+    say(f"   • Websites verified accessible: {verified_count}")
+    say(f"   • Websites skipped (keywords): {skipped_count}")
+    say(f"   • Verification cache hits: {cache_hits}")
+    say(f"   • Verification cache misses: {cache_misses}")
+    say(f"   • Scrape cache hits: {scrape_cache_hits}")
+    say(f"   • Scrape cache misses: {scrape_cache_misses}")
+    say(f"   • Websites resolved from static HTML: {static_resolved}")
+    say(f"   • Websites scraped: {len(Website_Scraped_Results)}")
+    if page_stats['pages']:
+        say(f"   • Browser pages loaded: {page_stats['pages']} "
+              f"(avg {page_stats['latency_ms'] / page_stats['pages'] / 1000:.1f}s per page, "
+              f"{page_stats['blocked']} requests blocked)")
+        say(f"   • Transfer: {page_stats['bytes'] / 1e6:.1f} MB "
+              f"({page_stats['bytes'] / 1e3 / page_stats['pages']:.0f} KB per page)")
+        leads = max(page_stats['websites'], 1)
+        if page_stats['proxy_gb']:
+            say(f"   • Residential proxy: {page_stats['proxy_gb']:.3f} GB "
+                  f"({page_stats['proxy_gb'] * 1e3 / leads:.2f} MB per lead)")
+        else:
+            say(f"   • Transfer per lead: {page_stats['bytes'] / 1e6 / leads:.2f} MB")
+    say(f"   • Phones found: {len(RecordOwl_Leads_Enriched[RecordOwl_Leads_Enriched['Website_Phones'].notna()])}")
+    say(f"{'='*70}\n")
 
-    print(f"\n{'='*70}")
-    print("✅ PROCESSING COMPLETE")
-    print(f"{'='*70}")
-    print(f"📊 Final Statistics:")
-    print(f"   • Total rows: {len(RecordOwl_Leads_Enriched)}")
-    print(f"   • Websites verified accessible: {verified_count}")
-    print(f"   • Websites skipped (keywords): {skipped_count}")
-    print(f"   • Websites scraped: {len(Website_Scraped_Results)}")
-    print(f"   • Phones found: {len(RecordOwl_Leads_Enriched[RecordOwl_Leads_Enriched['Website_Phones'].notna()])}")
-    print(f"{'='*70}\n")
+    if owns_metrics:
+        metrics.close()
+        say(f"📈 Metrics for run {metrics.run_id} written to {metrics.metrics_path}")
 
     return RecordOwl_Leads_Enriched
+
+
+def estimate_enrichment(df, kind='website', scrape_cache_path=SCRAPE_CACHE_PATH, use_scrape_cache=True,
+                        metrics_path=METRICS_PATH, target_secs=None, cu_budget=None, max_parallel_runs=3,
+                        run_memory_mbytes=None, account_memory_mbytes=None, quiet=False):
+    """
+    Dry run: estimate the actor time and cost of enriching df without verifying, fetching or starting anything.
+
+    Counts the distinct sites (or Facebook pages) the run would scrape, drops those with a fresh
+    scrape-cache entry, scales websites by the verification and static fast path pass rates recorded
+    in the metrics log, then plans batches for the rest. Returns the plan dict with those counts.
+    """
+    if kind not in ('website', 'facebook'):
+        raise ValueError(f"kind must be 'website' or 'facebook', got {kind!r}")
+
+    if kind == 'website':
+        websites = df['Website'][df['Website'].notna() & (df['Website'] != '') & (df['Website'] != 'None')]
+        websites = websites.astype(str).str.strip()
+        parsed = {website: parse_website(website) for website in websites.unique()}
+        urls = list({key: website for website, (key, reason) in parsed.items() if reason is None}.values())
+    else:
+        pages = df['Facebook'].map(lambda x: (x[0] if len(x) else None) if isinstance(x, list) else x)
+        pages = pages[pages.notna() & (pages != '')].astype(str).str.strip()
+        urls = list(dict(zip(pages.str.lower().str.rstrip('/'), pages)).values())
+
+    cached = 0
+    if use_scrape_cache and os.path.exists(scrape_cache_path):
+        scrape_cache = ScrapeResultCache(scrape_cache_path)
+        try:
+            uncached = [url for url in urls if not scrape_cache.get(kind, url)]
+        finally:
+            scrape_cache.close()
+        cached = len(urls) - len(uncached)
+        urls = uncached
+
+    rates = stage_pass_rates(load_metrics_events(metrics_path), kind)
+    expected = len(urls)
+    if kind == 'website':
+        expected = round(expected * rates['verification'] * rates['static_fast_path'])
+
+    plan = plan_batches(expected, kind, metrics_path=metrics_path, target_secs=target_secs, cu_budget=cu_budget,
+                        max_parallel_runs=max_parallel_runs, run_memory_mbytes=run_memory_mbytes,
+                        account_memory_mbytes=account_memory_mbytes)
+    plan.update(rows=len(df), distinct_urls=len(urls) + cached, cached=cached, pass_rates=rates)
+
+    if not quiet:
+        print(f"🧮 Dry run ({kind}): {len(df):,} rows -> {len(urls) + cached:,} distinct URLs, "
+              f"{cached:,} cached, ~{expected:,} expected to reach the actor")
+        if kind == 'website':
+            print(f"   • Historical pass rates: verification {rates['verification']:.0%}, "
+                  f"static fast path escalation {rates['static_fast_path']:.0%}")
+        for line in describe_plan(plan):
+            print(line)
+    return plan
+
+
+def load_test_enrichment(n_urls=10_000, kind='website', backend=None, quiet=True, **kwargs):
+    """
+    Offline load test: run Get_Phone_Number_From_Website / _Facebook end to end over n_urls synthetic
+    leads against LocalApifyBackend (or the backend given), and report wall time, throughput and
+    the per-stage timings recorded by RunMetrics.
+    Verification, the static fast path, caches and checkpoints are switched off unless overridden.
+    """
+    if kind not in ('website', 'facebook'):
+        raise ValueError(f"kind must be 'website' or 'facebook', got {kind!r}")
+
+    backend = backend or LocalApifyBackend()
+    df = pd.DataFrame({'UEN': [f"LT{i:08d}" for i in range(n_urls)]})
+
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        metrics = RunMetrics(kind, metrics_path=os.path.join(checkpoint_dir, "metrics.jsonl"),
+                             verbosity='quiet' if quiet else 'info')
+        options = {'use_scrape_cache': False, 'resume': False, 'checkpoint_dir': checkpoint_dir,
+                   'metrics': metrics, **kwargs}
+        start = time.perf_counter()
+        if kind == 'website':
+            df['Website'] = [f"https://load-test-{i}.example.sg" for i in range(n_urls)]
+            options = {'verify_websites': False, 'static_fast_path': False,
+                       'use_verification_cache': False, **options}
+            enriched = Get_Phone_Number_From_Website(df, backend=backend, **options)
+            phones_found = int(enriched['Website_Phones'].notna().sum())
+        else:
+            df['Facebook'] = [f"https://www.facebook.com/load-test-{i}" for i in range(n_urls)]
+            with_phones, without_phones = Get_Phone_Number_From_Facebook(df, backend=backend, **options)
+            phones_found = len(with_phones)
+        wall_secs = time.perf_counter() - start
+        run_summary = metrics.close()
+
+    print(f"📊 Enrichment load test ({kind}, {n_urls:,} URLs, {backend.name} backend)")
+    print(f"   • Wall time: {wall_secs:.2f}s ({n_urls / wall_secs:,.0f} URLs/s)")
+    print(f"   • Leads with phones: {phones_found:,}")
+    for stage, stats in run_summary['stages'].items():
+        print(f"   • {stage}: {stats['secs']:.3f}s")
+    backend_stats = backend.summary() if hasattr(backend, 'summary') else {}
+
+    return {'kind': kind, 'n_urls': n_urls, 'wall_secs': wall_secs, 'urls_per_sec': n_urls / wall_secs,
+            'phones_found': phones_found, 'stages': run_summary['stages'], 'errors': run_summary['errors'],
+            **backend_stats}
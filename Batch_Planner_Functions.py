@@ -0,0 +1,248 @@
+
+import os
+import json
+import math
+import numpy as np
+import pandas as pd
+
+from Pipeline_Metrics_Functions import METRICS_PATH
+
+
+# Cold-start models until MIN_HISTORY_BATCHES successful batches are recorded for a kind:
+# actor start-up seconds per run and seconds per URL for a single browser
+DEFAULT_RUN_MODELS = {
+    'website': {'overhead_secs': 45.0, 'per_url_secs': 8.0, 'page_latency_secs': 5.0},
+    'facebook': {'overhead_secs': 30.0, 'per_url_secs': 4.0, 'page_latency_secs': None},
+}
+
+# The hand-tuned settings the enrichment functions use when no plan is requested
+DEFAULT_PLANS = {
+    'website': {'batch_size': 100, 'max_concurrency': 3, 'page_timeout': 15, 'function_timeout': 30},
+    'facebook': {'batch_size': 100, 'max_concurrency': 1, 'page_timeout': None, 'function_timeout': None},
+}
+
+BATCH_SIZE_CANDIDATES = (10, 25, 50, 75, 100, 150, 200, 300)
+CONCURRENCY_CANDIDATES = {'website': (1, 2, 3, 4, 6, 8), 'facebook': (1,)}
+
+MEMORY_PER_BROWSER_MBYTES = 1024
+FACEBOOK_MEMORY_MBYTES = 1024
+USD_PER_COMPUTE_UNIT = 0.4          # used until the history reports its own usage cost per CU
+MIN_HISTORY_BATCHES = 5
+HISTORY_WINDOW = 500                # most recent successful batches per kind used for fitting
+PAGE_TIMEOUT_BOUNDS = (10, 60)
+
+
+def load_metrics_events(metrics_path=METRICS_PATH):
+    """Every JSON event in the metrics log, skipping a torn last line from an interrupted run."""
+    events = []
+    if not metrics_path or not os.path.exists(metrics_path):
+        return events
+    with open(metrics_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+
+def batch_history(events, kind=None):
+    """
+    One row per recorded actor batch: run_id, kind, urls, secs, status, compute_units, usage_usd,
+    plus the batch size / concurrency / memory from the run's 'plan' event and the run's average
+    browser page latency (None for runs recorded before plans were logged).
+    """
+    columns = ['run_id', 'kind', 'urls', 'secs', 'status', 'compute_units', 'usage_usd',
+               'max_concurrency', 'memory_mbytes', 'page_latency_secs']
+    plans = {event['run_id']: event for event in events if event.get('event') == 'plan'}
+    latency = {
+        event['run_id']: event['latency_ms'] / event['pages'] / 1000
+        for event in events
+        if event.get('event') == 'stage' and event.get('stage') == 'scrape' and event.get('pages')
+        and event.get('latency_ms')
+    }
+
+    rows = []
+    for event in events:
+        if event.get('event') != 'batch' or (kind and event.get('kind') != kind):
+            continue
+        plan = plans.get(event['run_id'], {})
+        rows.append({
+            'run_id': event['run_id'],
+            'kind': event.get('kind'),
+            'urls': event.get('urls'),
+            'secs': event.get('secs'),
+            'status': event.get('status'),
+            'compute_units': event.get('compute_units') or 0,
+            'usage_usd': event.get('usage_usd') or 0,
+            'max_concurrency': plan.get('max_concurrency') or DEFAULT_PLANS.get(event.get('kind'), {}).get('max_concurrency'),
+            'memory_mbytes': plan.get('memory_mbytes'),
+            'page_latency_secs': latency.get(event['run_id']),
+        })
+    return pd.DataFrame(rows, columns=columns)
+
+
+def stage_pass_rates(events, kind):
+    """Share of URLs that historically survive verification and escalate past the static fast path."""
+    totals = {}
+    for event in events:
+        if event.get('event') == 'stage' and event.get('kind') == kind:
+            stage = totals.setdefault(event.get('stage'), {'urls_in': 0, 'urls_out': 0})
+            stage['urls_in'] += event.get('urls_in') or 0
+            stage['urls_out'] += event.get('urls_out') or 0
+
+    def rate(name):
+        stage = totals.get(name)
+        return stage['urls_out'] / stage['urls_in'] if stage and stage['urls_in'] else 1.0
+
+    return {'verification': rate('verification'), 'static_fast_path': rate('static_fast_path')}
+
+
+def memory_for(kind, max_concurrency, run_memory_mbytes=None):
+    """Actor memory for a plan: the caller's fixed value, else a power of two covering one GB per browser."""
+    if run_memory_mbytes:
+        return run_memory_mbytes
+    if kind == 'facebook':
+        return FACEBOOK_MEMORY_MBYTES
+    return 2 ** math.ceil(math.log2(max(MEMORY_PER_BROWSER_MBYTES * max_concurrency, 1024)))
+
+
+def fit_run_model(history, kind):
+    """
+    Fit secs = overhead_secs + per_url_secs * urls / max_concurrency on the recent successful batches
+    of kind (least squares, non-negative). Falls back to DEFAULT_RUN_MODELS with too little history.
+    Also reports the batch failure rate, a batch size cap below sizes that have timed out, the median
+    page latency and the observed USD per compute unit.
+    """
+    model = dict(DEFAULT_RUN_MODELS[kind], failure_rate=0.0, max_safe_batch_size=None,
+                 usd_per_cu=USD_PER_COMPUTE_UNIT, basis='defaults', batches=0)
+    if history is None or len(history) == 0:
+        return model
+
+    history = history[history['kind'] == kind]
+    finished = history[history['status'].notna()]
+    if len(finished):
+        model['failure_rate'] = float((finished['status'] != 'SUCCEEDED').mean())
+    timed_out = finished.loc[finished['status'] == 'TIMED-OUT', 'urls'].dropna()
+    if len(timed_out) >= 2:
+        model['max_safe_batch_size'] = max(1, int(timed_out.min() * 0.8))
+
+    usage = history[(history['compute_units'] > 0) & (history['usage_usd'] > 0)]
+    if len(usage):
+        model['usd_per_cu'] = float((usage['usage_usd'] / usage['compute_units']).median())
+    latency = history['page_latency_secs'].dropna()
+    if len(latency) and model['page_latency_secs'] is not None:
+        model['page_latency_secs'] = float(latency.median())
+
+    ok = history[(history['status'] == 'SUCCEEDED') & history['secs'].notna() & (history['urls'] > 0)].tail(HISTORY_WINDOW)
+    x = (ok['urls'] / ok['max_concurrency'].fillna(1).clip(lower=1)).to_numpy(dtype=float)
+    if len(ok) < MIN_HISTORY_BATCHES or len(np.unique(x)) < 2:
+        return model
+
+    design = np.column_stack([np.ones_like(x), x])
+    (overhead, per_url), *_ = np.linalg.lstsq(design, ok['secs'].to_numpy(dtype=float), rcond=None)
+    if per_url <= 0:
+        # No usable slope (e.g. all batches the same effective size): attribute everything to the URLs
+        overhead, per_url = 0.0, float((ok['secs'] / x).median())
+    model.update(overhead_secs=float(max(overhead, 0.0)), per_url_secs=float(per_url),
+                 basis=f'history ({len(ok)} batches)', batches=int(len(ok)))
+    return model
+
+
+def estimate_plan(model, kind, n_urls, batch_size, max_concurrency, max_parallel_runs=3,
+                  run_memory_mbytes=None, account_memory_mbytes=None):
+    """Wall-clock seconds, compute units and USD for scraping n_urls with one batch size / concurrency."""
+    memory_mbytes = memory_for(kind, max_concurrency, run_memory_mbytes)
+    runs = math.ceil(n_urls / batch_size) if n_urls else 0
+    parallel = max_parallel_runs
+    if account_memory_mbytes:
+        parallel = max(1, min(parallel, account_memory_mbytes // memory_mbytes))
+    parallel = max(1, min(parallel, runs or 1))
+
+    avg_batch = n_urls / runs if runs else 0
+    run_secs = model['overhead_secs'] + model['per_url_secs'] * avg_batch / max_concurrency
+    retry_factor = 1 + model['failure_rate']    # failed batches are re-run on resume
+    wall_secs = math.ceil(runs / parallel) * run_secs * retry_factor if runs else 0.0
+    compute_units = runs * (memory_mbytes / 1024) * run_secs / 3600 * retry_factor
+
+    return {
+        'batch_size': batch_size,
+        'max_concurrency': max_concurrency,
+        'memory_mbytes': memory_mbytes,
+        'runs': runs,
+        'parallel_runs': parallel,
+        'est_run_secs': run_secs,
+        'est_wall_secs': wall_secs,
+        'est_compute_units': compute_units,
+        'est_usd': compute_units * model['usd_per_cu'],
+    }
+
+
+def plan_batches(n_urls, kind='website', history=None, metrics_path=METRICS_PATH, target_secs=None,
+                 cu_budget=None, max_parallel_runs=3, run_memory_mbytes=None, account_memory_mbytes=None):
+    """
+    Choose batch size, in-actor concurrency, memory and page/function timeouts for n_urls.
+
+    The run model is fitted on the batch history in the metrics log (or the given history frame).
+    With target_secs, the cheapest plan estimated to finish within it wins; with cu_budget, the
+    fastest plan within the budget; with neither, the cheapest. When nothing meets the target or
+    budget, the closest plan is returned with met=False.
+    """
+    if kind not in DEFAULT_RUN_MODELS:
+        raise ValueError(f"kind must be one of {list(DEFAULT_RUN_MODELS)}, got {kind!r}")
+    if history is None:
+        history = batch_history(load_metrics_events(metrics_path), kind)
+    model = fit_run_model(history, kind)
+
+    sizes = [size for size in BATCH_SIZE_CANDIDATES
+             if not model['max_safe_batch_size'] or size <= model['max_safe_batch_size']]
+    sizes = sizes or [model['max_safe_batch_size']]
+    candidates = [
+        estimate_plan(model, kind, n_urls, size, concurrency, max_parallel_runs,
+                      run_memory_mbytes, account_memory_mbytes)
+        for size in sizes for concurrency in CONCURRENCY_CANDIDATES[kind]
+    ]
+
+    def cheapest(plans):
+        return min(plans, key=lambda plan: (plan['est_compute_units'], plan['est_wall_secs']))
+
+    def fastest(plans):
+        return min(plans, key=lambda plan: (plan['est_wall_secs'], plan['est_compute_units']))
+
+    met = True
+    if target_secs is not None:
+        within = [plan for plan in candidates if plan['est_wall_secs'] <= target_secs]
+        met = bool(within)
+        plan = cheapest(within) if within else fastest(candidates)
+    elif cu_budget is not None:
+        within = [plan for plan in candidates if plan['est_compute_units'] <= cu_budget]
+        met = bool(within)
+        plan = fastest(within) if within else cheapest(candidates)
+    else:
+        plan = cheapest(candidates)
+
+    page_timeout = function_timeout = None
+    if model['page_latency_secs'] is not None:
+        low, high = PAGE_TIMEOUT_BOUNDS
+        page_timeout = int(min(high, max(low, math.ceil(3 * model['page_latency_secs']))))
+        function_timeout = 2 * page_timeout
+
+    return dict(plan, kind=kind, urls=n_urls, page_timeout=page_timeout, function_timeout=function_timeout,
+                target_secs=target_secs, cu_budget=cu_budget, met=met, basis=model['basis'],
+                model={key: model[key] for key in ('overhead_secs', 'per_url_secs', 'failure_rate', 'usd_per_cu')})
+
+
+def describe_plan(plan):
+    """Printable lines for a plan (used by the enrichment functions and their dry-run estimates)."""
+    lines = [
+        f"   • Plan ({plan['basis']}): {plan['runs']} runs of ~{plan['batch_size']} URLs, "
+        f"{plan['max_concurrency']} browser(s), {plan['memory_mbytes']} MB, {plan['parallel_runs']} in parallel",
+        f"   • Estimate: {plan['est_wall_secs'] / 60:.1f} min wall, {plan['est_compute_units']:.2f} CU "
+        f"(~${plan['est_usd']:.2f}) for {plan['urls']:,} URLs",
+    ]
+    if plan.get('page_timeout'):
+        lines.append(f"   • Timeouts: page {plan['page_timeout']}s, function {plan['function_timeout']}s")
+    if not plan['met']:
+        goal = f"{plan['target_secs']}s target" if plan['target_secs'] is not None else f"{plan['cu_budget']} CU budget"
+        lines.append(f"   ⚠️  No plan meets the {goal}; using the closest one")
+    return lines
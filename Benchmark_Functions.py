@@ -0,0 +1,320 @@
+
+import pandas as pd
+import numpy as np
+import os
+import io
+import glob
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+
+from Phone_Number_Functions import normalize_singapore_phones
+from Lead_Dedup_Functions import LeadDedupEngine, LeadRegistry
+from Epos_Matching_Functions import EposClientIndex, EPOS_EXPORT_PATH
+from Acra_Data_Functions import (
+    ACRA_DATA_DIR, SSIC_MAPPING_PATH, LIVE_STATUSES, EXCLUDED_SSIC_CODES,
+    build_acra_snapshot, load_acra_data, build_acra_dataset, query_acra
+)
+from Apify_Scrapper_Functions import merge_website_results, load_test_enrichment
+from Address_Parsing_Functions import parse_addresses
+from Scraper_Backend_Functions import LocalApifyBackend
+
+
+BENCHMARK_BASELINE_PATH = os.path.join("Staging", "Benchmarks", "baselines.json")
+BENCHMARK_ROWS = 100_000
+REGRESSION_TOLERANCE = 0.25     # flag a benchmark when it is this much slower (or hungrier) than its baseline
+
+# Committed parquet files the fixtures are sampled from
+LEAD_FIXTURE_PATHS = sorted(glob.glob(os.path.join("Data_Lake", "*.parquet")))
+SILVER_FIXTURE_PATHS = sorted(glob.glob(os.path.join("Staging", "Silver", "*.parquet")))
+FRESH_LEADS_FIXTURE_PATH = os.path.join("Staging", "Fresh_Leads_formatted.parquet")
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def load_seed_leads():
+    """Every committed Data_Lake / Silver lead row with the columns the hot paths touch."""
+    columns = ['UEN', 'Phones', 'Website', 'Facebook']
+    frames = []
+    for path in LEAD_FIXTURE_PATHS + SILVER_FIXTURE_PATHS:
+        df = pd.read_parquet(path)
+        if 'UEN' not in df.columns:
+            continue
+        frames.append(df.reindex(columns=columns))
+    if not frames:
+        raise FileNotFoundError("No Data_Lake / Staging/Silver parquet files to build fixtures from")
+    seed = pd.concat(frames, ignore_index=True)
+    return seed.astype(object).where(seed.notna(), None)
+
+
+def scale_leads(seed, n_rows, seed_value=0, duplicate_rate=0.05):
+    """
+    Sample n_rows leads from seed, keeping its mix of phone formats and missing values.
+    Each row gets a unique UEN, a fresh local number and its own website, except a duplicate_rate
+    share that reuses an earlier UEN/phone so the dedup paths have conflicts to resolve.
+    """
+    rng = np.random.default_rng(seed_value)
+    df = seed.iloc[rng.integers(0, len(seed), size=n_rows)].reset_index(drop=True)
+
+    df['UEN'] = [f"B{i:09d}X" for i in range(n_rows)]
+    local = rng.integers(0, 10_000_000, size=n_rows)
+    leading = rng.choice(['6', '8', '9'], size=n_rows)
+    has_phone = df['Phones'].notna().to_numpy()
+    df['Phones'] = [
+        f"['+65{lead}{num:07d}']" if ok else None for lead, num, ok in zip(leading, local, has_phone)
+    ]
+    has_site = df['Website'].notna().to_numpy()
+    df['Website'] = [f"https://lead-{i}.example.sg" if ok else None for i, ok in enumerate(has_site)]
+
+    duplicates = rng.random(n_rows) < duplicate_rate
+    sources = rng.integers(0, n_rows, size=n_rows)
+    df.loc[duplicates, 'UEN'] = df['UEN'].to_numpy()[sources[duplicates]]
+    shared_phone = duplicates & (rng.random(n_rows) < 0.5)
+    df.loc[shared_phone, 'Phones'] = df['Phones'].to_numpy()[sources[shared_phone]]
+    return df
+
+
+def scale_company_names(n_rows, seed_value=0):
+    """n_rows lead names: real Fresh Leads / ePOS names with synthetic suffix and token variations."""
+    rng = np.random.default_rng(seed_value)
+    names = pd.read_parquet(FRESH_LEADS_FIXTURE_PATH, columns=['ACRA REGISTERED NAME'])['ACRA REGISTERED NAME']
+    epos = pd.read_csv(EPOS_EXPORT_PATH, usecols=['organization_name'])['organization_name']
+    pool = pd.concat([names, epos], ignore_index=True).dropna().astype(str).to_numpy()
+
+    picked = pool[rng.integers(0, len(pool), size=n_rows)]
+    suffixes = np.array(['', ' PTE. LTD.', ' PTE LTD', ' (S) PTE. LTD.', ' LLP', ' SINGAPORE'])
+    variants = rng.integers(0, 4, size=n_rows)
+    numbered = np.char.add(picked.astype(str), np.char.add(' ', rng.integers(1, 5000, size=n_rows).astype(str)))
+    out = np.where(variants == 0, picked, numbered)           # mostly non-matching names, some exact hits
+    out = np.char.add(out.astype(str), suffixes[rng.integers(0, len(suffixes), size=n_rows)])
+    return pd.Series(out, dtype=object)
+
+
+def scale_acra_sources(target_dir, n_rows, data_dir=ACRA_DATA_DIR, seed_value=0):
+    """Write ACRA CSVs with n_rows entities into target_dir, replicating the committed export with new UENs."""
+    frames = [pd.read_csv(path, dtype=str, keep_default_na=False) for path in sorted(glob.glob(os.path.join(data_dir, "*.csv")))]
+    source = pd.concat(frames, ignore_index=True)
+    rng = np.random.default_rng(seed_value)
+    scaled = source.iloc[rng.integers(0, len(source), size=n_rows)].reset_index(drop=True)
+    scaled['uen'] = [f"A{i:09d}Z" for i in range(n_rows)]
+
+    os.makedirs(target_dir, exist_ok=True)
+    half = n_rows // 2
+    scaled.iloc[:half].to_csv(os.path.join(target_dir, "ACRA_benchmark_1.csv"), index=False)
+    scaled.iloc[half:].to_csv(os.path.join(target_dir, "ACRA_benchmark_2.csv"), index=False)
+    return target_dir
+
+
+def scale_addresses(n_rows, seed_value=0):
+    """
+    n_rows raw address strings rebuilt from the committed operational_* columns in the layouts
+    RecordOwl pages use ('#02-05', 'Unit 02-05', newlines, trailing 'Singapore', no postal code).
+    """
+    frames = []
+    for path in LEAD_FIXTURE_PATHS + SILVER_FIXTURE_PATHS:
+        df = pd.read_parquet(path)
+        if 'operational_street' in df.columns:
+            frames.append(df.reindex(columns=['operational_street', 'operational_unit', 'operational_postal_code']))
+    seed = pd.concat(frames, ignore_index=True).dropna(subset=['operational_street'])
+    rng = np.random.default_rng(seed_value)
+    seed = seed.iloc[rng.integers(0, len(seed), size=n_rows)].reset_index(drop=True)
+
+    street = seed['operational_street'].astype(str)
+    unit = seed['operational_unit'].fillna('').astype(str)
+    postal = seed['operational_postal_code'].fillna('').astype(str)
+    layouts = rng.integers(0, 5, size=n_rows)
+    text = street + ' #' + unit + ' Singapore ' + postal
+    text = text.where(layouts != 1, street.str.title() + ', Unit ' + unit + ', SINGAPORE ' + postal)
+    text = text.where(layouts != 2, street + '\n#' + unit + '\n' + postal)
+    text = text.where(layouts != 3, street + ' Singapore')
+    text = text.where(layouts != 4, '')
+    return text.astype(object)
+
+
+def website_results_for(leads):
+    """One Website_* result row per distinct website, shaped like the scraper's all_results."""
+    websites = leads['Website'].dropna().unique()
+    rng = np.random.default_rng(1)
+    found = rng.random(len(websites)) < 0.6
+    return pd.DataFrame({
+        'Website': websites,
+        'Website_Scrape_Status': 'success',
+        'Website_Scrape_Error': None,
+        'Website_Phones': [['+6561234567'] if ok else None for ok in found],
+        'Website_Contact_Page': None,
+        'Website_Page_Type': 'homepage',
+    })
+
+
+# ---------------------------------------------------------------------------
+# Harness
+# ---------------------------------------------------------------------------
+
+def measure(run, repeat=3):
+    """Best-of-repeat wall time, then one more call under tracemalloc for the peak Python/numpy heap."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings), peak
+
+
+def build_benchmarks(n_rows, work_dir):
+    """name -> (items processed, zero-argument callable) for every hot path."""
+    seed = load_seed_leads()
+    leads = scale_leads(seed, n_rows)
+    phones = leads['Phones']
+    results = website_results_for(leads)
+    names = scale_company_names(n_rows)
+    addresses = scale_addresses(n_rows)
+    epos_index = EposClientIndex.from_export()
+
+    acra_dir = scale_acra_sources(os.path.join(work_dir, "acra_src"), n_rows)
+    snapshot_path = os.path.join(work_dir, "acra_snapshot.parquet")
+    dataset_dir = os.path.join(work_dir, "acra_dataset")
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_acra_snapshot(acra_dir, snapshot_path)
+        build_acra_dataset(acra_dir, snapshot_path, dataset_dir, SSIC_MAPPING_PATH)
+
+    def dedup():
+        registry_path = os.path.join(work_dir, f"registry_{time.perf_counter_ns()}.sqlite")
+        registry = LeadRegistry(registry_path)
+        try:
+            LeadDedupEngine(registry).process_batch(leads, 'Benchmark')
+        finally:
+            registry.close()
+            os.remove(registry_path)
+
+    def end_to_end():
+        backend = LocalApifyBackend(failure_rate=0.02, seed=0)
+        load_test_enrichment(n_rows, kind='website', backend=backend)
+
+    return {
+        'phone_normalization': (n_rows, lambda: normalize_singapore_phones(phones)),
+        'result_merge': (n_rows, lambda: merge_website_results(leads, results)),
+        'dedup': (n_rows, dedup),
+        'acra_snapshot_build': (n_rows, lambda: build_acra_snapshot(acra_dir, snapshot_path)),
+        'acra_load_filter': (n_rows, lambda: load_acra_data(
+            acra_dir, snapshot_path, live_only=True, exclude_ssic_codes=EXCLUDED_SSIC_CODES)),
+        'acra_query': (n_rows, lambda: query_acra(
+            ssic_prefixes=['47', '56'], statuses=LIVE_STATUSES, dataset_dir=dataset_dir, refresh=False)),
+        'name_match_exact': (n_rows, lambda: epos_index.match(names, threshold=100)),
+        'name_match_fuzzy': (n_rows, lambda: epos_index.match(names, threshold=90)),
+        'address_parsing': (n_rows, lambda: parse_addresses(addresses)),
+        'end_to_end_mocked': (n_rows, end_to_end),
+    }
+
+
+def load_baselines(path=BENCHMARK_BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(baselines, path=BENCHMARK_BASELINE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def run_benchmarks(n_rows=BENCHMARK_ROWS, only=None, repeat=3, baseline_path=BENCHMARK_BASELINE_PATH,
+                   update_baseline=False, tolerance=REGRESSION_TOLERANCE):
+    """
+    Run the hot-path benchmarks on fixtures scaled to n_rows and compare them with the stored baselines.
+
+    Baselines are keyed by benchmark name and row count. A benchmark without a baseline (or every
+    benchmark, with update_baseline=True) has its result stored. Returns a DataFrame with throughput,
+    peak traced memory and the change against the baseline; regressions beyond tolerance are flagged.
+    """
+    work_dir = tempfile.mkdtemp(prefix="leadgen_bench_")
+    try:
+        print(f"🧪 Building benchmark fixtures ({n_rows:,} rows)...")
+        benchmarks = build_benchmarks(n_rows, work_dir)
+        if only:
+            unknown = set(only) - set(benchmarks)
+            if unknown:
+                raise ValueError(f"Unknown benchmarks {sorted(unknown)}; choose from {sorted(benchmarks)}")
+            benchmarks = {name: bench for name, bench in benchmarks.items() if name in only}
+
+        baselines = load_baselines(baseline_path)
+        rows = []
+        for name, (items, run) in benchmarks.items():
+            secs, peak = measure(run, repeat)
+            key = f"{name}@{n_rows}"
+            baseline = baselines.get(key)
+
+            row = {
+                'benchmark': name,
+                'rows': items,
+                'secs': secs,
+                'rows_per_sec': items / secs if secs else float('inf'),
+                'peak_mb': peak / 1e6,
+                'baseline_secs': baseline['secs'] if baseline else None,
+                'baseline_peak_mb': baseline['peak_mb'] if baseline else None,
+            }
+            row['time_change'] = secs / baseline['secs'] - 1 if baseline else None
+            row['memory_change'] = row['peak_mb'] / baseline['peak_mb'] - 1 if baseline and baseline['peak_mb'] else None
+            row['regression'] = bool(
+                baseline and ((row['time_change'] or 0) > tolerance or (row['memory_change'] or 0) > tolerance)
+            )
+            rows.append(row)
+
+            flag = '⚠️ ' if row['regression'] else '  '
+            change = f"{row['time_change']:+.0%} time, {row['memory_change'] or 0:+.0%} memory vs baseline" \
+                if baseline else "no baseline"
+            print(f"{flag}{name:<22} {secs:8.3f}s  {row['rows_per_sec']:>12,.0f} rows/s  "
+                  f"{row['peak_mb']:8.1f} MB peak  ({change})")
+
+            if update_baseline or baseline is None:
+                baselines[key] = {
+                    'secs': secs, 'peak_mb': row['peak_mb'], 'recorded_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    'python': platform.python_version(), 'pandas': pd.__version__, 'machine': platform.machine(),
+                }
+
+        save_baselines(baselines, baseline_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = pd.DataFrame(rows)
+    regressions = report.loc[report['regression'], 'benchmark'].tolist()
+    if regressions:
+        print(f"⚠️  Regressions beyond {tolerance:.0%}: {', '.join(regressions)}")
+    else:
+        print(f"✅ No regressions beyond {tolerance:.0%} (baselines: {baseline_path})")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the lead pipeline hot paths")
+    parser.add_argument("--rows", type=int, default=BENCHMARK_ROWS)
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        n_rows=args.rows, only=args.only.split(",") if args.only else None,
+        repeat=args.repeat, update_baseline=args.update_baseline
+    )
+    raise SystemExit(1 if report['regression'].any() else 0)
@@ -0,0 +1,199 @@
+
+import pandas as pd
+import numpy as np
+import re
+from rapidfuzz import process, fuzz
+
+
+EPOS_EXPORT_PATH = "./Epos_Backend/organizations_export.csv"
+
+# Legal-form suffixes stripped from the end of company names: they never tell two entities apart
+LEGAL_FORM_SUFFIXES = [
+    'PRIVATE LIMITED', 'PTE LTD', 'PVT LTD', 'LIMITED', 'LTD', 'PTE',
+    'CORPORATION', 'CORP', 'INC', 'INCORPORATED', 'LLC', 'LLP',
+]
+# Filler words the Bronze notebook's preprocess_company_name also strips, plus the "(S)" Singapore
+# marker. "ABC (S)" and "ABC" can be distinct ACRA entities, so these are only stripped on request
+FILLER_SUFFIXES = ['SINGAPORE', 'S G', 'SG', 'COMPANY', 'CO', 'PROPRIETARY', 'PROP', 'S']
+COMPANY_SUFFIXES = LEGAL_FORM_SUFFIXES + FILLER_SUFFIXES
+
+TRAILING_QUALIFIER_PATTERN = r'\s*\(([^)]*)\)\s*$'    # e.g. "... PTE. LTD. (Drinks Stall)"
+NON_WORD_PATTERN = r'[^\w\s]'
+
+
+def _suffix_pattern(suffixes):
+    return r'(?:\s+(?:' + '|'.join(
+        re.escape(suffix).replace(r'\ ', r'\s+') for suffix in sorted(suffixes, key=len, reverse=True)
+    ) + r'))+\s*$'
+
+
+LEGAL_SUFFIX_PATTERN = _suffix_pattern(LEGAL_FORM_SUFFIXES)
+SUFFIX_PATTERN = _suffix_pattern(COMPANY_SUFFIXES)
+# A bracketed qualifier made only of filler words, e.g. "(S)" or "(Singapore)"
+FILLER_QUALIFIER_PATTERN = r'^(?:\s*(?:' + '|'.join(
+    re.escape(suffix).replace(r'\ ', r'\s+') for suffix in sorted(FILLER_SUFFIXES, key=len, reverse=True)
+) + r'))+\s*$'
+
+
+def canonical_company_names(names, strip_fillers=False):
+    """
+    Canonical matching key for a Series of company names: uppercase, punctuation removed,
+    trailing qualifiers and legal suffixes (PTE LTD, LLP, ...) stripped, tokens sorted.
+    strip_fillers also strips FILLER_SUFFIXES (SINGAPORE, CO, (S), ...), for fuzzy matching only.
+    A trailing "(S)" / "(Singapore)" qualifier counts like the same words before the legal suffix,
+    so "ABC (S)", "ABC (S) Pte Ltd" and "ABC Pte Ltd (S)" share a key. Missing names give an empty key.
+    """
+    names = pd.Series(names, dtype=object)
+    upper = names.where(names.notna(), '').astype(str).str.upper()
+
+    qualifiers = upper.str.extract(TRAILING_QUALIFIER_PATTERN, expand=False).fillna('')
+    qualifiers = qualifiers.str.replace(NON_WORD_PATTERN, ' ', regex=True)
+    keep = qualifiers.str.match(FILLER_QUALIFIER_PATTERN) & (not strip_fillers)
+    qualifiers = qualifiers.where(keep, '')
+
+    cleaned = (
+        upper.str.replace(TRAILING_QUALIFIER_PATTERN, '', regex=True)
+        .str.replace(NON_WORD_PATTERN, ' ', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+    pattern = SUFFIX_PATTERN if strip_fillers else LEGAL_SUFFIX_PATTERN
+    cleaned = (' ' + cleaned).str.replace(pattern, '', regex=True) + ' ' + qualifiers
+    return cleaned.str.split().map(lambda tokens: ' '.join(sorted(tokens)) if tokens else '')
+
+
+class EposClientIndex:
+    """
+    Lookup index over ePOS backend organization names.
+
+    Exact path: hash index on the canonical name key (legal-form suffixes stripped only).
+    Near path (threshold < 100): keys with filler suffixes stripped too, candidate blocking on
+    token prefixes, then rapidfuzz cdist batch scoring of each block across all cores.
+    """
+
+    def __init__(self, organization_names, block_prefix_len=3, max_block_size=None):
+        names = pd.Series(organization_names, dtype=object).dropna().astype(str).str.strip()
+        names = names[names != ''].drop_duplicates().reset_index(drop=True)
+
+        self.names = names
+        self.keys = canonical_company_names(names)
+        self.fuzzy_keys = canonical_company_names(names, strip_fillers=True)
+        self.block_prefix_len = block_prefix_len
+        self.max_block_size = max_block_size
+
+        # Exact index: canonical key -> first organization name with that key
+        keyed = pd.DataFrame({'key': self.keys, 'name': names})
+        keyed = keyed[keyed['key'] != ''].drop_duplicates(subset='key')
+        self.exact_index = dict(zip(keyed['key'], keyed['name']))
+
+        # Blocking index: token prefix -> positions of organizations containing it
+        self.block_index = self._build_blocks(self.fuzzy_keys)
+
+    @classmethod
+    def from_export(cls, path=EPOS_EXPORT_PATH, active_only=True, **kwargs):
+        """Build the index from the ePOS backend organizations export."""
+        epos_backend_df = pd.read_csv(path, on_bad_lines="skip")
+        if active_only:
+            epos_backend_df = epos_backend_df[epos_backend_df["status"] == "Active"]
+        return cls(epos_backend_df["organization_name"], **kwargs)
+
+    def _block_keys(self, keys):
+        """Explode keys into (position, token prefix) pairs."""
+        tokens = keys.str.split().explode().dropna()
+        tokens = tokens[tokens.str.len() >= self.block_prefix_len]
+        prefixes = tokens.str[:self.block_prefix_len]
+        return prefixes[~prefixes.to_frame('prefix').reset_index().duplicated().to_numpy()]
+
+    def _build_blocks(self, keys):
+        prefixes = self._block_keys(keys)
+        blocks = prefixes.groupby(prefixes.values).groups
+        return {prefix: np.asarray(positions) for prefix, positions in blocks.items()}
+
+    def match(self, names, threshold=100, workers=-1):
+        """
+        Match a Series of lead names against the index.
+        Returns a DataFrame aligned to names with 'Matched ePOS Name' and 'Similarity Score'
+        (NaN/None where no organization reaches the threshold).
+        """
+        names = pd.Series(names, dtype=object)
+        keys = canonical_company_names(names).to_numpy()
+
+        matched = pd.Series(keys, dtype=object).map(self.exact_index)
+        scores = pd.Series(np.where(matched.notna(), 100.0, np.nan))
+
+        if threshold < 100:
+            fuzzy_keys = canonical_company_names(names, strip_fillers=True).to_numpy()
+            pending = np.flatnonzero(matched.isna().to_numpy() & (fuzzy_keys != ''))
+            near_names, near_scores = self._near_match(fuzzy_keys, pending, threshold, workers)
+            matched.iloc[pending] = near_names
+            scores.iloc[pending] = near_scores
+
+        return pd.DataFrame({
+            'Matched ePOS Name': matched.where(matched.notna(), None).to_numpy(),
+            'Similarity Score': scores.to_numpy()
+        }, index=names.index)
+
+    def _near_match(self, keys, pending, threshold, workers):
+        best_scores = np.full(len(pending), -1.0)
+        best_choice = np.full(len(pending), -1)
+        if len(pending) == 0:
+            return np.array([], dtype=object), best_scores
+
+        pending_keys = pd.Series(keys[pending])
+        lead_prefixes = self._block_keys(pending_keys)
+        lead_blocks = lead_prefixes.groupby(lead_prefixes.values).groups
+        org_keys = self.fuzzy_keys.to_numpy()
+
+        for prefix, lead_positions in lead_blocks.items():
+            org_positions = self.block_index.get(prefix)
+            if org_positions is None:
+                continue
+            if self.max_block_size and len(org_positions) > self.max_block_size:
+                continue   # Token prefix too common to be a useful block
+
+            lead_positions = np.asarray(lead_positions)
+            # Keys are already token-sorted, so plain ratio equals token_sort_ratio here
+            matrix = process.cdist(
+                pending_keys.to_numpy()[lead_positions],
+                org_keys[org_positions],
+                scorer=fuzz.ratio,
+                score_cutoff=threshold,
+                workers=workers,
+                dtype=np.float32
+            )
+            block_best = matrix.argmax(axis=1)
+            block_scores = matrix[np.arange(len(lead_positions)), block_best]
+
+            improved = block_scores > best_scores[lead_positions]
+            best_scores[lead_positions[improved]] = block_scores[improved]
+            best_choice[lead_positions[improved]] = org_positions[block_best[improved]]
+
+        found = (best_choice >= 0) & (best_scores >= threshold)
+        near_names = np.where(found, self.names.to_numpy()[np.maximum(best_choice, 0)], None)
+        return near_names, np.where(found, best_scores, np.nan)
+
+
+def flag_epos_clients(leads_df, index=None, name_column='ACRA REGISTERED NAME', threshold=100, workers=-1):
+    """
+    Set 'Current ePOS Client ?' to 'Yes'/'No' for every lead and return (leads_df, matches_df).
+    matches_df lists each matched lead with its ePOS name and similarity score.
+    """
+    if index is None:
+        index = EposClientIndex.from_export()
+
+    leads_df = leads_df.copy()
+    result = index.match(leads_df[name_column], threshold=threshold, workers=workers)
+
+    is_client = result['Matched ePOS Name'].notna()
+    leads_df['Current ePOS Client ?'] = np.where(is_client, 'Yes', 'No')
+
+    matches_df = pd.DataFrame({
+        'Fresh Lead Name': leads_df.loc[is_client, name_column].astype(str).str.strip(),
+        'Matched ePOS Name': result.loc[is_client, 'Matched ePOS Name'],
+        'Similarity Score': result.loc[is_client, 'Similarity Score']
+    })
+
+    print(f"Checked {len(leads_df)} leads against {len(index.names)} ePOS backend organizations")
+    print(f"Total matches found: {int(is_client.sum())}")
+
+    return leads_df, matches_df
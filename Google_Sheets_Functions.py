@@ -0,0 +1,316 @@
+
+import pandas as pd
+import os
+import json
+import time
+import random
+import requests
+from urllib.parse import quote
+
+from Master_DB_Functions import clean_uens
+
+
+SHEETS_API_BASE = "https://sheets.googleapis.com/v4/spreadsheets"
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "credentials.json")
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Request bounds: Sheets rejects very large payloads and large pushes are what hit quota/timeouts
+MAX_CELLS_PER_REQUEST = 40_000
+MAX_ROWS_PER_REQUEST = 2_000
+
+
+class SheetsAPIError(Exception):
+    """Non-retryable Sheets API error, or a retryable one that ran out of attempts."""
+
+    def __init__(self, status_code, message):
+        super().__init__(f"Sheets API error {status_code}: {message}")
+        self.status_code = status_code
+
+
+def create_sheets_session(service_account_file=SERVICE_ACCOUNT_FILE, scopes=SCOPES):
+    """Authorized requests session for the service account (same credentials the notebooks use)."""
+    from google.oauth2.service_account import Credentials
+    from google.auth.transport.requests import AuthorizedSession
+
+    if not os.path.exists(service_account_file):
+        raise FileNotFoundError(
+            f"Service account file not found at '{service_account_file}'. "
+            "Set GOOGLE_APPLICATION_CREDENTIALS to the full path, or place credentials.json next to this notebook."
+        )
+    credentials = Credentials.from_service_account_file(service_account_file, scopes=scopes)
+    return AuthorizedSession(credentials)
+
+
+def column_letter(n):
+    """1-based column number to A1 letters: 1 -> A, 27 -> AA."""
+    letters = ''
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def a1_range(sheet_name, first_row, last_row, last_column, first_column=1):
+    escaped = sheet_name.replace("'", "''")
+    return f"'{escaped}'!{column_letter(first_column)}{first_row}:{column_letter(last_column)}{last_row}"
+
+
+class SheetsClient:
+    """
+    Minimal Sheets v4 REST client over a requests-compatible session.
+
+    Retries 429/5xx responses and connection errors with exponential backoff (honouring
+    Retry-After). base_url can point at a local fake endpoint for testing.
+    """
+
+    def __init__(self, session, spreadsheet_id, base_url=SHEETS_API_BASE, timeout=120,
+                 max_retries=5, backoff_base=1.0, max_backoff=64):
+        self.session = session
+        self.spreadsheet_id = spreadsheet_id
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.request_count = 0
+
+    def _request(self, method, path, params=None, body=None):
+        url = f"{self.base_url}/{self.spreadsheet_id}{path}"
+
+        for attempt in range(self.max_retries + 1):
+            wait_time = min(self.max_backoff, self.backoff_base * (2 ** attempt)) * (0.5 + random.random() / 2)
+            try:
+                self.request_count += 1
+                response = self.session.request(method, url, params=params, json=body, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"⚠ Sheets request failed ({type(e).__name__}), retrying in {wait_time:.1f}s...")
+                time.sleep(wait_time)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.isdigit():
+                    wait_time = min(self.max_backoff, float(retry_after))
+                print(f"⚠ Sheets API returned {response.status_code}, retrying in {wait_time:.1f}s...")
+                time.sleep(wait_time)
+                continue
+
+            if response.status_code >= 400:
+                raise SheetsAPIError(response.status_code, response.text[:500])
+            return response.json() if response.content else {}
+
+    def sheet_row_count(self, sheet_name):
+        """Grid row count of a sheet (includes empty rows), used to bound ranged reads."""
+        result = self._request('GET', '', params={'fields': 'sheets.properties(title,gridProperties.rowCount)'})
+        for sheet in result.get('sheets', []):
+            properties = sheet.get('properties', {})
+            if properties.get('title') == sheet_name:
+                return properties.get('gridProperties', {}).get('rowCount', 0)
+        raise SheetsAPIError(404, f"Sheet '{sheet_name}' not found")
+
+    def batch_get(self, ranges, value_render_option='UNFORMATTED_VALUE'):
+        """
+        values:batchGet -> list of row lists, one per range. Values are unformatted by default
+        (56111 rather than '56,111'), so display formats never show up as changes.
+        """
+        result = self._request('GET', '/values:batchGet', params={
+            'ranges': list(ranges), 'majorDimension': 'ROWS',
+            'valueRenderOption': value_render_option, 'dateTimeRenderOption': 'FORMATTED_STRING',
+        })
+        return [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+
+    def batch_update(self, data, value_input_option='RAW'):
+        """values:batchUpdate with a list of {'range', 'values'} dicts."""
+        return self._request('POST', '/values:batchUpdate', body={'valueInputOption': value_input_option, 'data': data})
+
+    def append(self, range_a1, rows, value_input_option='RAW'):
+        """values:append rows after the table in range_a1."""
+        return self._request(
+            'POST', f"/values/{quote(range_a1, safe='')}:append",
+            params={'valueInputOption': value_input_option, 'insertDataOption': 'INSERT_ROWS'},
+            body={'values': rows}
+        )
+
+
+def unique_header(header):
+    """
+    Header cells as unique column labels, position for position: blank cells become col_<n> and
+    repeated names get a .1, .2, ... suffix, so only the first column of a name is synced.
+    """
+    labels = []
+    for position, cell in enumerate(header, start=1):
+        label = str(cell).strip() or f'col_{position}'
+        candidate, copy = label, 0
+        while candidate in labels:
+            copy += 1
+            candidate = f'{label}.{copy}'
+        labels.append(candidate)
+    return labels
+
+
+def read_sheet(client, sheet_name, chunk_rows=5000, ranges_per_request=4, n_columns=702):
+    """
+    Read a sheet in row-ranged chunks, several ranges per batchGet, up to the sheet's row count.
+    Returns (header, DataFrame of string values with a '_row' column holding the sheet row number);
+    header holds the unique_header labels, one per sheet column, and cells are read unformatted.
+    """
+    row_count = client.sheet_row_count(sheet_name)
+    header = client.batch_get([a1_range(sheet_name, 1, 1, n_columns)])[0]
+    header = header[0] if header else []
+
+    rows = []
+    starts = list(range(2, row_count + 1, chunk_rows))
+    for i in range(0, len(starts), ranges_per_request):
+        batch = starts[i:i + ranges_per_request]
+        chunks = client.batch_get([
+            a1_range(sheet_name, start, min(start + chunk_rows - 1, row_count), n_columns) for start in batch
+        ])
+        for start, chunk in zip(batch, chunks):
+            # Rows come back in order from the range start; trailing empty rows are omitted
+            rows.extend((start + offset, row) for offset, row in enumerate(chunk) if row)
+
+    width = max([len(header)] + [len(row) for _, row in rows]) if rows else len(header)
+    header = unique_header(header + [''] * (width - len(header)))
+    normalized_rows = [row + [''] * (width - len(row)) for _, row in rows]
+
+    # Unformatted numbers and booleans come back typed; compare them as the text they were written as
+    df = pd.DataFrame(normalized_rows, columns=header, dtype=object).apply(to_sheet_text)
+    df['_row'] = [row_number for row_number, _ in rows]
+    print(f"📥 Read '{sheet_name}': {len(df)} rows x {len(header)} columns in {client.request_count} request(s)")
+    return header, df
+
+
+def to_sheet_text(values):
+    """Render a column the way it reads back from Sheets: '' for missing, 56111 not 56111.0."""
+    values = pd.Series(values)
+    if pd.api.types.is_float_dtype(values):
+        integral = values.notna() & (values % 1 == 0)
+        text = values.astype(object).where(values.notna(), '').astype(str)
+        text[integral] = values[integral].astype('int64').astype(str)
+        return text
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime('%Y-%m-%d').fillna('').astype(object)
+
+    values = values.astype(object)
+    return values.where(values.notna(), '').astype(str)
+
+
+def diff_frame_against_sheet(sheet_df, local_df, header, key='UEN'):
+    """
+    Cell-level diff keyed on the normalized key column.
+    Returns (updates, appends): updates is a list of (sheet_row, first_column, values) spans
+    covering only the cells whose values differ, one span per run of adjacent sheet columns;
+    appends is a list of value rows for keys not yet in the sheet. Cells the local frame leaves
+    alone (other columns, and unchanged typed numbers, checkboxes and dates) are never rewritten,
+    and sheet rows without a local counterpart are left untouched.
+    """
+    columns = [col for col in header if col in local_df.columns]
+    local_text = pd.DataFrame({col: to_sheet_text(local_df[col]) for col in columns}, index=local_df.index)
+    local_text['_key'] = clean_uens(local_df[key]).to_numpy()
+    local_text = local_text[local_text['_key'].notna()].drop_duplicates('_key', keep='last').set_index('_key')
+
+    sheet_keys = clean_uens(sheet_df[key]) if key in sheet_df.columns else pd.Series(pd.NA, index=sheet_df.index)
+    sheet_side = sheet_df.assign(_key=sheet_keys.to_numpy())
+    duplicated = sheet_side['_key'].notna() & sheet_side['_key'].duplicated()
+    if duplicated.any():
+        print(f"⚠ {int(duplicated.sum())} duplicate {key} rows in the sheet; only the first of each is synced")
+    sheet_side = sheet_side[sheet_side['_key'].notna() & ~duplicated].set_index('_key')
+
+    common = local_text.index.intersection(sheet_side.index)
+    old = sheet_side.loc[common, columns].astype(str)
+    new = local_text.loc[common, columns]
+    differs = old.to_numpy() != new.to_numpy()
+    changed = differs.any(axis=1)
+
+    positions = [header.index(col) + 1 for col in columns]
+    updates = []
+    for row_number, row_differs, values in zip(sheet_side.loc[common[changed], '_row'].astype(int),
+                                               differs[changed], new.to_numpy()[changed].tolist()):
+        cells = [(position, value) for position, differ, value in zip(positions, row_differs, values) if differ]
+        start = 0
+        for end in range(1, len(cells) + 1):
+            if end == len(cells) or cells[end][0] != cells[end - 1][0] + 1:
+                updates.append((int(row_number), cells[start][0], [value for _, value in cells[start:end]]))
+                start = end
+
+    new_keys = local_text.index.difference(sheet_side.index, sort=False)
+    appended = local_text.loc[new_keys].reindex(columns=header, fill_value='')
+    appends = appended.to_numpy().tolist()
+
+    return updates, appends
+
+
+def bounded_chunks(items, n_columns, max_cells=MAX_CELLS_PER_REQUEST, max_rows=MAX_ROWS_PER_REQUEST):
+    rows_per_chunk = max(1, min(max_rows, max_cells // max(n_columns, 1)))
+    for start in range(0, len(items), rows_per_chunk):
+        yield items[start:start + rows_per_chunk]
+
+
+def sync_frame_to_sheet(client, sheet_name, local_df, key='UEN', chunk_rows=5000,
+                        max_cells=MAX_CELLS_PER_REQUEST, max_rows=MAX_ROWS_PER_REQUEST, dry_run=False):
+    """
+    Incrementally sync local_df into a sheet keyed by UEN.
+
+    Reads the sheet in ranged chunks, diffs cell by cell, then writes only the changed cells with
+    values:batchUpdate (the same column span on consecutive rows coalesced into one range) and
+    new rows with values:append, each request bounded by max_cells / max_rows.
+    """
+    start_time = time.time()
+    header, sheet_df = read_sheet(client, sheet_name, chunk_rows=chunk_rows)
+    if not header:
+        header = [col for col in local_df.columns]
+        sheet_df = pd.DataFrame(columns=header + ['_row'], dtype=object)
+        if not dry_run:
+            client.batch_update([{'range': a1_range(sheet_name, 1, 1, len(header)), 'values': [header]}])
+    elif key not in header:
+        raise ValueError(f"Sheet '{sheet_name}' has no '{key}' column to sync on")
+
+    updates, appends = diff_frame_against_sheet(sheet_df, local_df, header, key=key)
+    updated_rows = len({row_number for row_number, _, _ in updates})
+    print(f"🔍 Diff: {updated_rows} changed rows ({len(updates)} cell spans), {len(appends)} new rows, "
+          f"{len(sheet_df) - updated_rows} unchanged/untouched sheet rows")
+
+    if not dry_run:
+        # Coalesce the same column span on consecutive sheet rows into single ranges
+        value_ranges, run = [], []
+        for row_number, first_column, values in sorted(updates, key=lambda item: (item[1], len(item[2]), item[0])):
+            if run and (first_column, len(values), row_number) != (run[-1][1], len(run[-1][2]), run[-1][0] + 1):
+                value_ranges.append(run)
+                run = []
+            run.append((row_number, first_column, values))
+        if run:
+            value_ranges.append(run)
+
+        pending, pending_cells, pending_rows = [], 0, 0
+        for run in value_ranges:
+            first_column, width = run[0][1], len(run[0][2])
+            for piece in bounded_chunks(run, width, max_cells, max_rows):
+                cells = len(piece) * width
+                if pending and (pending_cells + cells > max_cells or pending_rows + len(piece) > max_rows):
+                    client.batch_update(pending)
+                    pending, pending_cells, pending_rows = [], 0, 0
+                pending.append({
+                    'range': a1_range(sheet_name, piece[0][0], piece[-1][0], first_column + width - 1, first_column),
+                    'values': [values for _, _, values in piece]
+                })
+                pending_cells += cells
+                pending_rows += len(piece)
+        if pending:
+            client.batch_update(pending)
+
+        for chunk in bounded_chunks(appends, len(header), max_cells, max_rows):
+            client.append(a1_range(sheet_name, 1, 1, len(header)), chunk)
+
+    summary = {
+        'updated_rows': updated_rows,
+        'appended_rows': len(appends),
+        'sheet_rows': len(sheet_df),
+        'requests': client.request_count,
+        'seconds': round(time.time() - start_time, 2),
+    }
+    print(f"✅ Sheet sync{' (dry run)' if dry_run else ''}: {json.dumps(summary)}")
+    return summary
@@ -0,0 +1,245 @@
+
+import pandas as pd
+import numpy as np
+import os
+import re
+import glob
+import time
+import sqlite3
+
+from Phone_Number_Functions import normalize_singapore_phones, lists_by_label
+from Master_DB_Functions import clean_uens
+
+
+LEAD_REGISTRY_PATH = "Staging/Cache/lead_registry.sqlite"
+DATA_LAKE_DIR = "Data_Lake"
+
+# Reject reasons, in priority order (a row gets the first reason that applies)
+REJECT_REASONS = (
+    'NO_UEN',
+    'UEN_DUPLICATE_IN_BATCH',
+    'UEN_REGISTERED',
+    'PHONE_REGISTERED',
+    'PHONE_DUPLICATE_IN_BATCH',
+    'NO_PHONE',
+)
+
+# Conflict rules:
+#   uen_in_batch      'reject_all' rejects every copy (duplicated(keep=False)), 'keep_first' keeps the first
+#   uen_registered    'reject' or 'allow' (e.g. re-enriching a lead already in the Data Lake)
+#   phone_in_batch    'reject_all' rejects every lead sharing a phone, 'keep_first' keeps the first lead
+#   phone_registered  'reject' the lead, 'drop_phone' keeps the lead without the taken numbers, or 'allow'
+#   require_phone     reject leads left without any phone
+DEFAULT_DEDUP_RULES = {
+    'uen_in_batch': 'reject_all',
+    'uen_registered': 'reject',
+    'phone_in_batch': 'reject_all',
+    'phone_registered': 'reject',
+    'require_phone': False,
+}
+
+RULE_CHOICES = {
+    'uen_in_batch': ('reject_all', 'keep_first'),
+    'uen_registered': ('reject', 'allow'),
+    'phone_in_batch': ('reject_all', 'keep_first'),
+    'phone_registered': ('reject', 'drop_phone', 'allow'),
+    'require_phone': (True, False),
+}
+
+
+def industry_from_filename(path):
+    """'Data_Lake/CarMotor_Service_1050.parquet' -> 'CarMotor_Service'"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r'_\d+$', '', stem)
+
+
+class LeadRegistry:
+    """
+    Persistent SQLite registry of every UEN and phone already assigned to a lead, across industries.
+    Lookups go through in-memory hash indexes loaded once on open; new assignments are written
+    through to SQLite in one executemany per batch.
+    """
+
+    def __init__(self, path=LEAD_REGISTRY_PATH):
+        self.path = path
+
+        registry_dir = os.path.dirname(path)
+        if registry_dir:
+            os.makedirs(registry_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS uens (
+                uen TEXT PRIMARY KEY,
+                industry TEXT,
+                assigned_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS phones (
+                phone TEXT PRIMARY KEY,
+                uen TEXT NOT NULL,
+                industry TEXT,
+                assigned_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                seeded_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+        self.uen_industry = dict(self.conn.execute("SELECT uen, industry FROM uens"))
+        self.phone_owner = dict(self.conn.execute("SELECT phone, uen FROM phones"))
+
+    def __len__(self):
+        return len(self.uen_industry)
+
+    def register(self, uens, phone_pairs, industry):
+        """Record accepted UENs and (phone, uen) pairs; already-registered keys are left as they are."""
+        now = time.time()
+        new_uens = [uen for uen in dict.fromkeys(uens) if uen not in self.uen_industry]
+        new_phones = [(phone, uen) for phone, uen in dict.fromkeys(phone_pairs) if phone not in self.phone_owner]
+
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO uens (uen, industry, assigned_at) VALUES (?, ?, ?)",
+            [(uen, industry, now) for uen in new_uens]
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO phones (phone, uen, industry, assigned_at) VALUES (?, ?, ?, ?)",
+            [(phone, uen, industry, now) for phone, uen in new_phones]
+        )
+        self.uen_industry.update((uen, industry) for uen in new_uens)
+        self.phone_owner.update(new_phones)
+
+    def seed_from_data_lake(self, data_lake_dir=DATA_LAKE_DIR, uen_column='UEN', phone_column='Phones'):
+        """Register every lead in the Data Lake parquet files; files unchanged since the last seed are skipped."""
+        seeded = dict(self.conn.execute("SELECT path, mtime FROM sources"))
+        added_uens = len(self.uen_industry)
+
+        for path in sorted(glob.glob(os.path.join(data_lake_dir, "*.parquet"))):
+            mtime = os.path.getmtime(path)
+            if seeded.get(path) == mtime:
+                continue
+
+            df = pd.read_parquet(path, columns=[uen_column, phone_column])
+            uens = clean_uens(df[uen_column]).to_numpy(dtype=object, na_value=None)
+            phones = normalize_singapore_phones(df[phone_column].reset_index(drop=True)).explode().dropna()
+            owners = uens[phones.index.to_numpy()]
+            owned = pd.notna(owners)
+            phone_pairs = list(zip(phones.to_numpy()[owned], owners[owned]))
+
+            self.register([uen for uen in uens if uen is not None], phone_pairs, industry_from_filename(path))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources (path, mtime, seeded_at) VALUES (?, ?, ?)", (path, mtime, time.time())
+            )
+            print(f"📚 Registry seeded from {os.path.basename(path)}: {len(df)} leads")
+
+        self.conn.commit()
+        print(f"   • Registry: {len(self.uen_industry):,} UENs (+{len(self.uen_industry) - added_uens:,}), "
+              f"{len(self.phone_owner):,} phones")
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class LeadDedupEngine:
+    """
+    Single-pass lead dedup against the registry and within the incoming batch.
+
+    process_batch returns (accepted, rejected); rejected carries a 'Reject Reason' column
+    (see REJECT_REASONS). Accepted leads are registered, so the next batch - from any
+    industry - is checked against them without rescanning earlier frames.
+    """
+
+    def __init__(self, registry=None, rules=None):
+        self.registry = registry if registry is not None else LeadRegistry()
+        self.rules = {**DEFAULT_DEDUP_RULES, **(rules or {})}
+        for rule, value in self.rules.items():
+            if rule not in RULE_CHOICES:
+                raise ValueError(f"Unknown dedup rule {rule!r}")
+            if value not in RULE_CHOICES[rule]:
+                raise ValueError(f"Dedup rule {rule!r} must be one of {RULE_CHOICES[rule]}, got {value!r}")
+
+    def process_batch(self, df, industry, uen_column='UEN', phone_column='Phones', register=True, say=print):
+        rules = self.rules
+        n = len(df)
+        positions = np.arange(n)
+
+        uens = clean_uens(df[uen_column]).to_numpy(dtype=object, na_value=None)
+        uen_series = pd.Series(uens)
+
+        # One row per (lead, phone); list cells and list text are both handled by the normalizer
+        phones = normalize_singapore_phones(df[phone_column].reset_index(drop=True)) if phone_column in df else \
+            pd.Series([None] * n, dtype=object)
+        pairs = phones.explode().dropna().rename('phone').to_frame()
+        pairs['uen'] = uens[pairs.index.to_numpy()]
+        pairs['row'] = pairs.index.to_numpy()
+        pairs = pairs.drop_duplicates(subset=['row', 'phone'])
+
+        reason = np.full(n, None, dtype=object)
+
+        def reject(mask, why):
+            reason[mask & pd.isna(reason)] = why
+
+        reject(uen_series.isna().to_numpy(), 'NO_UEN')
+
+        keep_all = rules['uen_in_batch'] == 'reject_all'
+        reject((uen_series.notna() & uen_series.duplicated(keep=False if keep_all else 'first')).to_numpy(),
+               'UEN_DUPLICATE_IN_BATCH')
+
+        if rules['uen_registered'] == 'reject':
+            reject(uen_series.isin(self.registry.uen_industry).to_numpy(), 'UEN_REGISTERED')
+
+        # Phones owned by a different UEN in the registry
+        owner = pairs['phone'].map(self.registry.phone_owner)
+        pairs['taken'] = owner.notna() & (owner != pairs['uen'])
+        if rules['phone_registered'] == 'reject':
+            taken_rows = pairs.loc[pairs['taken'], 'row'].unique()
+            reject(np.isin(positions, taken_rows), 'PHONE_REGISTERED')
+        elif rules['phone_registered'] == 'drop_phone':
+            pairs = pairs[~pairs['taken']]
+        pairs = pairs[pd.isna(reason[pairs['row'].to_numpy()])]
+
+        # Phones shared by different leads inside the batch (same lead listing a number twice is fine)
+        distinct = pairs.drop_duplicates(subset=['phone', 'uen'])
+        if rules['phone_in_batch'] == 'reject_all':
+            shared = distinct['phone'][distinct['phone'].duplicated(keep=False)]
+            clash_rows = pairs.loc[pairs['phone'].isin(shared), 'row'].unique()
+        else:
+            losers = distinct[distinct['phone'].duplicated(keep='first')]
+            clash_rows = losers['row'].unique()
+        reject(np.isin(positions, clash_rows), 'PHONE_DUPLICATE_IN_BATCH')
+        pairs = pairs[pd.isna(reason[pairs['row'].to_numpy()])]
+
+        if rules['require_phone']:
+            reject(~np.isin(positions, pairs['row'].unique()), 'NO_PHONE')
+
+        accepted_mask = pd.isna(reason)
+        accepted = df[accepted_mask].copy()
+        rejected = df[~accepted_mask].copy()
+        rejected['Reject Reason'] = reason[~accepted_mask]
+
+        if rules['phone_registered'] == 'drop_phone' and phone_column in df:
+            # Accepted leads keep only the numbers that were not taken
+            kept = lists_by_label(pairs.loc[pairs['row'].isin(positions[accepted_mask]), 'phone'])
+            accepted[phone_column] = pd.Series(positions[accepted_mask]).map(kept).to_numpy()
+
+        if register:
+            accepted_pairs = pairs[pairs['row'].isin(positions[accepted_mask])]
+            self.registry.register(
+                [uen for uen in uens[accepted_mask] if uen is not None],
+                list(zip(accepted_pairs['phone'], accepted_pairs['uen'])),
+                industry
+            )
+            self.registry.commit()
+
+        say(f"🧮 Dedup '{industry}': {len(accepted)} accepted, {len(rejected)} rejected")
+        if len(rejected):
+            for why, count in rejected['Reject Reason'].value_counts().items():
+                say(f"   • {why}: {count}")
+
+        return accepted, rejected
@@ -0,0 +1,512 @@
+
+import os
+import json
+import time
+import sqlite3
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from Epos_Matching_Functions import canonical_company_names
+from Outbound_Http_Functions import OutboundHttpClient
+from Pipeline_Metrics_Functions import RunMetrics
+
+
+LUSHA_API_KEY_ENV = "LUSHA_API_KEY"
+LUSHA_BASE_URL_ENV = "LUSHA_BASE_URL"           # point at a local mock server for offline runs
+LUSHA_BASE_URL = "https://api.lusha.com"
+CONTACT_SEARCH_PATH = "/prospecting/contact/search"
+CONTACT_ENRICH_PATH = "/prospecting/contact/enrich"
+
+LUSHA_CACHE_PATH = os.path.join("Staging", "Cache", "lusha_responses.sqlite")
+
+SEARCH_BATCH_SIZE = 50          # Lusha's limit on company names per search filter
+SEARCH_PAGE_SIZE_BOUNDS = (10, 50)  # Lusha rejects search pages outside this range
+MAX_SEARCH_PAGES = 20           # per batch; companies past the last page are left uncached
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Key decision maker titles (prioritized)
+DECISION_MAKER_KEYWORDS = [
+    'ceo', 'chief executive', 'founder', 'co-founder', 'owner', 'president',
+    'director', 'managing director', 'general manager', 'head', 'principal',
+    'chairman', 'chairwoman', 'partner', 'proprietor'
+]
+
+# (first name, last name, designation, contact number) columns of each PIC slot, in fill order
+PIC_SLOTS = [
+    ('First Name', 'Last Name', 'PIC Name 1 Designation', 'PIC NAME 1 Contact Number'),
+    ('First Name 2', 'Last Name 2', 'PIC Name 2 Designation', 'PIC NAME 2 Contact Number'),
+    ('First Name 3', 'Last Name 3', 'PIC Name Designation 3', 'PIC NAME 3 Contact Number'),
+]
+LUSHA_FLAG_COLUMN = 'Contact Number from Lusha?'
+CONTACT_COLUMNS = ['Contact_Name', 'Contact_Title', 'Contact_Number', 'Is_Decision_Maker']
+
+
+class LushaApiError(Exception):
+    """A Lusha request that still failed after its retries."""
+
+
+def is_decision_maker(title):
+    """Check if title indicates a key decision maker"""
+    if not title or title == 'N/A':
+        return False
+    title_lower = title.lower()
+    return any(keyword in title_lower for keyword in DECISION_MAKER_KEYWORDS)
+
+
+def extract_singapore_mobile(phone_numbers):
+    """
+    First Singapore mobile (+65 8XXX XXXX / +65 9XXX XXXX, or a +65 number typed as mobile)
+    from Lusha's phoneNumbers list, or None.
+    """
+    for phone_obj in phone_numbers or []:
+        number = phone_obj.get('number', '') or ''
+        phone_type = (phone_obj.get('type', '') or '').lower()
+        clean_number = number.replace(' ', '').replace('-', '')
+        if not clean_number.startswith('+65'):
+            continue
+        if clean_number[3:4] in ('8', '9') or phone_type in ('mobile', 'mobile_phone', 'personal'):
+            return number
+    return None
+
+
+def candidate_contacts(contacts):
+    """
+    Contacts worth enriching for one company, best tier first: decision makers flagged with a
+    mobile, then anyone flagged with a mobile, then any decision maker, then the first 3 contacts.
+    """
+    with_mobile = [c for c in contacts if c.get('hasMobilePhone', False) is True]
+    decision_makers = [c for c in contacts if is_decision_maker(c.get('jobTitle', ''))]
+    decision_makers_with_mobile = [c for c in decision_makers if c.get('hasMobilePhone', False) is True]
+    return decision_makers_with_mobile or with_mobile or decision_makers or contacts[:3]
+
+
+def company_keys(df, name_column, uen_column=None):
+    """Cache / dedup key per row: the UEN when present, else the canonical company name (None if neither)."""
+    names = canonical_company_names(df[name_column])
+    keys = ('NAME:' + names).where(names != '', None)
+    if uen_column and uen_column in df.columns:
+        uens = df[uen_column].astype(object).where(df[uen_column].notna(), '').astype(str).str.strip().str.upper()
+        keys = ('UEN:' + uens).where(~uens.isin(['', 'NONE', 'NAN']), keys)
+    return keys
+
+
+class LushaResponseCache:
+    """
+    On-disk SQLite cache of Lusha responses, so repeated companies cost zero credits.
+    searches holds each company's search contacts (with the search requestId) keyed by
+    company_keys; enrichments holds each contact's phone numbers keyed by contact id.
+    Companies that returned no contacts expire sooner, since Lusha's coverage grows.
+    """
+
+    def __init__(self, path=LUSHA_CACHE_PATH, ttl_days=90, empty_ttl_days=30):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.empty_ttl = empty_ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                company_key TEXT PRIMARY KEY,
+                contacts TEXT NOT NULL,
+                contact_count INTEGER NOT NULL,
+                searched_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS enrichments (
+                contact_id TEXT PRIMARY KEY,
+                phones TEXT NOT NULL,
+                enriched_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get_searches(self, company_keys):
+        """company_key -> contacts for every fresh cached search among company_keys."""
+        found = {}
+        now = time.time()
+        keys = list(company_keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT company_key, contacts, contact_count, searched_at FROM searches "
+                f"WHERE company_key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, contacts, count, searched_at in rows:
+                if now - searched_at < (self.ttl if count else self.empty_ttl):
+                    found[key] = json.loads(contacts)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get_enrichments(self, contact_ids):
+        """contact_id -> phoneNumbers for every fresh cached enrichment among contact_ids."""
+        found = {}
+        now = time.time()
+        ids = [str(contact_id) for contact_id in contact_ids]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT contact_id, phones, enriched_at FROM enrichments "
+                f"WHERE contact_id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for contact_id, phones, enriched_at in rows:
+                if now - enriched_at < self.ttl:
+                    found[contact_id] = json.loads(phones)
+        return found
+
+    def set_search(self, company_key, contacts):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO searches (company_key, contacts, contact_count, searched_at) VALUES (?, ?, ?, ?)",
+            (company_key, json.dumps(contacts), len(contacts), time.time())
+        )
+
+    def set_enrichment(self, contact_id, phones):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO enrichments (contact_id, phones, enriched_at) VALUES (?, ?, ?)",
+            (str(contact_id), json.dumps(phones), time.time())
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def lusha_post(client, url, payload, api_key, max_retries=3):
+    """
+    POST a Lusha request through the shared outbound client (per-domain rate limit and concurrency),
+    retrying 429 / 5xx after Retry-After or an exponential backoff. Returns the parsed JSON body.
+    """
+    headers = {"api_key": api_key, "Content-Type": "application/json"}
+    for attempt in range(max_retries + 1):
+        response = client.post(url, json=payload, headers=headers)
+        if response.status_code in (200, 201):
+            return response.json()
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            raise LushaApiError(f"HTTP {response.status_code}: {response.text[:200]}")
+        retry_after = response.headers.get('Retry-After')
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = 0.5 * 2 ** attempt
+        time.sleep(min(delay, 30))
+
+
+def search_companies(client, base_url, api_key, names, contacts_per_search=None, max_pages=MAX_SEARCH_PAGES):
+    """
+    One multi-company search for up to SEARCH_BATCH_SIZE names, filtered to Singapore-based contacts
+    with a phone, paged until Lusha runs out of results (or max_pages). The page size is
+    contacts_per_search (default: one per name) clamped to SEARCH_PAGE_SIZE_BOUNDS.
+    Returns (contacts, credits, complete); each contact carries its page's requestId, and
+    complete is False when max_pages cut the results short.
+    """
+    low, high = SEARCH_PAGE_SIZE_BOUNDS
+    size = min(high, max(low, contacts_per_search or len(names)))
+    payload = {
+        "pages": {"page": 0, "size": size},
+        "filters": {
+            "contacts": {
+                "include": {
+                    "existing_data_points": ["phone", "mobile_phone"],
+                    "locations": [{"country": "SG"}]
+                }
+            },
+            "companies": {
+                "include": {"names": list(names)}
+            }
+        }
+    }
+
+    contacts, credits = [], 0
+    for page in range(max_pages):
+        payload["pages"]["page"] = page
+        data = lusha_post(client, base_url + CONTACT_SEARCH_PATH, payload, api_key)
+        request_id = data.get('requestId', '')
+        page_contacts = data.get('data', []) or []
+        contacts.extend(dict(contact, requestId=request_id) for contact in page_contacts)
+        credits += (data.get('billing') or {}).get('creditsCharged', 0) or 0
+        total = data.get('totalResults')
+        if len(page_contacts) < size or (total is not None and len(contacts) >= total):
+            return contacts, credits, True
+    return contacts, credits, False
+
+
+def enrich_contact(client, base_url, api_key, request_id, contact_id):
+    """Reveal one contact's phone numbers. Returns (phoneNumbers, credits)."""
+    data = lusha_post(client, base_url + CONTACT_ENRICH_PATH,
+                      {"requestId": request_id, "contactIds": [contact_id]}, api_key)
+    phones = []
+    for contact in data.get('contacts', []) or []:
+        if str(contact.get('id') or contact.get('contactId')) == str(contact_id):
+            phones = (contact.get('data') or {}).get('phoneNumbers', []) or []
+    return phones, (data.get('billing') or {}).get('creditsCharged', 1)
+
+
+def group_contacts_by_company(contacts, names_by_key):
+    """
+    Assign search contacts to the searched companies: exact canonical-name match first, then, for
+    companies still without one, a returned company whose name tokens contain (or are contained in)
+    theirs - like the notebook's containment match, but only among returned companies nobody
+    matched exactly, so one company's contacts are never handed to another.
+    """
+    contact_keys = canonical_company_names([contact.get('companyName', '') for contact in contacts])
+    by_name = {}
+    for contact, name_key in zip(contacts, contact_keys):
+        if name_key:
+            by_name.setdefault(name_key, []).append(contact)
+
+    grouped = {key: by_name.get(name_key, []) for key, name_key in names_by_key.items()}
+    unclaimed = {name: set(name.split()) for name in set(by_name) - set(names_by_key.values())}
+    for company_key, name_key in names_by_key.items():
+        if grouped[company_key] or not name_key:
+            continue
+        tokens = set(name_key.split())
+        match = next((name for name, other in unclaimed.items() if tokens <= other or other <= tokens), None)
+        if match:
+            grouped[company_key] = by_name[match]
+            del unclaimed[match]
+    return grouped
+
+
+def assign_lusha_to_pic_columns(df, contacts):
+    """
+    Write Lusha contacts into the first PIC slot (1, 2, then 3) whose contact number is empty,
+    column-wise. contacts is aligned to df's index with Contact_Name / Contact_Title / Contact_Number
+    (missing number = nothing found). Names split on the first space; '+' is dropped from numbers.
+    Returns (df, {'PIC 1': n, 'PIC 2': n, 'PIC 3': n, 'slots full': n}).
+    """
+    df = df.copy()
+    for slot in PIC_SLOTS:
+        for column in slot:
+            if column not in df.columns:
+                df[column] = None
+    if LUSHA_FLAG_COLUMN not in df.columns:
+        df[LUSHA_FLAG_COLUMN] = None
+
+    contacts = contacts.reindex(df.index)
+    has_contact = contacts['Contact_Number'].notna() & ~contacts['Contact_Number'].isin(['', 'N/A'])
+    names = contacts['Contact_Name'].where(contacts['Contact_Name'].notna(), '').astype(str).str.split(' ', n=1)
+    first_names = names.str[0]
+    last_names = names.str[1].fillna('')
+    numbers = contacts['Contact_Number'].astype(str).str.replace('+', '', regex=False).str.strip()
+
+    counts = {}
+    remaining = has_contact.copy()
+    for position, (first_col, last_col, title_col, number_col) in enumerate(PIC_SLOTS, start=1):
+        existing = df[number_col].astype(object).where(df[number_col].notna(), '').astype(str).str.strip()
+        mask = remaining & existing.isin(['', 'None', 'nan'])
+        df[[first_col, last_col, title_col, number_col, LUSHA_FLAG_COLUMN]] = \
+            df[[first_col, last_col, title_col, number_col, LUSHA_FLAG_COLUMN]].astype(object)
+        df.loc[mask, first_col] = first_names[mask]
+        df.loc[mask, last_col] = last_names[mask]
+        df.loc[mask, title_col] = contacts.loc[mask, 'Contact_Title']
+        df.loc[mask, number_col] = numbers[mask]
+        df.loc[mask, LUSHA_FLAG_COLUMN] = 'Yes'
+        counts[f'PIC {position}'] = int(mask.sum())
+        remaining &= ~mask
+    counts['slots full'] = int(remaining.sum())
+    return df, counts
+
+
+def Get_PIC_Contacts_From_Lusha(df, name_column='ACRA REGISTERED NAME', uen_column='Company Registration Number (UEN)',
+                                api_key=None, base_url=None, cache_path=LUSHA_CACHE_PATH, use_cache=True,
+                                concurrency=4, rate_per_sec=5.0, search_batch_size=SEARCH_BATCH_SIZE,
+                                contacts_per_search=None, max_search_pages=MAX_SEARCH_PAGES, only_open_slots=True, http_client=None,
+                                metrics=None, verbosity='info'):
+    """
+    Find a Singapore mobile for each company through Lusha and write it into the first free PIC slot.
+
+    Companies are deduplicated by UEN and by canonical name and, with only_open_slots, limited to
+    rows with an empty PIC contact number. Cached searches and enrichments are reused for free.
+    The rest are searched SEARCH_BATCH_SIZE names per request, paged up to max_search_pages deep. Candidate contacts are then enriched
+    one at a time per company until a +65 mobile turns up, with companies processed concurrently.
+    All requests go through an OutboundHttpClient limited to rate_per_sec and concurrency in flight,
+    with 429 / 5xx retried. base_url (or $LUSHA_BASE_URL) can point at a local mock server.
+    """
+    owns_metrics = metrics is None
+    metrics = metrics or RunMetrics('lusha', verbosity=verbosity)
+    say = metrics.say
+
+    api_key = api_key or os.environ.get(LUSHA_API_KEY_ENV)
+    if not api_key:
+        raise ValueError(f"No Lusha API key: pass api_key= or set ${LUSHA_API_KEY_ENV}")
+    base_url = (base_url or os.environ.get(LUSHA_BASE_URL_ENV) or LUSHA_BASE_URL).rstrip('/')
+
+    say("=" * 80)
+    say("👤 LUSHA PIC CONTACT ENRICHMENT")
+    say("=" * 80)
+
+    keys = company_keys(df, name_column, uen_column)
+    wanted = keys.notna()
+    if only_open_slots:
+        open_slot = pd.Series(False, index=df.index)
+        for *_, number_col in PIC_SLOTS:
+            if number_col not in df.columns:
+                open_slot[:] = True
+                break
+            number = df[number_col].astype(object).where(df[number_col].notna(), '').astype(str).str.strip()
+            open_slot |= number.isin(['', 'None', 'nan'])
+        wanted &= open_slot
+
+    companies = pd.DataFrame({'key': keys[wanted], 'name': df.loc[wanted, name_column].astype(str)})
+    companies['name_key'] = canonical_company_names(companies['name']).to_numpy()
+    companies = companies.drop_duplicates('key')
+    # One lookup per company name as well as per key: a company listed with and without its UEN
+    # (or under two UENs) is searched and enriched once, UEN-keyed entries representing it
+    companies = companies.sort_values('key', key=lambda key: ~key.str.startswith('UEN:'), kind='stable')
+    lookup_key = companies.groupby('name_key', sort=False)['key'].transform('first')
+    lookup_key = lookup_key.where(companies['name_key'] != '', companies['key'])
+    lookup_of = dict(zip(companies['key'], lookup_key))
+    companies = companies[companies['key'] == lookup_key]
+    names_by_key = dict(zip(companies['key'], companies['name_key']))
+    say(f"📋 {len(df)} rows -> {len(companies)} distinct companies to look up")
+
+    cache = LushaResponseCache(cache_path) if use_cache else None
+    owns_client = http_client is None
+    if owns_client:
+        http_client = OutboundHttpClient(max_concurrency=concurrency, per_domain_concurrency=concurrency,
+                                         per_domain_rate=rate_per_sec, per_domain_burst=concurrency,
+                                         failure_threshold=5, max_timeout=30)
+    credits = {'search': 0, 'enrich': 0}
+    errors = 0
+
+    try:
+        # Step 1: searches, from the cache where fresh, else batched multi-company requests
+        with metrics.stage('lusha_search', companies=len(companies)) as counters:
+            contacts_by_key = cache.get_searches(companies['key']) if cache else {}
+            to_search = companies[~companies['key'].isin(contacts_by_key)]
+            batches = [to_search.iloc[i:i + search_batch_size] for i in range(0, len(to_search), search_batch_size)]
+            say(f"🔎 Search: {len(contacts_by_key)} companies from cache, "
+                f"{len(to_search)} to search in {len(batches)} requests")
+
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = {
+                    executor.submit(search_companies, http_client, base_url, api_key,
+                                    batch['name'].tolist(), contacts_per_search, max_search_pages): batch
+                    for batch in batches
+                }
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        contacts, charged, complete = future.result()
+                    except Exception as e:
+                        errors += 1
+                        say(f"  ❌ Search failed for {len(batch)} companies: {e}", 'error')
+                        metrics.error('lusha_search', e)
+                        continue
+                    credits['search'] += charged
+                    grouped = group_contacts_by_company(
+                        contacts, {key: names_by_key[key] for key in batch['key']}
+                    )
+                    contacts_by_key.update(grouped)
+                    if not complete:
+                        say(f"  ⚠️  Search for {len(batch)} companies stopped after {max_search_pages} pages; "
+                            f"companies without contacts are not cached", 'warning')
+                    if cache:
+                        for key, company_contacts in grouped.items():
+                            # An empty result is only final when every page was read
+                            if company_contacts or complete:
+                                cache.set_search(key, company_contacts)
+                        cache.commit()
+                    say(f"  ✅ {len(contacts)} SG contacts across {len(batch)} companies "
+                        f"({charged} credits)", 'debug')
+            counters.update(hits=len(companies) - len(to_search), requests=len(batches),
+                            credits=credits['search'])
+
+        # Step 2: enrich candidates per company until a Singapore mobile turns up
+        with metrics.stage('lusha_enrich') as counters:
+            candidates_by_key = {
+                key: candidate_contacts(contacts) for key, contacts in contacts_by_key.items() if contacts
+            }
+            cached_phones = cache.get_enrichments(
+                contact.get('contactId') for candidates in candidates_by_key.values() for contact in candidates
+                if contact.get('contactId')
+            ) if cache else {}
+
+            def resolve_company(candidates):
+                """(best contact, mobile, newly enriched {contact_id: phones}, credits) for one company."""
+                enriched, charged = {}, 0
+                for contact in candidates:
+                    contact_id, request_id = contact.get('contactId'), contact.get('requestId')
+                    if not contact_id:
+                        continue
+                    phones = cached_phones.get(str(contact_id))
+                    if phones is None:
+                        if not request_id:
+                            continue
+                        phones, cost = enrich_contact(http_client, base_url, api_key, request_id, contact_id)
+                        enriched[contact_id] = phones
+                        charged += cost
+                    mobile = extract_singapore_mobile(phones)
+                    if mobile:
+                        return contact, mobile, enriched, charged
+                return None, None, enriched, charged
+
+            best = {}
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = {
+                    executor.submit(resolve_company, candidates): key for key, candidates in candidates_by_key.items()
+                }
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        contact, mobile, enriched, charged = future.result()
+                    except Exception as e:
+                        errors += 1
+                        say(f"  ❌ Enrich failed for {key}: {e}", 'error')
+                        metrics.error('lusha_enrich', e)
+                        continue
+                    credits['enrich'] += charged
+                    if cache:
+                        for contact_id, phones in enriched.items():
+                            cache.set_enrichment(contact_id, phones)
+                    if mobile:
+                        best[key] = {
+                            'Contact_Name': contact.get('name'),
+                            'Contact_Title': contact.get('jobTitle'),
+                            'Contact_Number': mobile,
+                            'Is_Decision_Maker': 'Yes' if is_decision_maker(contact.get('jobTitle', '')) else 'No',
+                        }
+                        say(f"  📱 {key}: {contact.get('name')} ({contact.get('jobTitle')}) {mobile}", 'debug')
+            if cache:
+                cache.commit()
+            counters.update(companies=len(candidates_by_key), found=len(best), credits=credits['enrich'],
+                            cached_contacts=len(cached_phones))
+    finally:
+        if cache:
+            cache.close()
+        if owns_client:
+            http_client.close()
+
+    # Step 3: fan each company's contact out to its rows and fill the PIC slots column-wise
+    with metrics.stage('lusha_assign', rows=len(df)) as counters:
+        contacts = pd.DataFrame.from_dict(best, orient='index', columns=CONTACT_COLUMNS)
+        row_contacts = pd.DataFrame(
+            contacts.reindex(keys.where(wanted).map(lookup_of)).to_numpy(), index=df.index, columns=CONTACT_COLUMNS
+        )
+        enriched_df, assigned = assign_lusha_to_pic_columns(df, row_contacts)
+        counters.update(assigned=sum(count for slot, count in assigned.items() if slot != 'slots full'))
+
+    say(f"\n{'='*80}")
+    say("📊 LUSHA SUMMARY:")
+    say(f"   • Companies looked up: {len(companies)} ({len(best)} with a Singapore mobile)")
+    say(f"   • Credits: {credits['search']} search + {credits['enrich']} enrich = "
+        f"{credits['search'] + credits['enrich']}")
+    for slot, count in assigned.items():
+        say(f"   • {slot}: {count}")
+    if errors:
+        say(f"   • Failed requests: {errors}", 'warning')
+    say(f"{'='*80}\n")
+
+    if owns_metrics:
+        metrics.close()
+    return enriched_df
@@ -0,0 +1,235 @@
+
+import pandas as pd
+import numpy as np
+import os
+import json
+import hashlib
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from Phone_Number_Functions import normalize_singapore_phones
+from Epos_Matching_Functions import canonical_company_names
+
+
+MASTER_DB_PATH = "./Master DB/Master_DB_nov10.xlsx"
+MASTER_DB_CACHE_DIR = "Staging/Cache/master_db"
+MASTER_DB_SOURCE_KEY = b"master_db_source"
+MASTER_DB_CACHE_VERSION = 3     # bump when normalize_master_db's keys change (2: legal-suffix-only NAME_KEY, 3: kept "(S)" qualifiers)
+
+# Workbook columns used by the pipeline, and the standardized names they are stored under
+MASTER_DB_COLUMNS = {
+    "Company Registration Number (UEN)": "UEN",
+    "ACRA REGISTERED NAME": "ACRA_REGISTERED_NAME",
+    "Brand/Deal Name/Business Name": "BRAND_NAME",
+    "Primary SSIC Code": "SSIC_CODE",
+    "PIC NAME 1 Contact Number": "PIC_1_CONTACT_NUMBER",
+    "PIC 1 email address": "PIC_1_EMAIL",
+    "Website URL": "WEBSITE_URL",
+    "Parent Industry Type": "PARENT_INDUSTRY_TYPE",
+    "Sub Industry": "SUB_INDUSTRY",
+}
+
+# Lead-frame column names probed when the caller does not name the columns explicitly
+UEN_COLUMN_CANDIDATES = ["UEN", "Company Registration Number (UEN)"]
+NAME_COLUMN_CANDIDATES = ["ACRA REGISTERED NAME", "ACRA_REGISTERED_NAME", "ENTITY_NAME"]
+PHONE_COLUMN_CANDIDATES = ["Phones", "Contact Number", "PIC NAME 1 Contact Number"]
+
+
+def clean_uens(values):
+    """Vectorized clean_uen: uppercase, keep only A-Z/0-9; blanks and 'NAN' become NA."""
+    values = pd.Series(values, dtype=object)
+    cleaned = (
+        values.where(values.notna(), '').astype(str).astype('string')
+        .str.upper().str.replace(r'[^A-Z0-9]', '', regex=True)
+    )
+    return cleaned.mask(cleaned.isin(['', 'NAN', 'NONE']))
+
+
+def clean_texts(values):
+    """Vectorized clean_text: strip and uppercase; blanks and 'NAN' become NA."""
+    values = pd.Series(values, dtype=object)
+    cleaned = values.where(values.notna(), '').astype(str).astype('string').str.strip().str.upper()
+    return cleaned.mask(cleaned.isin(['', 'NAN', 'NONE']))
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size}
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_master_db(raw_df):
+    """Select, rename and normalize the Master DB columns, adding the PHONE and NAME_KEY match keys."""
+    df = pd.DataFrame(index=raw_df.index)
+    for source, target in MASTER_DB_COLUMNS.items():
+        df[target] = raw_df[source] if source in raw_df.columns else None
+
+    df['UEN'] = clean_uens(df['UEN'])
+    for col in ['ACRA_REGISTERED_NAME', 'BRAND_NAME']:
+        df[col] = clean_texts(df[col])
+    for col in ['PIC_1_CONTACT_NUMBER', 'PIC_1_EMAIL', 'WEBSITE_URL', 'PARENT_INDUSTRY_TYPE', 'SUB_INDUSTRY']:
+        df[col] = df[col].astype(object).where(df[col].notna(), None).astype('string')
+    df['SSIC_CODE'] = pd.to_numeric(df['SSIC_CODE'], errors='coerce').astype('Int64')
+
+    df['PHONE'] = normalize_singapore_phones(df['PIC_1_CONTACT_NUMBER'].astype(object)).astype('string')
+    df['NAME_KEY'] = canonical_company_names(df['ACRA_REGISTERED_NAME'].astype(object)).astype('string')
+    df['NAME_KEY'] = df['NAME_KEY'].mask(df['NAME_KEY'] == '')
+
+    return df.reset_index(drop=True)
+
+
+class MasterDBStore:
+    """
+    Master DB exclusion set backed by a columnar cache.
+
+    The workbook is parsed once and stored as parquet under cache_dir; the cache is reused while the
+    workbook's mtime/size are unchanged (or its SHA-1 still matches after a touch). Normalized UEN,
+    phone and company-name indexes are built on load, so membership checks are hash lookups.
+    """
+
+    def __init__(self, path=MASTER_DB_PATH, cache_dir=MASTER_DB_CACHE_DIR, sheet_name=0):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.sheet_name = sheet_name
+        self.cache_path = os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0] + '.parquet')
+
+        self.df = self._load()
+        self._build_indexes()
+
+    @classmethod
+    def from_frame(cls, raw_df):
+        """Build the store from an already loaded Master DB frame (e.g. the Google Sheet fetch)."""
+        store = cls.__new__(cls)
+        store.path = store.cache_dir = store.cache_path = None
+        store.sheet_name = None
+        store.df = normalize_master_db(raw_df)
+        store._build_indexes()
+        return store
+
+    def _read_cache_source(self):
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            metadata = pq.read_schema(self.cache_path).metadata or {}
+        except (pa.ArrowInvalid, OSError):
+            return None
+        source = metadata.get(MASTER_DB_SOURCE_KEY)
+        return json.loads(source.decode()) if source else None
+
+    def _write_cache(self, df, source):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[MASTER_DB_SOURCE_KEY] = json.dumps(source).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self.cache_path + '.tmp'
+        pq.write_table(table, temp_path, compression='zstd')
+        os.replace(temp_path, self.cache_path)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Master DB workbook not found at '{self.path}'")
+
+        start = time.time()
+        signature = file_signature(self.path)
+        cached = self._read_cache_source()
+        if cached and cached.get('version') != MASTER_DB_CACHE_VERSION:
+            cached = None
+
+        if cached and cached.get('mtime') == signature['mtime'] and cached.get('size') == signature['size']:
+            df = pd.read_parquet(self.cache_path)
+            print(f"📦 Master DB loaded from cache: {len(df):,} rows ({time.time() - start:.2f}s)")
+            return df
+
+        sha1 = file_sha1(self.path)
+        if cached and cached.get('sha1') == sha1:
+            # Touched but not changed: refresh the signature, keep the parsed data
+            df = pd.read_parquet(self.cache_path)
+            self._write_cache(df, {**signature, 'sha1': sha1, 'version': MASTER_DB_CACHE_VERSION})
+            print(f"📦 Master DB unchanged, cache reused: {len(df):,} rows ({time.time() - start:.2f}s)")
+            return df
+
+        print(f"🔄 Parsing Master DB workbook: {self.path}")
+        raw_df = pd.read_excel(self.path, sheet_name=self.sheet_name)
+        df = normalize_master_db(raw_df)
+        self._write_cache(df, {**signature, 'sha1': sha1, 'version': MASTER_DB_CACHE_VERSION})
+        print(f"✅ Master DB cached: {len(df):,} rows ({time.time() - start:.1f}s)")
+        return df
+
+    def _build_indexes(self):
+        def unique_index(column):
+            return pd.Index(self.df[column].dropna().unique().to_numpy(dtype=object))
+
+        self.uen_index = unique_index('UEN')
+        self.phone_index = unique_index('PHONE')
+        self.name_index = unique_index('NAME_KEY')
+
+    @staticmethod
+    def _in_index(values, index):
+        """Hash-index membership for a Series of keys (missing keys never match)."""
+        keys = pd.Series(values).astype(object)
+        return (index.get_indexer(keys.where(keys.notna(), None).to_numpy()) >= 0)
+
+    def __len__(self):
+        return len(self.df)
+
+    def _phone_matches(self, values):
+        """Per-row membership for phone cells that may hold a single number or a list of numbers."""
+        normalized = normalize_singapore_phones(pd.Series(values, dtype=object).reset_index(drop=True))
+        exploded = normalized.explode()
+        hits = pd.Series(self._in_index(exploded, self.phone_index), index=exploded.index)
+        return hits.groupby(level=0).any().reindex(range(len(values)), fill_value=False).to_numpy(dtype=bool)
+
+    def match_keys(self, df, keys=('UEN',), uen_column=None, phone_column=None, name_column=None):
+        """
+        Which Master DB key each row of df matches ('UEN', 'PHONE' or 'NAME', first hit in that
+        order), or None. keys selects the indexes to check; columns default to the usual lead-frame
+        names (e.g. 'UEN' / 'Company Registration Number (UEN)').
+        """
+        columns = {
+            'UEN': uen_column or next((c for c in UEN_COLUMN_CANDIDATES if c in df.columns), None),
+            'PHONE': phone_column or next((c for c in PHONE_COLUMN_CANDIDATES if c in df.columns), None),
+            'NAME': name_column or next((c for c in NAME_COLUMN_CANDIDATES if c in df.columns), None),
+        }
+        for key in keys:
+            if key not in columns:
+                raise ValueError(f"Unknown Master DB key {key!r}; expected UEN, PHONE or NAME")
+            if columns[key] is None:
+                raise ValueError(f"No {key} column found in the frame to match against the Master DB")
+
+        match_key = np.full(len(df), None, dtype=object)
+
+        # Assign the weakest key first so stronger keys overwrite it
+        if 'NAME' in keys:
+            name_keys = canonical_company_names(df[columns['NAME']])
+            match_key[self._in_index(name_keys.mask(name_keys == ''), self.name_index)] = 'NAME'
+        if 'PHONE' in keys:
+            match_key[self._phone_matches(df[columns['PHONE']])] = 'PHONE'
+        if 'UEN' in keys:
+            match_key[self._in_index(clean_uens(df[columns['UEN']]), self.uen_index)] = 'UEN'
+
+        return pd.Series(match_key, index=df.index, dtype=object)
+
+    def flag_known(self, df, keys=('UEN',), **columns):
+        """Return a copy of df with 'In Master DB' (Yes/No) and 'Master DB Match' (UEN/PHONE/NAME) columns."""
+        match_key = self.match_keys(df, keys, **columns)
+        df = df.copy()
+        df['In Master DB'] = np.where(match_key.notna(), 'Yes', 'No')
+        df['Master DB Match'] = match_key
+        return df
+
+    def exclude_known(self, df, keys=('UEN',), **columns):
+        """Return the rows of df that are not in the Master DB."""
+        match_key = self.match_keys(df, keys, **columns)
+        known = match_key.notna().to_numpy()
+        print(f"🧹 Master DB exclusion: {int(known.sum())} of {len(df)} rows already known")
+        return df[~known]
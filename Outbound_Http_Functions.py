@@ -0,0 +1,339 @@
+
+import time
+import threading
+import numpy as np
+import requests
+from collections import deque
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+
+# Second-level suffixes under which the registrable domain is three labels (foo.com.sg, not com.sg)
+MULTI_PART_SUFFIXES = {
+    'com.sg', 'edu.sg', 'gov.sg', 'org.sg', 'net.sg', 'per.sg',
+    'com.my', 'org.my', 'net.my', 'com.hk', 'org.hk', 'com.au', 'net.au', 'org.au',
+    'co.uk', 'org.uk', 'co.jp', 'co.id', 'co.in', 'co.nz', 'co.th', 'com.ph', 'com.vn', 'com.cn', 'com.tw',
+}
+
+# Statuses that mean "slow down": the domain's token bucket rate is halved, then recovers on success
+THROTTLE_STATUSES = (429, 503)
+
+DEFAULT_MIN_CONNECT_TIMEOUT = 2.0
+DEFAULT_MAX_TIMEOUT = 10.0
+
+
+def registrable_domain(url):
+    """
+    Rate-limit key for a URL: the last two host labels, or three under MULTI_PART_SUFFIXES.
+    Hosted subdomains (x.wixsite.com, y.myshopify.com, z.blogspot.com) deliberately share one key,
+    since they share the platform's servers. IP addresses and single-label hosts are returned as-is.
+    """
+    text = str(url).strip().lower()
+    if '://' not in text:
+        text = 'https://' + text
+    host = (urlparse(text).hostname or '').rstrip('.')
+    if not host or host.replace('.', '').isdigit() or '.' not in host:
+        return host
+    labels = host.split('.')
+    if len(labels) >= 3 and '.'.join(labels[-2:]) in MULTI_PART_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a domain's circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve() books a token and returns how long the caller must wait
+    for it, so the sleep happens outside the lock. throttle() halves the rate (down to min_rate)
+    and every granted request recovers it by a tenth of the base rate.
+    """
+
+    def __init__(self, rate, burst, min_rate=0.2):
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.min_rate = min(float(min_rate), self.base_rate)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def throttle(self):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def recover(self):
+        with self.lock:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+
+class CircuitBreaker:
+    """
+    Per-domain breaker: failure_threshold consecutive timeouts / connection failures open it for
+    cooldown_secs, after which a single trial request is let through (half-open). A successful
+    trial closes it; a failed one re-opens it with the cooldown doubled, up to max_cooldown_secs.
+    """
+
+    def __init__(self, failure_threshold=2, cooldown_secs=60.0, max_cooldown_secs=900.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown_secs
+        self.cooldown = cooldown_secs
+        self.max_cooldown = max_cooldown_secs
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+            self.cooldown = self.base_cooldown
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight:
+                self.trial_in_flight = False
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+            elif self.opened_at is None and self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+
+
+class LatencyTracker:
+    """Rolling window of response latencies; connect_timeout() is quantile * multiplier, clamped."""
+
+    def __init__(self, window=200, min_samples=20, quantile=0.95, multiplier=2.0):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.quantile = quantile
+        self.multiplier = multiplier
+        self.lock = threading.Lock()
+
+    def record(self, secs):
+        with self.lock:
+            self.samples.append(secs)
+
+    def connect_timeout(self, floor, ceiling):
+        """Adapted connect timeout, or None until min_samples latencies have been seen."""
+        with self.lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            observed = float(np.quantile(np.fromiter(self.samples, dtype=float), self.quantile))
+        return min(ceiling, max(floor, observed * self.multiplier))
+
+
+class DomainState:
+    def __init__(self, client):
+        self.semaphore = threading.BoundedSemaphore(client.per_domain_concurrency)
+        self.bucket = TokenBucket(client.per_domain_rate, client.per_domain_burst)
+        self.breaker = CircuitBreaker(client.failure_threshold, client.cooldown_secs, client.max_cooldown_secs)
+        self.latency = LatencyTracker(window=20, min_samples=3)
+
+
+def hold_until_closed(response, semaphore):
+    """Release semaphore when response is closed (.close() or leaving its with-block), once."""
+    close, released = response.close, threading.Lock()
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            if released.acquire(blocking=False):
+                semaphore.release()
+
+    response.close = close_and_release
+    return response
+
+
+class OutboundHttpClient:
+    """
+    Shared outbound HTTP layer for probes and fetchers, keyed by registrable_domain.
+
+    Every request waits for a token from the domain's token bucket (halved on 429/503, recovering
+    on success), then for a per-domain concurrency slot, and fails fast with CircuitOpenError while
+    the domain's breaker is open. Timeouts are (connect, read): the read timeout is always
+    max_timeout so slow-but-alive sites still answer, while the connect timeout adapts to observed
+    latency (the domain's own once it has 3 samples, else the whole run's), between
+    min_connect_timeout and max_timeout. Dead hosts therefore stop costing the full timeout.
+
+    head() / get() / post() / request() mirror requests.Session, so an instance can be passed anywhere a
+    session is accepted (e.g. verify_website_accessibility). An explicit timeout= (a number or a
+    (connect, read) tuple) acts as a ceiling. With stream=True the body downloads after request()
+    returns, so the domain slot is held until the caller closes the response: always read a
+    streamed response inside `with response:` (or close it), or the domain's slot leaks.
+    """
+
+    def __init__(self, max_concurrency=32, per_domain_concurrency=4, per_domain_rate=5.0, per_domain_burst=5,
+                 failure_threshold=2, cooldown_secs=60.0, max_cooldown_secs=900.0,
+                 min_connect_timeout=DEFAULT_MIN_CONNECT_TIMEOUT, max_timeout=DEFAULT_MAX_TIMEOUT,
+                 session=None):
+        self.per_domain_concurrency = per_domain_concurrency
+        self.per_domain_rate = per_domain_rate
+        self.per_domain_burst = per_domain_burst
+        self.failure_threshold = failure_threshold
+        self.cooldown_secs = cooldown_secs
+        self.max_cooldown_secs = max_cooldown_secs
+        self.min_connect_timeout = min_connect_timeout
+        self.max_timeout = max_timeout
+
+        self.owns_session = session is None
+        self.session = session if session is not None else self.create_session(max_concurrency, per_domain_concurrency)
+        self.global_latency = LatencyTracker()
+        self.domains = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'fast_failed': 0, 'timeouts': 0, 'connection_failures': 0,
+                      'throttled': 0, 'rate_limit_wait_secs': 0.0}
+
+    @staticmethod
+    def create_session(max_concurrency=32, per_host_connections=4):
+        """
+        requests.Session with a bounded connection pool per host.
+        pool_block=True makes threads wait for a free connection instead of opening extra sockets to the same host.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_concurrency,
+            pool_maxsize=per_host_connections,
+            pool_block=True,
+            max_retries=0
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def domain_state(self, domain):
+        with self.lock:
+            state = self.domains.get(domain)
+            if state is None:
+                state = self.domains[domain] = DomainState(self)
+            return state
+
+    def timeout_for(self, domain, ceiling=None):
+        """
+        (connect, read) timeout for the next request to domain. ceiling is a requests-style timeout,
+        a number or a (connect, read) tuple, capping the respective part (None parts: max_timeout).
+        """
+        connect_ceiling, read_ceiling = ceiling if isinstance(ceiling, tuple) else (ceiling, ceiling)
+        connect_ceiling = min(connect_ceiling, self.max_timeout) if connect_ceiling else self.max_timeout
+        read_ceiling = min(read_ceiling, self.max_timeout) if read_ceiling else self.max_timeout
+        floor = min(self.min_connect_timeout, connect_ceiling)
+        state = self.domain_state(domain)
+        connect = state.latency.connect_timeout(floor, connect_ceiling)
+        if connect is None:
+            connect = self.global_latency.connect_timeout(floor, connect_ceiling)
+        return (connect if connect is not None else connect_ceiling, read_ceiling)
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def request(self, method, url, timeout=None, **kwargs):
+        domain = registrable_domain(url)
+        state = self.domain_state(domain)
+
+        if state.breaker.state == 'open':
+            self._count('fast_failed')
+            raise CircuitOpenError(f"Circuit open for {domain}")
+
+        # Wait for the token before taking a slot, so a rate-limited request never holds a slot
+        # that a request with its token in hand could use
+        wait = state.bucket.reserve()
+        if wait > 0:
+            self._count('rate_limit_wait_secs', wait)
+            time.sleep(wait)
+
+        state.semaphore.acquire()
+        try:
+            # Checked again after queueing for the slot, so requests stuck behind a dying host fail fast
+            if not state.breaker.allow():
+                self._count('fast_failed')
+                raise CircuitOpenError(f"Circuit open for {domain}")
+
+            self._count('requests')
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout_for(domain, timeout), **kwargs)
+            except requests.exceptions.SSLError:
+                # The host answered; a certificate problem says nothing about its liveness
+                state.breaker.record_success()
+                raise
+            except requests.exceptions.Timeout:
+                self._count('timeouts')
+                state.breaker.record_failure()
+                raise
+            except requests.exceptions.ConnectionError:
+                self._count('connection_failures')
+                state.breaker.record_failure()
+                raise
+            except Exception:
+                state.breaker.record_success()
+                raise
+        except BaseException:
+            state.semaphore.release()
+            raise
+
+        if kwargs.get('stream'):
+            # Only the headers have arrived; the body download still counts against the domain
+            hold_until_closed(response, state.semaphore)
+        else:
+            state.semaphore.release()
+
+        elapsed = time.monotonic() - started
+        state.latency.record(elapsed)
+        self.global_latency.record(elapsed)
+        state.breaker.record_success()
+        if response.status_code in THROTTLE_STATUSES:
+            self._count('throttled')
+            state.bucket.throttle()
+        else:
+            state.bucket.recover()
+        return response
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def summary(self):
+        opened = sum(state.breaker.times_opened for state in self.domains.values())
+        return dict(self.stats, domains=len(self.domains), circuits_opened=opened)
+
+    def close(self):
+        if self.owns_session:
+            self.session.close()
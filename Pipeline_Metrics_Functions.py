@@ -0,0 +1,219 @@
+
+import os
+import re
+import json
+import time
+import uuid
+from contextlib import contextmanager
+
+
+METRICS_PATH = os.path.join("Staging", "Metrics", "pipeline_metrics.jsonl")
+
+# quiet: warnings and errors only, info: stage banners and summaries, debug: every URL / item
+VERBOSITY_LEVELS = {'quiet': 0, 'info': 1, 'debug': 2}
+MESSAGE_LEVELS = {'warning': 0, 'error': 0, 'info': 1, 'debug': 2}
+
+# First matching pattern wins; matched against the lowercased error text
+ERROR_CATEGORIES = [
+    ('timed_out', r'timed-out|timed out|timeout'),
+    ('aborted', r'aborted'),
+    ('run_failed', r'actor run failed'),
+    ('start_failed', r'error starting actor run|invalid response'),
+    ('dataset_stream', r'error reading dataset'),
+    ('circuit_open', r'circuit open'),
+    ('dns', r'name or service not known|nodename|getaddrinfo|dns'),
+    ('ssl', r'ssl|certificate'),
+    ('connection', r'connection|refused|reset by peer'),
+    ('http_4xx', r'\b4\d\d\b'),
+    ('http_5xx', r'\b5\d\d\b'),
+    ('blocked', r'skipped|blocked'),
+]
+
+
+def categorize_error(error):
+    """Bucket a free-text error message into one of ERROR_CATEGORIES (or 'other')."""
+    if not error:
+        return None
+    text = str(error).lower()
+    for category, pattern in ERROR_CATEGORIES:
+        if re.search(pattern, text):
+            return category
+    return 'other'
+
+
+def apify_run_usage(run_info):
+    """Compute units, USD and the raw usage breakdown Apify reports on a finished run (zeros if absent)."""
+    run_info = run_info or {}
+    stats = run_info.get('stats') or {}
+    return {
+        'compute_units': stats.get('computeUnits') or 0,
+        'usage_usd': run_info.get('usageTotalUsd') or 0,
+        'usage': run_info.get('usage') or {},
+    }
+
+
+def _prometheus_labels(labels):
+    return ','.join(f'{key}="{str(value).replace(chr(34), "")}"' for key, value in labels.items())
+
+
+class RunMetrics:
+    """
+    Structured metrics for one enrichment run.
+
+    Every stage, batch and event is appended to metrics_path as one JSON object per line, tagged with
+    the run's id and kind. say() replaces print for progress output and honours verbosity
+    ('quiet' / 'info' / 'debug'). close() writes an optional Prometheus textfile and returns the summary.
+    """
+
+    def __init__(self, kind, metrics_path=METRICS_PATH, prometheus_path=None, verbosity='info'):
+        if verbosity not in VERBOSITY_LEVELS:
+            raise ValueError(f"verbosity must be one of {list(VERBOSITY_LEVELS)}, got {verbosity!r}")
+
+        self.kind = kind
+        self.run_id = f"{kind}-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.metrics_path = metrics_path
+        self.prometheus_path = prometheus_path
+        self.verbosity = verbosity
+        self.started = time.perf_counter()
+
+        self.stages = {}
+        self._open_stages = {}
+        self.batches = []
+        self.errors = {}
+        self.totals = {'compute_units': 0.0, 'usage_usd': 0.0}
+
+        self._file = None
+        if metrics_path:
+            metrics_dir = os.path.dirname(metrics_path)
+            if metrics_dir:
+                os.makedirs(metrics_dir, exist_ok=True)
+            self._file = open(metrics_path, 'a', encoding='utf-8')
+        self.emit('run_start')
+
+    def say(self, message='', level='info'):
+        if MESSAGE_LEVELS.get(level, 1) <= VERBOSITY_LEVELS[self.verbosity]:
+            print(message)
+
+    def debug(self, message):
+        self.say(message, 'debug')
+
+    def emit(self, event, **fields):
+        record = {'ts': time.time(), 'run_id': self.run_id, 'kind': self.kind, 'event': event, **fields}
+        if self._file:
+            self._file.write(json.dumps(record, default=str) + '\n')
+            self._file.flush()
+        return record
+
+    def begin(self, name):
+        """Start timing a pipeline stage; end(name, ...) records it."""
+        self._open_stages[name] = time.perf_counter()
+
+    def end(self, name, **counters):
+        """Record a stage's wall time with its counters (urls_in, urls_out, hits, misses, ...)."""
+        secs = time.perf_counter() - self._open_stages.pop(name)
+        stage = self.stages.setdefault(name, {'secs': 0.0})
+        stage['secs'] += secs
+        for key, value in counters.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stage[key] = stage.get(key, 0) + value
+        self.emit('stage', stage=name, secs=round(secs, 4), **counters)
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Context-manager form of begin/end; counters added to the yielded dict are recorded on exit."""
+        counters = dict(fields)
+        self.begin(name)
+        try:
+            yield counters
+        finally:
+            self.end(name, **counters)
+
+    def error(self, stage, error, **fields):
+        category = categorize_error(error)
+        key = (stage, category)
+        self.errors[key] = self.errors.get(key, 0) + 1
+        self.emit('error', stage=stage, category=category, error=str(error)[:300], **fields)
+        return category
+
+    def batch(self, stage, batch_index, urls, secs=None, run_info=None, error=None, **fields):
+        """Record one actor batch: its run id, status, size, wall time and Apify usage."""
+        usage = apify_run_usage(run_info)
+        self.totals['compute_units'] += usage['compute_units']
+        self.totals['usage_usd'] += usage['usage_usd']
+        record = {
+            'stage': stage,
+            'batch_index': batch_index,
+            'actor_run_id': (run_info or {}).get('id'),
+            'status': (run_info or {}).get('status') or ('ERROR' if error else None),
+            'urls': urls,
+            'secs': round(secs, 4) if secs is not None else None,
+            'error_category': self.error(stage, error, batch_index=batch_index) if error else None,
+            **usage,
+            **fields,
+        }
+        self.batches.append(record)
+        self.emit('batch', **record)
+
+    def summary(self):
+        return {
+            'run_id': self.run_id,
+            'kind': self.kind,
+            'wall_secs': round(time.perf_counter() - self.started, 4),
+            'stages': self.stages,
+            'batches': len(self.batches),
+            'errors': {f"{stage}:{category}": count for (stage, category), count in self.errors.items()},
+            **self.totals,
+        }
+
+    def write_prometheus(self, path=None):
+        """Write the run's gauges in the Prometheus textfile-collector format (atomic replace)."""
+        path = path or self.prometheus_path
+        if not path:
+            return
+        base = {'kind': self.kind}
+        lines = [
+            '# HELP leadgen_stage_seconds Wall time spent per pipeline stage in the last run',
+            '# TYPE leadgen_stage_seconds gauge',
+        ]
+        for name, stage in self.stages.items():
+            lines.append(f"leadgen_stage_seconds{{{_prometheus_labels({**base, 'stage': name})}}} {stage['secs']:.4f}")
+        lines += ['# HELP leadgen_stage_count Counters recorded per stage in the last run',
+                  '# TYPE leadgen_stage_count gauge']
+        for name, stage in self.stages.items():
+            for key, value in stage.items():
+                if key != 'secs':
+                    labels = _prometheus_labels({**base, 'stage': name, 'counter': key})
+                    lines.append(f"leadgen_stage_count{{{labels}}} {value}")
+        lines += ['# HELP leadgen_errors Errors per stage and category in the last run',
+                  '# TYPE leadgen_errors gauge']
+        for (stage, category), count in self.errors.items():
+            labels = _prometheus_labels({**base, 'stage': stage, 'category': category})
+            lines.append(f"leadgen_errors{{{labels}}} {count}")
+        lines += [
+            '# HELP leadgen_actor_compute_units Apify compute units used by the last run',
+            '# TYPE leadgen_actor_compute_units gauge',
+            f"leadgen_actor_compute_units{{{_prometheus_labels(base)}}} {self.totals['compute_units']:.4f}",
+            '# HELP leadgen_actor_usage_usd Apify usage cost of the last run',
+            '# TYPE leadgen_actor_usage_usd gauge',
+            f"leadgen_actor_usage_usd{{{_prometheus_labels(base)}}} {self.totals['usage_usd']:.4f}",
+            '# HELP leadgen_run_seconds Wall time of the last run',
+            '# TYPE leadgen_run_seconds gauge',
+            f"leadgen_run_seconds{{{_prometheus_labels(base)}}} {time.perf_counter() - self.started:.4f}",
+        ]
+
+        prometheus_dir = os.path.dirname(path)
+        if prometheus_dir:
+            os.makedirs(prometheus_dir, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temp_path, path)
+
+    def close(self):
+        summary = self.summary()
+        self.emit('run_end', **summary)
+        self.write_prometheus()
+        if self._file:
+            self._file.close()
+            self._file = None
+        return summary
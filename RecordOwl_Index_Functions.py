@@ -0,0 +1,126 @@
+import pandas as pd
+import numpy as np
+import os
+import glob
+
+from Master_DB_Functions import clean_uens
+
+
+# Earlier scrape outputs the index is built from
+RECORDOWL_INDEX_GLOBS = (
+    os.path.join("Staging", "Silver", "*.parquet"),
+    os.path.join("Data_Lake", "*.parquet"),
+)
+
+# Columns of one RecordOwl scrape result, as the Silver_2 scraper writes them
+RECORDOWL_RESULT_COLUMNS = [
+    'UEN', 'Status', 'Error', 'Emails', 'Phones', 'Website', 'Facebook', 'LinkedIn', 'Instagram', 'TikTok',
+    'address', 'RecordOwl_Link',
+]
+# Address columns saved Silver files carry instead of the raw 'address' text
+OPERATIONAL_ADDRESS_COLUMNS = ['operational_street', 'operational_unit', 'operational_postal_code', 'operational_address']
+INDEX_COLUMNS = RECORDOWL_RESULT_COLUMNS + OPERATIONAL_ADDRESS_COLUMNS + ['Scraped_At', 'Source_File']
+
+# Results worth keeping: 'error' / 'missing' rows are scraped again on the next run
+KNOWN_STATUSES = ('success', 'not_found')
+DEFAULT_FRESHNESS_DAYS = 180
+
+
+def recordowl_index_paths(patterns=RECORDOWL_INDEX_GLOBS):
+    return sorted(path for pattern in patterns for path in glob.glob(pattern))
+
+
+def read_recordowl_records(path):
+    """
+    The known RecordOwl records in one parquet file, with cleaned UENs and a Scraped_At time.
+    Files without a Status column (older Data Lake exports) count a RecordOwl_Link without an
+    Error as success. Records without a Scraped_At date keep NaT: a file's modification time says
+    nothing about when it was scraped (a fresh clone or copy resets it), so they count as stale.
+    """
+    df = pd.read_parquet(path)
+    if 'UEN' not in df.columns:
+        return None
+
+    df = df.reindex(columns=[column for column in INDEX_COLUMNS if column != 'Source_File'])
+    df['UEN'] = clean_uens(df['UEN']).astype(object)
+    if df['Status'].isna().all():
+        df['Status'] = 'error'
+        df.loc[df['RecordOwl_Link'].notna() & df['Error'].isna(), 'Status'] = 'success'
+    df['Scraped_At'] = pd.to_datetime(df['Scraped_At'])
+    df['Source_File'] = path
+    return df[df['UEN'].notna() & df['Status'].isin(KNOWN_STATUSES)]
+
+
+def build_recordowl_index(paths=None):
+    """
+    UEN -> last-scraped RecordOwl record across the Silver and Data Lake parquet files.
+
+    One row per UEN (the index), the most recent successful / not-found scrape winning (undated
+    records lose to dated ones), with the record's Scraped_At time and the Source_File it came from.
+    """
+    paths = recordowl_index_paths() if paths is None else paths
+    frames = [records for records in (read_recordowl_records(path) for path in paths) if records is not None]
+    frames = [records for records in frames if len(records)]
+    if not frames:
+        print("🗂️  RecordOwl index: no earlier results found")
+        return pd.DataFrame(columns=INDEX_COLUMNS).set_index('UEN')
+
+    records = pd.concat(frames, ignore_index=True)
+    index = (records.sort_values('Scraped_At', kind='stable', na_position='first')
+             .drop_duplicates('UEN', keep='last')
+             .set_index('UEN'))
+    print(f"🗂️  RecordOwl index: {len(index):,} UENs from {len(frames)} file(s)")
+    return index
+
+
+def plan_recordowl_scrape(df, index, uen_column='UEN', freshness_days=DEFAULT_FRESHNESS_DAYS, now=None):
+    """
+    The rows of df whose UEN still needs a RecordOwl scrape: UENs missing from the index, plus
+    (with freshness_days set) UENs last scraped more than freshness_days ago or on an unknown date.
+    Everything else is reused from the index by merge_recordowl_results.
+    """
+    uens = clean_uens(df[uen_column])
+    known = uens.isin(index.index).to_numpy()
+    stale = np.zeros(len(df), dtype=bool)
+    if freshness_days is not None and known.any():
+        cutoff = (now or pd.Timestamp.now()) - pd.Timedelta(days=freshness_days)
+        scraped_at = index['Scraped_At'].reindex(uens[known].to_numpy())
+        stale[known] = (scraped_at.isna() | (scraped_at < cutoff)).to_numpy()
+
+    to_scrape = df[~known | stale]
+    print(f"♻️  Incremental RecordOwl scrape: {int((~known).sum()):,} new + {int(stale.sum()):,} stale UENs to scrape, "
+          f"{int((known & ~stale).sum()):,} reused"
+          + (f" (fresh within {freshness_days} days)" if freshness_days is not None else ""))
+    return to_scrape
+
+
+def merge_recordowl_results(df, scraped, index, uen_column='UEN', scraped_at=None):
+    """
+    One result row per UEN of df, in df's order: this run's scrape where it succeeded (or found
+    nothing), else the UEN's record from the index, else this run's error / missing row.
+    This run's rows are stamped with Scraped_At so the next index dates them exactly.
+    """
+    uens = clean_uens(df[uen_column]).dropna().drop_duplicates()
+
+    scraped = scraped.reindex(columns=[column for column in INDEX_COLUMNS if column != 'Source_File']).copy()
+    scraped['UEN'] = clean_uens(scraped['UEN']).astype(object)
+    scraped['Scraped_At'] = scraped_at or pd.Timestamp.now()
+    scraped = scraped[scraped['UEN'].notna()].drop_duplicates('UEN', keep='last').set_index('UEN')
+    succeeded = scraped[scraped['Status'].isin(KNOWN_STATUSES)]
+    failed = scraped[~scraped['Status'].isin(KNOWN_STATUSES)]
+
+    previous = index.drop(columns=['Source_File'], errors='ignore')
+    previous = previous[~previous.index.isin(succeeded.index)]
+    failed = failed[~failed.index.isin(previous.index)]
+
+    merged = pd.concat([succeeded, previous, failed])
+    merged = merged.reindex(uens.to_numpy()).dropna(how='all')
+    merged.index.name = 'UEN'
+    merged = merged.reset_index()
+
+    print(f"🔗 Merged RecordOwl results: {len(succeeded.index.intersection(merged['UEN'])):,} scraped this run, "
+          f"{len(previous.index.intersection(merged['UEN'])):,} from earlier runs, "
+          f"{len(failed.index.intersection(merged['UEN'])):,} failed")
+    result = merged.astype(object).where(merged.notna(), None)
+    result['Scraped_At'] = pd.to_datetime(merged['Scraped_At'])
+    return result
@@ -0,0 +1,247 @@
+
+import os
+import time
+import json
+import sqlite3
+import itertools
+import numpy as np
+from apify_client import ApifyClient
+
+
+APIFY_TOKEN_ENVS = ("APIFY_API_TOKEN", "APIFY_TOKEN")
+
+FACEBOOK_ACTOR_ID = "oJ48ceKNY7ueGPGL0"
+WEBSITE_ACTOR_ID = "apify/puppeteer-scraper"
+
+TERMINAL_RUN_STATUSES = ('SUCCEEDED', 'FAILED', 'TIMED-OUT', 'ABORTED')
+FAILED_RUN_STATUSES = ('FAILED', 'TIMED-OUT', 'ABORTED')
+
+
+def run_input_urls(run_input):
+    """The URLs a batch run input asks for: Facebook 'pages' or the website actor's 'startUrls'."""
+    if 'pages' in run_input:
+        return list(run_input['pages'])
+    return [
+        (start.get('userData') or {}).get('originalUrl') or start.get('url')
+        for start in run_input.get('startUrls', [])
+    ]
+
+
+class ScrapeBackend:
+    """
+    "Submit batch -> iterate results" contract shared by the enrichment functions and their scheduler.
+
+    start_run returns a run dict with an 'id'; get_run returns the run dict with 'status' (one of
+    TERMINAL_RUN_STATUSES once finished), 'statusMessage' and 'defaultDatasetId'; iterate_items
+    yields the dataset's items projected to fields. wait is how the scheduler sleeps between polls
+    and now the clock it times runs with.
+    """
+
+    name = 'backend'
+
+    def account_info(self):
+        return {}
+
+    def start_run(self, actor_id, run_input, memory_mbytes=None):
+        raise NotImplementedError
+
+    def get_run(self, run_id):
+        raise NotImplementedError
+
+    def iterate_items(self, dataset_id, fields=None):
+        raise NotImplementedError
+
+    def wait(self, seconds):
+        time.sleep(seconds)
+
+    def now(self):
+        return time.monotonic()
+
+
+class ApifyBackend(ScrapeBackend):
+    """Apify platform backend. The token comes from the argument, else $APIFY_API_TOKEN / $APIFY_TOKEN."""
+
+    name = 'apify'
+
+    def __init__(self, token=None, client=None):
+        if client is None:
+            token = token or next((os.environ[env] for env in APIFY_TOKEN_ENVS if os.environ.get(env)), None)
+            if not token:
+                raise ValueError(f"No Apify token: pass token= or set ${APIFY_TOKEN_ENVS[0]}")
+            client = ApifyClient(token)
+        self.client = client
+
+    def account_info(self):
+        return self.client.user().get()
+
+    def start_run(self, actor_id, run_input, memory_mbytes=None):
+        return self.client.actor(actor_id).start(run_input=run_input, memory_mbytes=memory_mbytes)
+
+    def get_run(self, run_id):
+        return self.client.run(run_id).get()
+
+    def iterate_items(self, dataset_id, fields=None):
+        return self.client.dataset(dataset_id).iterate_items(fields=fields)
+
+
+def synthetic_phone(rng):
+    return f"+65 {rng.choice(['6', '8', '9'])}{rng.integers(0, 10_000_000):07d}"
+
+
+def synthetic_items(url, run_input, rng, phone_rate=0.6):
+    """Items shaped like the real actors' output for one requested URL."""
+    if 'pages' in run_input:
+        return [{'facebookUrl': url, 'phone': synthetic_phone(rng) if rng.random() < phone_rate else None}]
+
+    def page_cost():
+        return {'bytes': int(rng.integers(150_000, 900_000)), 'blockedRequests': int(rng.integers(5, 60)),
+                'latencyMs': int(rng.integers(1_500, 8_000))}
+
+    homepage_phones = [synthetic_phone(rng)] if rng.random() < phone_rate else None
+    items = [{'website': url, 'contactUrl': None, 'phones': homepage_phones, 'pageType': 'homepage',
+              'status': 'success', **page_cost()}]
+    # The pageFunction only follows the contact page when the homepage had no phones
+    if homepage_phones is None and rng.random() < 0.7:
+        items.append({
+            'website': url, 'contactUrl': url.rstrip('/') + '/contact-us',
+            'phones': [synthetic_phone(rng)] if rng.random() < phone_rate else None,
+            'pageType': 'contact page', 'status': 'success', **page_cost()
+        })
+    return items
+
+
+class LocalApifyBackend(ScrapeBackend):
+    """
+    Offline stand-in for Apify that serves recorded or synthetic items through the same contract.
+
+    recorded maps a normalized URL (lowercase, no trailing slash) to its list of items, e.g. from
+    from_scrape_cache; URLs without a recording are synthesized unless synthesize_missing=False.
+    Each run takes latency_secs + per_url_secs per URL (+/- latency_jitter as a fraction), fails
+    with one of failure_statuses at failure_rate, and start_failure_rate / stream_failure_rate make
+    actor starts and dataset reads raise. With realtime=False time is simulated: wait() advances a
+    virtual clock instead of sleeping, so 10k+ URL runs finish in seconds.
+    """
+
+    name = 'local'
+
+    def __init__(self, recorded=None, synthesize_missing=True, phone_rate=0.6,
+                 latency_secs=30.0, per_url_secs=0.5, latency_jitter=0.3,
+                 failure_rate=0.0, failure_statuses=FAILED_RUN_STATUSES,
+                 start_failure_rate=0.0, stream_failure_rate=0.0, seed=0, realtime=False):
+        unknown = set(failure_statuses) - set(FAILED_RUN_STATUSES)
+        if unknown:
+            raise ValueError(f"failure_statuses must be drawn from {FAILED_RUN_STATUSES}, got {sorted(unknown)}")
+
+        self.recorded = recorded or {}
+        self.synthesize_missing = synthesize_missing
+        self.phone_rate = phone_rate
+        self.latency_secs = latency_secs
+        self.per_url_secs = per_url_secs
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.failure_statuses = tuple(failure_statuses)
+        self.start_failure_rate = start_failure_rate
+        self.stream_failure_rate = stream_failure_rate
+        self.realtime = realtime
+
+        self.rng = np.random.default_rng(seed)
+        self.ids = itertools.count(1)
+        self.clock = 0.0
+        self.runs = {}
+        self.datasets = {}
+        self.stats = {'runs_started': 0, 'start_failures': 0, 'runs_failed': 0, 'items_served': 0,
+                      'urls_requested': 0, 'recorded_hits': 0}
+
+    @classmethod
+    def from_scrape_cache(cls, path, **kwargs):
+        """Replay every item stored in a ScrapeResultCache database."""
+        conn = sqlite3.connect(path)
+        try:
+            rows = conn.execute("SELECT url_key, items FROM scrape_results").fetchall()
+        finally:
+            conn.close()
+        return cls(recorded={url_key: json.loads(items) for url_key, items in rows}, **kwargs)
+
+    def now(self):
+        return time.monotonic() if self.realtime else self.clock
+
+    def wait(self, seconds):
+        if self.realtime:
+            time.sleep(seconds)
+        else:
+            self.clock += seconds
+
+    def account_info(self):
+        return {'username': 'local-stand-in', 'plan': {'id': 'OFFLINE'}}
+
+    def _items_for(self, url, run_input):
+        recorded = self.recorded.get(str(url).lower().strip().rstrip('/'))
+        if recorded is not None:
+            self.stats['recorded_hits'] += 1
+            # Recorded items are re-keyed to the URL exactly as requested, like the real actors echo it
+            url_field = 'facebookUrl' if 'pages' in run_input else 'website'
+            return [{**item, url_field: url} for item in recorded]
+        if self.synthesize_missing:
+            return synthetic_items(url, run_input, self.rng, self.phone_rate)
+        return []
+
+    def start_run(self, actor_id, run_input, memory_mbytes=None):
+        if self.rng.random() < self.start_failure_rate:
+            self.stats['start_failures'] += 1
+            raise RuntimeError("Local stand-in: actor start rejected (simulated memory limit)")
+
+        urls = run_input_urls(run_input)
+        run_id = f"local-run-{next(self.ids)}"
+        dataset_id = f"local-dataset-{run_id}"
+
+        duration = (self.latency_secs + self.per_url_secs * len(urls)) * \
+            (1 + self.latency_jitter * self.rng.uniform(-1, 1))
+        failed = self.rng.random() < self.failure_rate
+        final_status = self.rng.choice(self.failure_statuses) if failed else 'SUCCEEDED'
+
+        self.datasets[dataset_id] = [] if failed else [
+            item for url in urls for item in self._items_for(url, run_input)
+        ]
+        transfer_bytes = sum(item.get('bytes') or 0 for item in self.datasets[dataset_id])
+        self.runs[run_id] = {
+            'id': run_id,
+            'actId': actor_id,
+            'status': 'RUNNING',
+            'statusMessage': None,
+            'defaultDatasetId': dataset_id,
+            'startedAt': self.now(),
+            'finishesAt': self.now() + max(duration, 0.0),
+            'finalStatus': str(final_status),
+            'options': {'memoryMbytes': memory_mbytes},
+            'usage': {'PROXY_RESIDENTIAL_TRANSFER_GBYTES': transfer_bytes / 1e9},
+        }
+        self.stats['runs_started'] += 1
+        self.stats['urls_requested'] += len(urls)
+        return {key: value for key, value in self.runs[run_id].items() if key not in ('finishesAt', 'finalStatus')}
+
+    def get_run(self, run_id):
+        run = self.runs[run_id]
+        if run['status'] == 'RUNNING' and self.now() >= run['finishesAt']:
+            run['status'] = run['finalStatus']
+            run['finishedAt'] = self.now()
+            if run['status'] != 'SUCCEEDED':
+                self.stats['runs_failed'] += 1
+                run['statusMessage'] = f"Local stand-in: simulated {run['status']}"
+        return {key: value for key, value in run.items() if key not in ('finishesAt', 'finalStatus')}
+
+    def iterate_items(self, dataset_id, fields=None):
+        items = self.datasets[dataset_id]
+        fail_at = int(self.rng.integers(0, len(items))) if items and self.rng.random() < self.stream_failure_rate \
+            else None
+        for position, item in enumerate(items):
+            if position == fail_at:
+                raise ConnectionError("Local stand-in: dataset read interrupted (simulated)")
+            self.stats['items_served'] += 1
+            yield {key: value for key, value in item.items() if not fields or key in fields}
+
+    def summary(self):
+        print(f"🧪 Local backend: {self.stats['runs_started']} runs "
+              f"({self.stats['runs_failed']} failed, {self.stats['start_failures']} rejected starts), "
+              f"{self.stats['urls_requested']:,} URLs, {self.stats['items_served']:,} items served, "
+              f"{self.stats['recorded_hits']:,} from recordings, simulated time {self.now():,.0f}s")
+        return dict(self.stats, simulated_secs=self.now())
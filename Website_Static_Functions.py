@@ -0,0 +1,276 @@
+
+import json
+import re
+import requests
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from Phone_Number_Functions import normalize_singapore_phones
+from Outbound_Http_Functions import OutboundHttpClient
+
+
+# Same contact-page keywords as the website pageFunction
+CONTACT_KEYWORDS = [
+    'contact', 'contacts', 'contact-us', 'contactus', 'reach-us',
+    'get-in-touch', 'enquiry', 'enquiries', 'reach-out',
+    'connect', 'talk-to-us', 'support'
+]
+
+# Same strict Singapore-only text patterns as the pageFunction's Method 4
+TEXT_PHONE_PATTERNS = [
+    re.compile(r'\+65[\s\-.]?[689]\d{3}[\s\-.]?\d{4}'),          # +65 9123 4567
+    re.compile(r'\(\+65\)[\s\-.]?[689]\d{3}[\s\-.]?\d{4}'),      # (+65) 9123 4567
+    re.compile(r'\b65[\s\-][689]\d{3}[\s\-.]?\d{4}\b'),          # 65 9123-4567
+]
+
+WHATSAPP_MARKERS = ('wa.me', 'whatsapp', 'api.whatsapp')
+SKIPPED_TEXT_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head', 'title'}
+APP_ROOT_IDS = {'root', 'app', '__next', '__nuxt', 'svelte'}
+
+MAX_HTML_BYTES = 2_000_000
+CHARSET_PATTERN = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+MIN_STATIC_TEXT_CHARS = 200     # less visible text than this behind a script-driven shell -> needs JS
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+)
+
+
+class PageCollector(HTMLParser):
+    """Single pass over the raw HTML collecting everything the five extraction methods need."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []            # (href, link text)
+        self.ld_json = []
+        self.meta_phones = []
+        self.text = []
+        self.noscript_text = []
+        self.script_count = 0
+        self.has_app_root = False
+
+        self._skip_depth = 0
+        self._in_ld_json = False
+        self._in_noscript = False
+        self._open_link = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'a' and attrs.get('href'):
+            self._open_link = [attrs['href'], []]
+        elif tag == 'meta':
+            key = (attrs.get('property') or '') + ' ' + (attrs.get('name') or '')
+            if 'phone' in key.lower() and attrs.get('content'):
+                self.meta_phones.append(attrs['content'])
+        elif tag == 'script':
+            self.script_count += 1
+            self._in_ld_json = (attrs.get('type') or '').lower() == 'application/ld+json'
+        elif tag == 'div' and (attrs.get('id') or '').lower() in APP_ROOT_IDS:
+            self.has_app_root = True
+
+        if tag == 'noscript':
+            self._in_noscript = True
+        if tag in SKIPPED_TEXT_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'a' and self._open_link:
+            self.links.append((self._open_link[0], ' '.join(self._open_link[1]).strip()))
+            self._open_link = None
+        elif tag == 'script':
+            self._in_ld_json = False
+        if tag == 'noscript':
+            self._in_noscript = False
+        if tag in SKIPPED_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_ld_json:
+            self.ld_json.append(data)
+            return
+        if self._in_noscript:
+            self.noscript_text.append(data)
+        if self._skip_depth:
+            return
+        self.text.append(data)
+        if self._open_link is not None:
+            self._open_link[1].append(data.strip())
+
+
+def _ld_json_phones(blocks):
+    phones = []
+
+    def walk(obj):
+        if isinstance(obj, dict):
+            if obj.get('telephone') or obj.get('phone'):
+                phones.append(str(obj.get('telephone') or obj.get('phone')))
+            for value in obj.values():
+                walk(value)
+        elif isinstance(obj, list):
+            for value in obj:
+                walk(value)
+
+    for block in blocks:
+        try:
+            walk(json.loads(block))
+        except ValueError:
+            continue
+    return phones
+
+
+def _host(url):
+    return (urlparse(url).hostname or '').replace('www.', '')
+
+
+def find_contact_url(links, page_url):
+    """First same-site link whose URL or text contains a contact keyword (pageFunction rules)."""
+    current_domain = _host(page_url)
+    for href, text in links:
+        absolute = urljoin(page_url, href)
+        if not any(kw in absolute.lower() or kw in text.lower() for kw in CONTACT_KEYWORDS):
+            continue
+        link_domain = _host(absolute)
+        if link_domain and (link_domain == current_domain or link_domain.endswith(current_domain)):
+            return absolute
+    return None
+
+
+def extract_page_phones(html, page_url):
+    """
+    Run the pageFunction's five methods over raw HTML.
+    Returns {'phones', 'methods', 'contact_url', 'needs_js'}; phones are '+65XXXXXXXX', in method order.
+    """
+    collector = PageCollector()
+    try:
+        collector.feed(html)
+        collector.close()
+    except Exception:
+        pass
+
+    candidates = {
+        'tel': [href.split(':', 1)[1].strip() for href, _ in collector.links if 'tel:' in href.lower()],
+        'whatsapp': [
+            ''.join(re.findall(r'\d+', href)) for href, _ in collector.links
+            if any(marker in href.lower() for marker in WHATSAPP_MARKERS)
+        ],
+        'json_ld': _ld_json_phones(collector.ld_json),
+        'text': [],
+        'meta': collector.meta_phones,
+    }
+    text = ' '.join(collector.text)
+    for pattern in TEXT_PHONE_PATTERNS:
+        candidates['text'].extend(pattern.findall(text))
+
+    phones, methods = [], []
+    for method, values in candidates.items():
+        found = [phone for phone in normalize_singapore_phones(values) if phone not in phones]
+        if found:
+            phones.extend(found)
+            methods.append(method)
+
+    visible_chars = len(re.sub(r'\s+', '', text))
+    noscript = ' '.join(collector.noscript_text).lower()
+    needs_js = not phones and visible_chars < MIN_STATIC_TEXT_CHARS and (
+        collector.has_app_root or collector.script_count >= 3 or 'javascript' in noscript
+    )
+
+    return {
+        'phones': phones,
+        'methods': methods,
+        'contact_url': find_contact_url(collector.links, page_url),
+        'needs_js': needs_js,
+    }
+
+
+def fetch_html(client, url, timeout=None, max_bytes=MAX_HTML_BYTES):
+    """
+    GET a page through the OutboundHttpClient and return (final_url, html); raises on HTTP errors
+    or non-HTML responses. An https URL with a certificate problem is retried once over http.
+    """
+    try:
+        response = client.get(url, timeout=timeout, allow_redirects=True, stream=True,
+                              headers={'User-Agent': USER_AGENT})
+    except requests.exceptions.SSLError:
+        if not url.startswith('https://'):
+            raise
+        url = url.replace('https://', 'http://', 1)
+        response = client.get(url, timeout=timeout, allow_redirects=True, stream=True,
+                              headers={'User-Agent': USER_AGENT})
+
+    with response:
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        if 'html' not in content_type.lower():
+            raise ValueError(f"Non-HTML content: {content_type or 'unknown'}")
+        body = response.raw.read(max_bytes, decode_content=True)
+        charset = CHARSET_PATTERN.search(content_type)
+        return response.url, body.decode(charset.group(1) if charset else 'utf-8', errors='replace')
+
+
+def scrape_website_static(client, website, timeout=None):
+    """
+    Homepage, then the contact page only when the homepage has no phones, like the pageFunction.
+    Returns (items, escalate, reason) where items use the pageFunction's result shape so they fold,
+    cache and merge the same way.
+    """
+    url = website if website.startswith(('http://', 'https://')) else 'https://' + website
+    try:
+        final_url, html = fetch_html(client, url, timeout)
+    except Exception as e:
+        return [], True, f"fetch failed: {type(e).__name__}"
+
+    homepage = extract_page_phones(html, final_url)
+    items = [{
+        'website': website, 'contactUrl': None, 'phones': homepage['phones'] or None,
+        'pageType': 'homepage', 'status': 'success'
+    }]
+    if homepage['phones']:
+        return items, False, 'phones found'
+
+    contact_url = homepage['contact_url']
+    if contact_url and contact_url.rstrip('/') != final_url.rstrip('/'):
+        try:
+            contact_final, contact_html = fetch_html(client, contact_url, timeout)
+            contact = extract_page_phones(contact_html, contact_final)
+            items.append({
+                'website': website, 'contactUrl': contact_url, 'phones': contact['phones'] or None,
+                'pageType': 'contact page', 'status': 'success'
+            })
+        except Exception:
+            pass
+
+    if any(item['phones'] for item in items):
+        return items, False, 'phones found'
+    if homepage['needs_js']:
+        return items, True, 'needs JS rendering'
+    return items, True, 'no phones in static HTML'
+
+
+def scrape_websites_static(websites, concurrency=50, per_host_connections=2, timeout=10, http_client=None):
+    """
+    Static-HTML phone extraction for many websites, concurrency fetches at a time.
+    Fetches go through http_client (an OutboundHttpClient, e.g. the run's verification client, so
+    per-domain rate limits and open circuit breakers carry over); without one, a client allowing
+    per_host_connections per domain is created for the call. timeout caps each fetch.
+    Returns dict of website -> {'items': [...], 'escalate': bool, 'reason': str}; escalate marks
+    sites that found nothing or need JS rendering and should go to the browser actor.
+    """
+    websites = list(dict.fromkeys(websites))
+    if not websites:
+        return {}
+
+    owns_client = http_client is None
+    if owns_client:
+        http_client = OutboundHttpClient(max_concurrency=concurrency, per_domain_concurrency=per_host_connections,
+                                         max_timeout=timeout)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = executor.map(lambda website: scrape_website_static(http_client, website, timeout), websites)
+            return {
+                website: {'items': items, 'escalate': escalate, 'reason': reason}
+                for website, (items, escalate, reason) in zip(websites, outcomes)
+            }
+    finally:
+        if owns_client:
+            http_client.close()
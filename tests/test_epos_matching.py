@@ -0,0 +1,30 @@
+from Epos_Matching_Functions import EposClientIndex, canonical_company_names
+
+
+def test_canonical_names_strip_legal_forms_only_by_default():
+    names = ['Tan & Co. Pte. Ltd.', 'ABC (S) PTE LTD', 'zeta  singapore llp', 'Omega Trading Private Limited']
+    assert canonical_company_names(names).tolist() == ['CO TAN', 'ABC S', 'SINGAPORE ZETA', 'OMEGA TRADING']
+    assert canonical_company_names(names, strip_fillers=True).tolist() == ['TAN', 'ABC', 'ZETA', 'OMEGA TRADING']
+
+
+def test_exact_match_keeps_entities_that_differ_by_filler_words():
+    index = EposClientIndex(['ABC (S) Pte Ltd', 'Tan & Co Pte Ltd', 'Omega Trading Pte. Ltd.'])
+
+    exact = index.match(['ABC Pte Ltd', 'abc (s) pte. ltd.', 'Tan Pte Ltd', 'TRADING OMEGA LTD'])
+    assert exact['Matched ePOS Name'].isna().tolist() == [True, False, True, False]
+    assert exact['Matched ePOS Name'].dropna().tolist() == ['ABC (S) Pte Ltd', 'Omega Trading Pte. Ltd.']
+
+    near = index.match(['ABC Pte Ltd', 'Tan Pte Ltd'], threshold=90)
+    assert near['Matched ePOS Name'].tolist() == ['ABC (S) Pte Ltd', 'Tan & Co Pte Ltd']
+
+
+def test_bracketed_qualifier_counts_the_same_before_or_after_the_legal_suffix():
+    names = ['ABC (S)', 'ABC (S) Pte Ltd', 'ABC Pte Ltd (S)', 'ABC (Singapore)', 'ABC Pte Ltd (Drinks Stall)']
+    assert canonical_company_names(names).tolist() == ['ABC S', 'ABC S', 'ABC S', 'ABC SINGAPORE', 'ABC']
+    assert canonical_company_names(names, strip_fillers=True).tolist() == ['ABC'] * 5
+
+    plain = EposClientIndex(['ABC Pte Ltd']).match(['ABC (S)', 'ABC (S) Pte Ltd'])
+    assert plain['Matched ePOS Name'].isna().all()
+
+    qualified = EposClientIndex(['ABC (S) Pte Ltd']).match(['ABC (S)', 'ABC Pte Ltd (S)'])
+    assert qualified['Matched ePOS Name'].tolist() == ['ABC (S) Pte Ltd'] * 2
@@ -0,0 +1,175 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pandas as pd
+import pytest
+import requests
+
+from Google_Sheets_Functions import SheetsClient, sync_frame_to_sheet
+
+SHEET = 'Leads'
+A1_PATTERN = re.compile(r"^'(?P<sheet>(?:[^']|'')+)'!(?P<first_col>[A-Z]+)(?P<first>\d+):(?P<last_col>[A-Z]+)(?P<last>\d+)$")
+
+
+def column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+class FakeSheets(BaseHTTPRequestHandler):
+    """
+    The Sheets v4 calls the sync makes, over one in-memory grid of typed cells. Reads honour
+    valueRenderOption: FORMATTED_VALUE renders numbers with thousands separators, like a sheet
+    whose number columns have a display format.
+    """
+    grid = []
+    row_count = 1000
+    calls = []
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    @staticmethod
+    def parse_range(a1):
+        match = A1_PATTERN.match(a1)
+        assert match and match['sheet'].replace("''", "'") == SHEET, a1
+        return int(match['first']), int(match['last']), column_number(match['first_col']), column_number(match['last_col'])
+
+    def cells(self, first, last, width, render):
+        rows = []
+        for row in self.grid[first - 1:last]:
+            row = row[:width]
+            if render == 'FORMATTED_VALUE':
+                row = [f'{value:,}' if isinstance(value, (int, float)) else value for value in row]
+            rows.append(row)
+        while rows and not any(cell != '' for cell in rows[-1]):
+            rows.pop()
+        return rows
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.calls.append(('GET', url.path))
+        if url.path.endswith('/values:batchGet'):
+            render = query.get('valueRenderOption', ['FORMATTED_VALUE'])[0]
+            value_ranges = []
+            for a1 in query['ranges']:
+                first, last, _, width = self.parse_range(a1)
+                value_ranges.append({'range': a1, 'values': self.cells(first, last, width, render)})
+            return self.reply({'valueRanges': value_ranges})
+        return self.reply({'sheets': [{'properties': {'title': SHEET, 'gridProperties': {'rowCount': self.row_count}}}]})
+
+    def write(self, first, values, first_column=1):
+        while len(self.grid) < first - 1 + len(values):
+            self.grid.append([])
+        for offset, row in enumerate(values):
+            cells = self.grid[first - 1 + offset]
+            cells.extend([''] * (first_column - 1 + len(row) - len(cells)))
+            cells[first_column - 1:first_column - 1 + len(row)] = row
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.calls.append(('POST', unquote(url.path)))
+        if url.path.endswith('/values:batchUpdate'):
+            for value_range in body['data']:
+                first, _, first_column, _ = self.parse_range(value_range['range'])
+                self.write(first, value_range['values'], first_column)
+        elif url.path.endswith(':append'):
+            self.write(len(self.grid) + 1, body['values'])
+        return self.reply({})
+
+
+@pytest.fixture
+def sheets():
+    FakeSheets.calls = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSheets)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = requests.Session()
+    yield SheetsClient(session, 'sheet-id', base_url=f'http://127.0.0.1:{server.server_address[1]}',
+                       max_retries=0)
+    session.close()
+    server.shutdown()
+    server.server_close()
+
+
+def writes():
+    return [path for method, path in FakeSheets.calls if method == 'POST']
+
+
+def test_diff_sync_writes_only_changed_and_new_rows(sheets):
+    # A blank header cell and a repeated 'Notes' column; SSIC and phone cells typed as numbers
+    FakeSheets.grid = [
+        ['UEN', 'Name', 'SSIC', '', 'Phone', 'Notes', 'Notes'],
+        ['201900001A', 'Alpha', 56111, 'x', 6591234567, 'keep', 'a'],
+        ['201900002B', 'Beta', 47111, '', 6581234567, 'old', 'b'],
+        ['201900003C', 'Gamma', 10711, '', 6561234567, '', 'c'],
+    ]
+    local = pd.DataFrame({
+        'UEN': ['201900001A', '201900002B', '201900004D'],
+        'Name': ['Alpha', 'Beta', 'Delta'],
+        'SSIC': [56111.0, 47111.0, 93209.0],
+        'Phone': ['6591234567', '6581234567', '6591112222'],
+        'Notes': ['keep', 'new note', ''],
+    })
+
+    summary = sync_frame_to_sheet(sheets, SHEET, local)
+
+    # Alpha is unchanged despite its numeric cells; Beta's note changed; Delta is new
+    assert (summary['updated_rows'], summary['appended_rows']) == (1, 1)
+    assert FakeSheets.grid[2] == ['201900002B', 'Beta', 47111, '', 6581234567, 'new note', 'b']
+    assert FakeSheets.grid[1] == ['201900001A', 'Alpha', 56111, 'x', 6591234567, 'keep', 'a']
+    assert FakeSheets.grid[3] == ['201900003C', 'Gamma', 10711, '', 6561234567, '', 'c']
+    assert FakeSheets.grid[4] == ['201900004D', 'Delta', '93209', '', '6591112222', '', '']
+
+    # A second sync of the same frame finds nothing to write
+    FakeSheets.calls = []
+    summary = sync_frame_to_sheet(sheets, SHEET, local)
+    assert (summary['updated_rows'], summary['appended_rows']) == (0, 0)
+    assert writes() == []
+
+
+def test_sync_into_an_empty_sheet_writes_the_header_then_appends(sheets):
+    FakeSheets.grid = []
+    local = pd.DataFrame({'UEN': ['201900001A', '201900002B'], 'Name': ['Alpha', 'Beta']})
+
+    summary = sync_frame_to_sheet(sheets, SHEET, local)
+
+    assert summary['appended_rows'] == 2
+    assert FakeSheets.grid == [['UEN', 'Name'], ['201900001A', 'Alpha'], ['201900002B', 'Beta']]
+
+
+def test_update_leaves_typed_cells_outside_the_change_alone(sheets):
+    # Employees (a number) and Verified (a checkbox) are not in the local frame
+    FakeSheets.grid = [
+        ['UEN', 'Name', 'Employees', 'Verified', 'Phone', 'Notes'],
+        ['201900001A', 'Alpha', 56111, True, 6591234567, 'old'],
+        ['201900002B', 'Beta', 12, False, 6581234567, 'old'],
+    ]
+    local = pd.DataFrame({
+        'UEN': ['201900001A', '201900002B'],
+        'Name': ['Alpha Pte Ltd', 'Beta Pte Ltd'],
+        'Phone': ['6591234567', '6581234567'],
+        'Notes': ['new', 'new'],
+    })
+
+    summary = sync_frame_to_sheet(sheets, SHEET, local, max_rows=2)
+
+    assert summary['updated_rows'] == 2
+    assert FakeSheets.grid[1] == ['201900001A', 'Alpha Pte Ltd', 56111, True, 6591234567, 'new']
+    assert FakeSheets.grid[2] == ['201900002B', 'Beta Pte Ltd', 12, False, 6581234567, 'new']
+    # Names and notes are two 2-row ranges: max_rows=2 counts their rows, so each is its own request
+    assert writes() == ['/sheet-id/values:batchUpdate'] * 2
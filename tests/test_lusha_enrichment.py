@@ -0,0 +1,152 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from Lusha_Enrichment_Functions import (
+    CONTACT_ENRICH_PATH, CONTACT_SEARCH_PATH, LUSHA_API_KEY_ENV, LUSHA_FLAG_COLUMN, Get_PIC_Contacts_From_Lusha,
+)
+from Pipeline_Metrics_Functions import RunMetrics
+
+
+# Company name -> contacts Lusha knows of, and contact id -> the phones an enrichment reveals
+FAKE_COMPANIES = {
+    'Alpha Trading Pte Ltd': [
+        {'contactId': 'a1', 'name': 'Ann Tan', 'jobTitle': 'Engineer'},
+        {'contactId': 'a2', 'name': 'Alan Lim', 'jobTitle': 'Managing Director'},
+    ],
+    'Beta Foods Pte Ltd': [{'contactId': f'b{i}', 'name': f'Ben Ong {i}', 'jobTitle': 'Sales', 'hasMobilePhone': i == 11}
+                           for i in range(12)],
+}
+FAKE_PHONES = {
+    'a1': [{'number': '+6561234567', 'phoneType': 'direct'}],
+    'a2': [{'number': '+6591234567', 'phoneType': 'mobile'}],
+    'b11': [{'number': '+6587654321', 'phoneType': 'mobile'}],
+}
+
+
+class FakeLusha(BaseHTTPRequestHandler):
+    """Search and enrich endpoints with Lusha's paging: pages of 10-50 contacts and a totalResults count."""
+    calls = []
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.calls.append((self.path, payload))
+        if self.path == CONTACT_SEARCH_PATH:
+            page, size = payload['pages']['page'], payload['pages']['size']
+            if not 10 <= size <= 50:
+                return self.reply(400, {'message': 'page size must be between 10 and 50'})
+            names = payload['filters']['companies']['include']['names']
+            matches = [dict(contact, companyName=name) for name in names for contact in FAKE_COMPANIES.get(name, [])]
+            return self.reply(200, {
+                'requestId': f'req-{page}',
+                'totalResults': len(matches),
+                'data': matches[page * size:(page + 1) * size],
+                'billing': {'creditsCharged': 1},
+            })
+        if self.path == CONTACT_ENRICH_PATH:
+            contacts = [{'id': contact_id, 'data': {'phoneNumbers': FAKE_PHONES.get(contact_id, [])}}
+                        for contact_id in payload['contactIds']]
+            return self.reply(200, {'contacts': contacts, 'billing': {'creditsCharged': 1}})
+        self.reply(404, {})
+
+
+@pytest.fixture
+def lusha_url():
+    FakeLusha.calls = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeLusha)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def run_lusha(df, url, cache_path, **kwargs):
+    return Get_PIC_Contacts_From_Lusha(
+        df, name_column='Name', uen_column='UEN', api_key='test-key', base_url=url, cache_path=cache_path,
+        metrics=RunMetrics('lusha', metrics_path=None, verbosity='quiet'), **kwargs
+    )
+
+
+def leads():
+    return pd.DataFrame({
+        'Name': ['Alpha Trading Pte Ltd', 'ALPHA TRADING PTE. LTD.', 'Beta Foods Pte Ltd', 'Gamma Works Pte Ltd'],
+        'UEN': ['201900001A', None, None, None],
+        'PIC NAME 1 Contact Number': ['6591111111', None, None, None],
+    })
+
+
+def search_calls():
+    return [payload for path, payload in FakeLusha.calls if path == CONTACT_SEARCH_PATH]
+
+
+def test_searches_in_batches_of_at_least_ten_and_reads_every_page(lusha_url, tmp_path):
+    result = run_lusha(leads(), lusha_url, str(tmp_path / 'lusha.sqlite'), search_batch_size=2)
+
+    searches = search_calls()
+    assert all(payload['pages']['size'] == 10 for payload in searches)
+    # 3 distinct names (the two Alpha rows are one lookup) in batches of 2; Beta's 12 contacts span 2 pages
+    searched = [payload['filters']['companies']['include']['names'] for payload in searches]
+    assert sorted(map(sorted, searched)) == sorted(map(sorted, [
+        ['Alpha Trading Pte Ltd', 'Beta Foods Pte Ltd'], ['Alpha Trading Pte Ltd', 'Beta Foods Pte Ltd'],
+        ['Gamma Works Pte Ltd'],
+    ]))
+    # The mobile of Beta's last contact only turns up on the second page
+    assert result.loc[2, 'PIC NAME 1 Contact Number'] == '6587654321'
+    assert pd.isna(result.loc[3, 'PIC NAME 1 Contact Number'])
+
+
+def test_assigns_contacts_to_the_first_open_pic_slot(lusha_url, tmp_path):
+    result = run_lusha(leads(), lusha_url, str(tmp_path / 'lusha.sqlite'))
+
+    # Row 0 already has a PIC 1 number, so Alpha's mobile goes into PIC 2; row 1 shares the lookup
+    assert result.loc[0, 'PIC NAME 1 Contact Number'] == '6591111111'
+    assert result.loc[0, 'PIC NAME 2 Contact Number'] == '6591234567'
+    assert (result.loc[0, 'First Name 2'], result.loc[0, 'Last Name 2']) == ('Alan', 'Lim')
+    assert result.loc[0, 'PIC Name 2 Designation'] == 'Managing Director'
+    assert result.loc[1, 'PIC NAME 1 Contact Number'] == '6591234567'
+    assert list(result[LUSHA_FLAG_COLUMN]) == ['Yes', 'Yes', 'Yes', None]
+
+
+def test_second_run_is_served_from_the_cache(lusha_url, tmp_path):
+    cache_path = str(tmp_path / 'lusha.sqlite')
+    first = run_lusha(leads(), lusha_url, cache_path)
+    FakeLusha.calls = []
+
+    second = run_lusha(leads(), lusha_url, cache_path)
+
+    assert FakeLusha.calls == []
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_incomplete_search_only_caches_companies_that_came_back(lusha_url, tmp_path):
+    df = pd.DataFrame({'Name': ['Beta Foods Pte Ltd', 'Gamma Works Pte Ltd'], 'UEN': [None, None]})
+    cache_path = str(tmp_path / 'lusha.sqlite')
+    run_lusha(df, lusha_url, cache_path, max_search_pages=1)
+    FakeLusha.calls = []
+
+    run_lusha(df, lusha_url, cache_path, max_search_pages=1)
+
+    # Gamma's empty result was cut short by the page limit, so it is searched again
+    assert [payload['filters']['companies']['include']['names'] for payload in search_calls()] == \
+        [['Gamma Works Pte Ltd']]
+
+
+def test_requires_an_api_key(monkeypatch):
+    monkeypatch.delenv(LUSHA_API_KEY_ENV, raising=False)
+    with pytest.raises(ValueError, match=LUSHA_API_KEY_ENV):
+        Get_PIC_Contacts_From_Lusha(leads(), name_column='Name', uen_column='UEN', use_cache=False,
+                                    metrics=RunMetrics('lusha', metrics_path=None, verbosity='quiet'))
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from Phone_Number_Functions import normalize_singapore_phone, normalize_singapore_phones
+
+
+def test_scalar_formats():
+    assert normalize_singapore_phone('+65 9123-4567') == '+6591234567'
+    assert normalize_singapore_phone('6532 1234') == '+6565321234'
+    assert normalize_singapore_phone('(+65) 8123 4567', style='spaced') == '65 8123 4567'
+    assert normalize_singapore_phone('+852 9123 4567') is None
+    assert normalize_singapore_phone(91234567.0) == '+6591234567'
+    assert normalize_singapore_phone(None) is None
+
+
+def test_scalar_list_text_returns_first_valid_number():
+    assert normalize_singapore_phone("['+6580611314', '+6591234567']") == '+6580611314'
+    assert normalize_singapore_phone("['+852 9123 4567', '91234567']", style='spaced') == '65 9123 4567'
+    assert normalize_singapore_phone("[]") is None
+
+
+def test_series_with_list_cells():
+    values = pd.Series(["['+6580611314', '+6580611314', 'n/a']", ['81234567', '61234567'], '91234567', None],
+                       index=[10, 10, 11, 12])
+    assert normalize_singapore_phones(values).tolist() == [
+        ['+6580611314'], ['+6581234567', '+6561234567'], '+6591234567', None,
+    ]
+    assert normalize_singapore_phones(values, first=True).tolist() == [
+        '+6580611314', '+6581234567', '+6591234567', None,
+    ]
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from RecordOwl_Index_Functions import build_recordowl_index, plan_recordowl_scrape
+
+
+def write_results(path, uens, scraped_at=None):
+    df = pd.DataFrame({'UEN': uens, 'Status': 'success', 'RecordOwl_Link': 'https://recordowl.com/x'})
+    if scraped_at is not None:
+        df['Scraped_At'] = pd.Timestamp(scraped_at)
+    df.to_parquet(path)
+    return str(path)
+
+
+def test_undated_records_are_stale_whatever_the_file_mtime(tmp_path):
+    undated = write_results(tmp_path / 'old_export.parquet', ['201900001A', '201900002B'])
+    dated = write_results(tmp_path / 'silver.parquet', ['201900002B', '201900003C'], '2026-10-01')
+    index = build_recordowl_index([dated, undated])
+
+    # The dated record wins over the undated copy of the same UEN
+    assert index.loc['201900002B', 'Source_File'] == dated
+    assert pd.isna(index.loc['201900001A', 'Scraped_At'])
+
+    leads = pd.DataFrame({'UEN': ['201900001A', '201900002B', '201900003C', '201900004D']})
+    to_scrape = plan_recordowl_scrape(leads, index, now=pd.Timestamp('2026-10-18'))
+    assert to_scrape['UEN'].tolist() == ['201900001A', '201900004D']
+
+    # Without a freshness window every earlier result is reused, dated or not
+    assert plan_recordowl_scrape(leads, index, freshness_days=None)['UEN'].tolist() == ['201900004D']